@@ -1,14 +1,24 @@
 """Application configuration."""
 
 import os
+from typing import List, Literal
 
 from dotenv import load_dotenv
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings
 
 # Load .env file
 load_dotenv(override=True)
 
 
+class ModelRoute(BaseModel):
+    """Claude model used for inputs up to a size."""
+
+    max_input_tokens: int
+    model: str
+    max_output_tokens: int = 8192
+
+
 class Settings(BaseSettings):
     """Application settings."""
 
@@ -20,6 +30,17 @@ class Settings(BaseSettings):
     claude_api_key: str = os.getenv("CLAUDE_API_KEY", "")
     notion_api_key: str = os.getenv("NOTION_API_KEY", "")
     notion_database_id: str = os.getenv("NOTION_DATABASE_ID", "")
+    # Shared by every Notion call in the process; Notion averages ~3 req/s
+    notion_requests_per_second: float = 3.0
+    notion_request_burst: int = 3
+    notion_max_retries: int = 5  # Retries of a throttled (429) request
+    # Message ID to page index keeping retries from creating duplicate pages
+    notion_page_index_file: str = os.getenv(
+        "NOTION_PAGE_INDEX_FILE", "notion_pages.sqlite3"
+    )  # Empty disables the index
+    # Re-summarize stored emails and patch only the changed blocks of their
+    # pages, e.g. after a prompt change; off skips stored emails
+    notion_update_existing: bool = False
     slack_bot_token: str = os.getenv("SLACK_BOT_TOKEN", "")
     slack_channel_id: str = os.getenv("SLACK_CHANNEL_ID", "")
 
@@ -28,6 +49,58 @@ class Settings(BaseSettings):
     max_emails_to_process: int = 10
     processing_interval_seconds: int = 300  # 5 minutes
     email_subject_filter: str = os.getenv("EMAIL_SUBJECT_FILTER", "The Briefing")
+    gmail_batch_size: int = 50  # Gmail accepts up to 100 calls per batch
+    gmail_max_workers: int = 4  # Threads running blocking Gmail calls
+    gmail_token_refresh_margin_seconds: int = 300  # Refresh this long before expiry
+    gmail_page_size: int = 100  # messages.list page size, at most 500
+    gmail_prefetch_depth: int = 20  # Parsed emails buffered ahead of the pipeline
+    # Fetch metadata first and bodies only for messages that pass the filters
+    gmail_two_phase_fetch: bool = True
+    email_body_max_chars: int = 200_000  # Longer bodies are truncated
+    # Strip quoted replies, signatures, footers and URL lists before Claude
+    email_preprocessing: bool = True
+    # Fetch only mail added since the last historyId checkpoint
+    gmail_incremental_sync: bool = False
+    gmail_history_file: str = os.getenv("GMAIL_HISTORY_FILE", "gmail_history.json")
+    # Archive processed emails with one bulk call at the end of each cycle
+    gmail_defer_archive: bool = False
+
+    # Claude settings
+    claude_default_model: str = "claude-3-5-sonnet-20241022"
+    claude_default_max_output_tokens: int = 8192
+    # First route whose max_input_tokens fits the estimate wins, else the default
+    claude_model_routes: List[ModelRoute] = [
+        ModelRoute(max_input_tokens=1000, model="claude-haiku-4-5"),
+    ]
+    # max_tokens is sized from the input: Japanese output runs about 2x English
+    claude_output_token_ratio: float = 2.0
+    claude_min_output_tokens: int = 1024
+    claude_analysis_max_tokens: int = 2048  # ClaudeService.analyze replies are short
+    claude_max_concurrency: int = 4  # Concurrent Messages API requests
+    claude_chunk_tokens: int = 2000  # Longer bodies are translated in chunks
+    claude_max_continuations: int = 3  # Follow-ups for replies cut at max_tokens
+    # Create the Notion page first and append paragraphs as Claude streams them
+    claude_streaming: bool = False
+    # Summaries keyed by body, prompt version and model; empty disables the cache
+    summary_cache_file: str = os.getenv("SUMMARY_CACHE_FILE", "summary_cache.sqlite3")
+    summary_cache_max_entries: int = 10_000
+    summary_cache_ttl_seconds: int = 30 * 24 * 3600  # 30 days
+    # Japanese emails skip translation: stored as-is, or summarized in Japanese
+    japanese_email_mode: Literal["passthrough", "summarize"] = "passthrough"
+    # Sentences seen in earlier emails (newsletter boilerplate) are not resent
+    translation_memory_file: str = os.getenv(
+        "TRANSLATION_MEMORY_FILE", "translation_memory.sqlite3"
+    )  # Empty disables the translation memory
+    translation_memory_max_entries: int = 100_000
+    # Near-duplicate (resent/forwarded) emails reuse the first email's summary
+    duplicate_index_file: str = os.getenv(
+        "DUPLICATE_INDEX_FILE", "duplicate_index.sqlite3"
+    )  # Empty disables duplicate detection
+    near_duplicate_max_distance: int = 3  # SimHash bits out of 64
+    # Backlogs of at least this many emails go through the Message Batches API
+    claude_batch_threshold: int = 50  # 0 disables batch mode
+    claude_batch_poll_seconds: float = 10.0  # First poll delay, doubled each time
+    claude_batch_poll_max_seconds: float = 300.0
 
     # Summary settings
     SUMMARY_MAX_LENGTH: int = 500
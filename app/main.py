@@ -3,7 +3,7 @@
 import asyncio
 import logging
 from email.utils import parsedate_to_datetime
-from typing import Tuple
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 from app.config import Settings
 from app.models.converters import email_to_notion_data
@@ -12,9 +12,18 @@ from app.services.claude_service import ClaudeService
 from app.services.gmail_service import GmailService
 from app.services.notion_service import NotionService
 from app.services.slack_service import SlackService
+from app.utils.duplicate_index import DuplicateIndex, DuplicateMatch
+from app.utils.page_index import PageIndex
+from app.utils.preprocessor import EmailPreprocessor
+from app.utils.summary_cache import SummaryCache
+from app.utils.translation_memory import TranslationMemory
 
 logger = logging.getLogger(__name__)
 settings = Settings()
+# Footers learned per sender carry over between scheduled cycles
+preprocessor = EmailPreprocessor()
+# Opened on first use and warmed from Notion once per process
+page_index: Optional[PageIndex] = None
 
 
 def initialize_services() -> (
@@ -34,10 +43,34 @@ def initialize_services() -> (
     if not settings.slack_bot_token or not settings.slack_channel_id:
         raise ValueError("SLACK_BOT_TOKEN and SLACK_CHANNEL_ID are required")
 
-    gmail_service = GmailService()
-    claude_service = ClaudeService(api_token=settings.claude_api_key)
+    # Gmail discovery, credentials and worker threads are set up once per process
+    gmail_service = GmailService.shared()
+    summary_cache = (
+        SummaryCache(
+            settings.summary_cache_file,
+            max_entries=settings.summary_cache_max_entries,
+            ttl_seconds=settings.summary_cache_ttl_seconds,
+        )
+        if settings.summary_cache_file
+        else None
+    )
+    translation_memory = (
+        TranslationMemory(
+            settings.translation_memory_file,
+            max_entries=settings.translation_memory_max_entries,
+        )
+        if settings.translation_memory_file
+        else None
+    )
+    claude_service = ClaudeService(
+        api_token=settings.claude_api_key,
+        cache=summary_cache,
+        memory=translation_memory,
+    )
     notion_service = NotionService(
-        api_token=settings.notion_api_key, database_id=settings.notion_database_id
+        api_token=settings.notion_api_key,
+        database_id=settings.notion_database_id,
+        page_index=shared_page_index(),
     )
     slack_service = SlackService(
         api_token=settings.slack_bot_token, channel_id=settings.slack_channel_id
@@ -46,6 +79,440 @@ def initialize_services() -> (
     return gmail_service, claude_service, notion_service, slack_service
 
 
+def shared_page_index() -> Optional[PageIndex]:
+    """
+    Open the message ID to Notion page index once per process.
+
+    Returns:
+        PageIndex, or None when ``notion_page_index_file`` is empty
+    """
+    global page_index
+    if page_index is None and settings.notion_page_index_file:
+        page_index = PageIndex(settings.notion_page_index_file)
+    return page_index
+
+
+def open_duplicate_index() -> Optional[DuplicateIndex]:
+    """
+    Open the persistent near-duplicate index, if enabled.
+
+    Returns:
+        DuplicateIndex, or None when ``duplicate_index_file`` is empty
+    """
+    if not settings.duplicate_index_file:
+        return None
+    return DuplicateIndex(
+        settings.duplicate_index_file,
+        max_distance=settings.near_duplicate_max_distance,
+    )
+
+
+async def _iterate(emails: List[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+    """Expose an already fetched list of emails as an async iterator."""
+    for email in emails:
+        yield email
+
+
+async def fetch_emails(gmail_service: GmailService) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Open the stream of emails to process in this cycle.
+
+    Args:
+        gmail_service: Gmail service to fetch from
+
+    Returns:
+        Async iterator over parsed emails
+    """
+    if settings.gmail_incremental_sync:
+        return _iterate(
+            await gmail_service.sync_emails(
+                hours=settings.email_lookup_hours,
+                max_results=settings.max_emails_to_process,
+            )
+        )
+    return gmail_service.iter_emails(
+        hours=settings.email_lookup_hours,
+        max_results=settings.max_emails_to_process,
+    )
+
+
+async def preprocess_emails(
+    emails: AsyncIterator[Dict[str, Any]],
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Strip boilerplate from email bodies before they are summarized.
+
+    Args:
+        emails: Async iterator over parsed emails
+
+    Yields:
+        The same emails with cleaned bodies
+    """
+    async for email in emails:
+        result = preprocessor.preprocess(email["body"], email.get("sender", ""))
+        logger.info(
+            "Pre-processed email %s: ~%d -> ~%d tokens (%d saved)",
+            email["id"],
+            result.tokens_before,
+            result.tokens_after,
+            result.tokens_saved,
+        )
+        yield {**email, "body": result.text}
+
+
+async def archive_processed(gmail_service: GmailService, email_ids: List[str]) -> None:
+    """
+    Archive all emails processed in this cycle with bulk requests.
+
+    Args:
+        gmail_service: Gmail service used to archive the emails
+        email_ids: IDs of the processed emails
+    """
+    outcomes = await gmail_service.archive_emails(email_ids)
+    for email_id, archived in outcomes.items():
+        if not archived:
+            logger.warning("Failed to archive email: %s, skipping", email_id)
+
+
+def build_email_data(email: Dict[str, Any], summary: str) -> EmailData:
+    """
+    Build the EmailData model for a parsed email and its summary.
+
+    Args:
+        email: Parsed email data from GmailService
+        summary: Generated summary
+
+    Returns:
+        EmailData instance
+    """
+    # Gmailの日付文字列をdatetimeに変換
+    return EmailData(
+        message_id=email["id"],
+        subject=email["subject"],
+        sender=email["sender"],
+        received_at=parsedate_to_datetime(email["date"]),
+        content=summary,
+    )
+
+
+def notification_text(email_data: EmailData, page: Optional[Dict[str, Any]]) -> str:
+    """
+    Build the Slack notification for a stored summary.
+
+    Args:
+        email_data: Summarized email
+        page: Notion page holding the summary
+
+    Returns:
+        Notification text
+    """
+    return (
+        f"メール要約が作成されました\n"
+        f"件名: {email_data.subject}\n"
+        f"要約: {email_data.content}\n"
+        f"Notionリンク: {page['url'] if page else 'N/A'}"
+    )
+
+
+async def publish_streaming(
+    email: Dict[str, Any],
+    claude_service: ClaudeService,
+    notion_service: NotionService,
+    slack_service: SlackService,
+) -> Tuple[Dict[str, Any], str]:
+    """
+    Stream a summary into a new Notion page and announce it on Slack.
+
+    The page is created and its link sent to Slack before generation starts;
+    paragraphs are appended to the page as Claude produces them and the Slack
+    message is updated with the full summary at the end.
+
+    Args:
+        email: Parsed email data from GmailService
+        claude_service: Claude service used to generate the summary
+        notion_service: Notion service used to store the summary
+        slack_service: Slack service used to send the notification
+
+    Returns:
+        Tuple of (created Notion page, full summary)
+    """
+    # 先にNotionページを作成してSlackにリンクを送る
+    page = await notion_service.create_page(
+        email["subject"], metadata=email_to_notion_data(build_email_data(email, ""))
+    )
+    response = await slack_service.send_notification(
+        f"メール要約を作成中です\n"
+        f"件名: {email['subject']}\n"
+        f"Notionリンク: {page.get('url', 'N/A')}"
+    )
+
+    summary = await notion_service.stream_content(
+        page["id"], claude_service.stream_summary(email["body"])
+    )
+
+    text = notification_text(build_email_data(email, summary), page)
+    if response.get("ts"):
+        await slack_service.update_notification(response["ts"], text)
+    else:
+        await slack_service.send_notification(text)
+    return page, summary
+
+
+async def publish_summary(
+    email: Dict[str, Any],
+    summary: str,
+    notion_service: NotionService,
+    slack_service: SlackService,
+) -> Dict[str, Any]:
+    """
+    Store a finished summary in Notion and send the Slack notification.
+
+    Args:
+        email: Parsed email data from GmailService
+        summary: Generated summary
+        notion_service: Notion service used to store the summary
+        slack_service: Slack service used to send the notification
+
+    Returns:
+        Created Notion page
+    """
+    # EmailDataモデルを作成
+    email_data = build_email_data(email, summary)
+
+    # NotionServiceのデータ形式に変換
+    notion_data = email_to_notion_data(email_data)
+
+    # Notionに保存
+    notion_page = await notion_service.add_entry(notion_data)
+
+    # Slack通知を送信
+    await slack_service.send_notification(notification_text(email_data, notion_page))
+    return notion_page
+
+
+async def link_duplicate(
+    email: Dict[str, Any], match: DuplicateMatch, slack_service: SlackService
+) -> None:
+    """
+    Point Slack at the existing summary of a near-duplicate email.
+
+    Args:
+        email: Parsed email data from GmailService
+        match: Indexed email the new one duplicates
+        slack_service: Slack service used to send the notification
+    """
+    logger.info(
+        "Email %s duplicates %s (distance %d), reusing its summary",
+        email["id"],
+        match.message_id,
+        match.distance,
+    )
+    await slack_service.send_notification(
+        f"既に要約済みのメールと重複しています\n"
+        f"件名: {email['subject']}\n"
+        f"Notionリンク: {match.page_url or 'N/A'}"
+    )
+
+
+async def summarize_and_publish(
+    email: Dict[str, Any],
+    claude_service: ClaudeService,
+    notion_service: NotionService,
+    slack_service: SlackService,
+    summary: Optional[str] = None,
+) -> Tuple[Dict[str, Any], str]:
+    """
+    Summarize an email, store the summary in Notion and notify Slack.
+
+    Args:
+        email: Parsed email data from GmailService
+        claude_service: Claude service used to generate the summary
+        notion_service: Notion service used to store the summary
+        slack_service: Slack service used to send the notification
+        summary: Summary generated in advance (batch mode); None calls Claude
+
+    Returns:
+        Tuple of (created Notion page, summary)
+    """
+    # メール本文のみをClaudeに渡して要約を生成
+    # 保存済みページの更新はストリーミングせず差分で反映する
+    if (
+        summary is None
+        and settings.claude_streaming
+        and notion_service.find_page(email["id"]) is None
+    ):
+        return await publish_streaming(
+            email, claude_service, notion_service, slack_service
+        )
+    if summary is None:
+        summary = await claude_service.generate_summary(email["body"])
+    page = await publish_summary(email, summary, notion_service, slack_service)
+    return page, summary
+
+
+async def process_email(
+    email: Dict[str, Any],
+    gmail_service: GmailService,
+    claude_service: ClaudeService,
+    notion_service: NotionService,
+    slack_service: SlackService,
+    archive: bool = True,
+    summary: Optional[str] = None,
+    duplicates: Optional[DuplicateIndex] = None,
+) -> None:
+    """
+    Summarize, store, notify and archive a single email.
+
+    A near-duplicate of an email already in ``duplicates`` is linked to the
+    existing summary instead of being summarized again. An email already
+    stored in Notion is skipped, or re-summarized into its existing page
+    when ``settings.notion_update_existing`` is set.
+
+    Args:
+        email: Parsed email data from GmailService
+        gmail_service: Gmail service used to archive the email
+        claude_service: Claude service used to generate the summary
+        notion_service: Notion service used to store the summary
+        slack_service: Slack service used to send the notification
+        archive: Archive the email now; False leaves it to the caller
+        summary: Summary generated in advance (batch mode); None calls Claude
+        duplicates: Near-duplicate index of summarized emails
+    """
+    logger.info("Processing email: %s - Subject: %s", email["id"], email["subject"])
+
+    # 前回の処理でNotionに保存済みのメールは再度要約しない(更新モードを除く)
+    stored = (
+        None
+        if settings.notion_update_existing
+        else notion_service.find_page(email["id"])
+    )
+    # 再送・転送された同一内容のメールは既存の要約にリンクする
+    match = duplicates.find(email["body"]) if duplicates is not None else None
+    # 更新モードでは索引済みの自分自身は重複として扱わない
+    indexed = match is not None and match.message_id == email["id"]
+    if stored is not None:
+        logger.info("Email %s already stored in Notion: %s", email["id"], stored["url"])
+    elif match is not None and not indexed:
+        await link_duplicate(email, match, slack_service)
+    else:
+        page, summary = await summarize_and_publish(
+            email, claude_service, notion_service, slack_service, summary
+        )
+        # 長い要約の残りのブロックはSlack通知と並行して追記されている
+        await notion_service.wait_for_page(page["id"])
+        if duplicates is not None and not indexed:
+            duplicates.add(email["id"], email["body"], page.get("url", ""), summary)
+
+    if not archive:
+        return
+
+    # メールを削除
+    logger.info("Attempting to archive email: %s", email["id"])
+    if await gmail_service.archive_email(email["id"]):
+        logger.info("Successfully archived email: %s", email["id"])
+    else:
+        logger.warning("Failed to archive email: %s, skipping", email["id"])
+
+
+async def summarize_backlog(
+    emails: AsyncIterator[Dict[str, Any]], claude_service: ClaudeService
+) -> Tuple[AsyncIterator[Dict[str, Any]], Dict[str, str]]:
+    """
+    Summarize large backlogs with one Message Batch.
+
+    Up to ``settings.claude_batch_threshold`` emails are read ahead. When the
+    stream holds at least that many, the whole backlog is summarized with the
+    Message Batches API; otherwise emails are summarized one by one as usual.
+
+    Args:
+        emails: Async iterator over parsed emails
+        claude_service: Claude service used to generate the summaries
+
+    Returns:
+        Tuple of (iterator over the same emails, summaries keyed by email ID)
+    """
+    threshold = settings.claude_batch_threshold
+    if threshold <= 0:
+        return emails, {}
+
+    backlog: List[Dict[str, Any]] = []
+    async for email in emails:
+        backlog.append(email)
+        if len(backlog) >= threshold:
+            break
+    if len(backlog) < threshold:
+        return _iterate(backlog), {}
+
+    # バックログが多い場合はMessage Batches APIでまとめて要約する
+    async for email in emails:
+        backlog.append(email)
+    logger.info("Backlog of %d emails, using batch mode", len(backlog))
+    summaries = await claude_service.generate_summaries_batch(
+        {email["id"]: email["body"] for email in backlog}
+    )
+    return _iterate(backlog), summaries
+
+
+async def process_concurrently(
+    emails: AsyncIterator[Dict[str, Any]],
+    gmail_service: GmailService,
+    claude_service: ClaudeService,
+    notion_service: NotionService,
+    slack_service: SlackService,
+    summaries: Optional[Dict[str, str]] = None,
+    duplicates: Optional[DuplicateIndex] = None,
+) -> Tuple[List[str], List[str]]:
+    """
+    Process streamed emails concurrently.
+
+    At most ``settings.claude_max_concurrency`` emails are in flight, so the
+    stream is not drained faster than Claude can translate.
+
+    Args:
+        emails: Async iterator over parsed emails
+        gmail_service: Gmail service used to archive the emails
+        claude_service: Claude service used to generate the summaries
+        notion_service: Notion service used to store the summaries
+        slack_service: Slack service used to send the notifications
+        summaries: Summaries generated in advance, keyed by email ID
+        duplicates: Near-duplicate index of summarized emails
+
+    Returns:
+        Tuple of (IDs processed successfully, IDs that failed)
+    """
+    done_ids: List[str] = []
+    failed_ids: List[str] = []
+    slots = asyncio.Semaphore(max(1, settings.claude_max_concurrency))
+
+    async def run(email: Dict[str, Any]) -> None:
+        try:
+            await process_email(
+                email,
+                gmail_service,
+                claude_service,
+                notion_service,
+                slack_service,
+                archive=not settings.gmail_defer_archive,
+                summary=(summaries or {}).get(email["id"]),
+                duplicates=duplicates,
+            )
+            done_ids.append(email["id"])
+        except Exception as e:
+            logger.error("Error processing email %s: %s", email["id"], str(e))
+            failed_ids.append(email["id"])  # 次のメールの処理に進む
+        finally:
+            slots.release()
+
+    tasks: List[asyncio.Task[None]] = []
+    try:
+        async for email in emails:
+            await slots.acquire()
+            tasks.append(asyncio.create_task(run(email)))
+    finally:
+        await asyncio.gather(*tasks)
+    return done_ids, failed_ids
+
+
 async def process_emails() -> None:
     """
     Process emails through the email summary pipeline.
@@ -55,6 +522,9 @@ async def process_emails() -> None:
     3. Store in Notion
     4. Send notifications to Slack
     5. Delete processed emails
+
+    Emails are streamed from Gmail, so the first one is processed as soon as
+    its batch arrives instead of after the whole lookback window is fetched.
     """
     try:
         (
@@ -63,65 +533,46 @@ async def process_emails() -> None:
             notion_service,
             slack_service,
         ) = initialize_services()
+        gmail_service.start_token_refresh()
+        await notion_service.warm_page_index()
 
         # Fetch recent emails
-        emails = await gmail_service.fetch_recent_emails(
-            hours=settings.email_lookup_hours,
-            max_results=settings.max_emails_to_process,
-        )
+        emails = await fetch_emails(gmail_service)
+        if settings.email_preprocessing:
+            emails = preprocess_emails(emails)
 
-        if not emails:
-            logger.info("No new emails to process")
-            return
+        emails, summaries = await summarize_backlog(emails, claude_service)
 
-        logger.info("Processing %d emails", len(emails))
+        duplicates = open_duplicate_index()
+        try:
+            done_ids, failed_ids = await process_concurrently(
+                emails,
+                gmail_service,
+                claude_service,
+                notion_service,
+                slack_service,
+                summaries,
+                duplicates,
+            )
+        finally:
+            if duplicates is not None:
+                duplicates.close()
+        await notion_service.flush()
+        logger.info("Notion rate limiter: %s", notion_service.rate_limiter.metrics)
+        processed = len(done_ids) + len(failed_ids)
+
+        if processed:
+            logger.info("Processed %d emails", processed)
+        else:
+            logger.info("No new emails to process")
 
-        for email in emails:
-            try:
-                logger.info(
-                    "Processing email: %s - Subject: %s", email["id"], email["subject"]
-                )
-
-                # メール本文のみをClaudeに渡して要約を生成
-                summary = await claude_service.generate_summary(email["body"])
-
-                # Gmailの日付文字列をdatetimeに変換
-                received_at = parsedate_to_datetime(email["date"])
-
-                # EmailDataモデルを作成
-                email_data = EmailData(
-                    message_id=email["id"],
-                    subject=email["subject"],
-                    sender=email["sender"],
-                    received_at=received_at,
-                    content=summary,
-                )
-
-                # NotionServiceのデータ形式に変換
-                notion_data = email_to_notion_data(email_data)
-
-                # Notionに保存
-                notion_page = await notion_service.add_entry(notion_data)
-
-                # Slack通知を送信
-                notification_text = (
-                    f"メール要約が作成されました\n"
-                    f"件名: {email_data.subject}\n"
-                    f"要約: {email_data.content}\n"
-                    f"Notionリンク: {notion_page['url'] if notion_page else 'N/A'}"
-                )
-                await slack_service.send_notification(notification_text)
-
-                # メールを削除
-                logger.info("Attempting to archive email: %s", email["id"])
-                if await gmail_service.archive_email(email["id"]):
-                    logger.info("Successfully archived email: %s", email["id"])
-                else:
-                    logger.warning("Failed to archive email: %s, skipping", email["id"])
+        # まとめてアーカイブする場合は1回のbatchModifyで処理する
+        if settings.gmail_defer_archive and done_ids:
+            await archive_processed(gmail_service, done_ids)
 
-            except Exception as e:
-                logger.error("Error processing email %s: %s", email["id"], str(e))
-                continue  # 次のメールの処理に進む
+        # 失敗したメールは次回の同期で再取得する
+        gmail_service.commit_sync_checkpoint(failed_ids)
+        claude_service.close()
 
     except Exception as e:
         logger.error("Error in email processing pipeline: %s", str(e))
@@ -130,13 +581,16 @@ async def process_emails() -> None:
 
 async def scheduled_execution() -> None:
     """Execute the email processing task on a scheduled interval."""
-    while True:
-        try:
-            await process_emails()
-        except Exception as e:
-            logger.error("Error in scheduled execution: %s", str(e))
+    try:
+        while True:
+            try:
+                await process_emails()
+            except Exception as e:
+                logger.error("Error in scheduled execution: %s", str(e))
 
-        await asyncio.sleep(settings.processing_interval_seconds)
+            await asyncio.sleep(settings.processing_interval_seconds)
+    finally:
+        GmailService.close_shared()
 
 
 def main() -> None:
@@ -0,0 +1,18 @@
+from typing import Dict, List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+class ActionItem(BaseModel):
+    description: str
+    deadline: Optional[str] = None
+    follow_up: bool = False
+
+
+class EmailAnalysis(BaseModel):
+    summary: str
+    priority: Literal["High", "Medium", "Low"]
+    priority_reason: str
+    action_items: List[ActionItem] = Field(default_factory=list)
+    reply_suggestion: Optional[str] = None
+    template_fields: Dict[str, str] = Field(default_factory=dict)
@@ -13,9 +13,13 @@ def email_to_notion_data(email: EmailData) -> Dict[str, Any]:
         email: EmailData instance to convert
 
     Returns:
-        Dict containing Notion-compatible data format with title and content only
+        Dict containing Notion-compatible data format with title, content and
+        the email metadata stored as database properties
     """
     return {
         "title": email.subject,  # タイトルにメールの件名を使用
         "content": email.content,  # 本文に要約を使用
+        "message_id": email.message_id,  # 再処理時に重複ページを作らないためのキー
+        "sender": email.sender,
+        "received_at": email.received_at.isoformat(),
     }
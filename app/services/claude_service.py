@@ -1,59 +1,701 @@
 """Service for interfacing with Claude API."""
 
+import asyncio
+import hashlib
+import json
 import logging
+import math
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
-from anthropic import Anthropic
-from anthropic.types import Message
+from anthropic import AsyncAnthropic
+from anthropic.types import Message, ToolUseBlock
+from anthropic.types.message_create_params import MessageCreateParamsNonStreaming
 
+from app.config import settings
+from app.models.analysis import EmailAnalysis
 from app.utils.error_handler import handle_errors
+from app.utils.language_detector import JAPANESE, NON_TEXT, detect_language
+from app.utils.summary_cache import SummaryCache, cache_key
+from app.utils.text_chunker import (
+    PARAGRAPH_SEPARATOR,
+    chunk_segments,
+    chunk_text,
+    estimate_tokens,
+)
+from app.utils.translation_memory import (
+    TranslationMemory,
+    join_segments,
+    needs_translation,
+    split_segments,
+)
 
 logger = logging.getLogger(__name__)
 
+TRANSLATION_PROMPT = (
+    "# 指示\n"
+    "あなたはプロの翻訳者です。以下の英文を完全な形で日本語に翻訳してください。\n\n"
+    "# 重要な注意点\n"
+    "- 文章を省略せず、全文を翻訳すること\n"
+    "- 要約や省略をせず、原文の内容を完全に翻訳すること\n"
+    "- [Note: ...] のような注釈は付けないこと\n"
+    "- 翻訳文のみを出力すること\n\n"
+    "# 原文\n"
+    "ユーザーメッセージとして渡される英文を原文とします。\n"
+)
+# Changing the prompt text changes the version, which invalidates cached summaries
+PROMPT_VERSION = hashlib.sha256(TRANSLATION_PROMPT.encode("utf-8")).hexdigest()[:16]
+
+SUMMARY_PROMPT = (
+    "# 指示\n"
+    "ユーザーメッセージとして渡される日本語のメールを、"
+    "要点を漏らさず簡潔に日本語で要約してください。\n\n"
+    "# 重要な注意点\n"
+    "- 日時・金額・固有名詞・依頼事項は省略しないこと\n"
+    "- 要約文のみを出力すること\n"
+)
+SUMMARY_PROMPT_VERSION = hashlib.sha256(SUMMARY_PROMPT.encode("utf-8")).hexdigest()[:16]
+
+SEGMENT_TOOL = "record_translations"
+SEGMENT_PROMPT = (
+    "# 指示\n"
+    "あなたはプロの翻訳者です。ユーザーメッセージとして渡されるJSON配列の"
+    f"各英文を日本語に翻訳し、{SEGMENT_TOOL}ツールで記録してください。\n\n"
+    "# 重要な注意点\n"
+    "- 配列の要素ごとに訳文を1つ、同じ順序・同じ件数で返すこと\n"
+    "- 要素を結合・分割・省略しないこと\n"
+    "- URLや固有名詞はそのまま残すこと\n"
+    "- [Note: ...] のような注釈は付けないこと\n"
+)
+SEGMENT_PROMPT_VERSION = hashlib.sha256(SEGMENT_PROMPT.encode("utf-8")).hexdigest()[:16]
+
+ANALYSIS_PROMPT = (
+    "# 指示\n"
+    "ユーザーメッセージとして渡されるメールを分析し、"
+    "record_analysisツールで結果を日本語で記録してください。\n\n"
+    "- summary: 要約（100文字程度）\n"
+    "- priority: 優先度（High/Medium/Low）\n"
+    "- priority_reason: 優先度の理由\n"
+    "- action_items: アクションアイテム。期限があればdeadlineに記載し、"
+    "フォローアップが必要な事項はfollow_upをtrueにすること\n"
+)
+# Template-specific sections, returned as ``template_fields`` keyed by heading
+ANALYSIS_TEMPLATES: Dict[str, List[str]] = {
+    "meeting_summary": ["会議概要", "準備事項", "アジェンダ要点", "参加者のアクション"],
+    "project_update": [
+        "プロジェクト状況サマリー",
+        "マイルストーン状況",
+        "リスクと課題",
+        "次のステップ",
+    ],
+    "customer_inquiry": [
+        "問い合わせ内容の要約",
+        "優先度判定",
+        "必要な対応",
+        "返信案のポイント",
+    ],
+}
+ANALYSIS_TOOL = "record_analysis"
+
+USAGE_FIELDS = (
+    "input_tokens",
+    "output_tokens",
+    "cache_creation_input_tokens",
+    "cache_read_input_tokens",
+)
+
 
 class ClaudeService:
     """Service for generating summaries using Claude API."""
 
-    def __init__(self, api_token: str) -> None:
+    def __init__(
+        self,
+        api_token: str,
+        max_concurrency: Optional[int] = None,
+        cache: Optional[SummaryCache] = None,
+        memory: Optional[TranslationMemory] = None,
+    ) -> None:
         """
         Initialize Claude service.
 
+        Requests go through the async client, so several emails can be
+        translated at once; at most ``max_concurrency`` requests are in flight.
+
         Args:
             api_token: Claude API token
+            max_concurrency: Maximum concurrent requests, defaults to
+                ``settings.claude_max_concurrency``
+            cache: Summary cache checked before calling the API
+            memory: Sentence-level translation memory; when set,
+                ``generate_summary`` only sends segments it has not seen
+        """
+        self.client = AsyncAnthropic(api_key=api_token)
+        self._semaphore = asyncio.Semaphore(
+            max(1, max_concurrency or settings.claude_max_concurrency)
+        )
+        self.cache = cache
+        self.memory = memory
+        # Token counts reported in ``usage``, summed over this service's calls
+        self.usage: Dict[str, int] = dict.fromkeys(USAGE_FIELDS, 0)
+        # Emails answered locally because they needed no translation
+        self.avoided_calls = 0
+
+    def close(self) -> None:
+        """Log cache and token statistics and close the summary cache."""
+        logger.info(
+            "Claude usage: %d input, %d output, %d cache write, %d cache read tokens",
+            *(self.usage[field] for field in USAGE_FIELDS),
+        )
+        logger.info("Skipped translation of %d emails", self.avoided_calls)
+        if self.cache is not None:
+            logger.info(
+                "Summary cache: %d hits, %d misses",
+                self.cache.hits,
+                self.cache.misses,
+            )
+            self.cache.close()
+            self.cache = None
+        if self.memory is not None:
+            logger.info(
+                "Translation memory: %d hits, %d misses (%.0f%% reused)",
+                self.memory.hits,
+                self.memory.misses,
+                self.memory.hit_rate * 100,
+            )
+            self.memory.close()
+            self.memory = None
+
+    @staticmethod
+    def route(text: str) -> Tuple[str, int]:
         """
-        self.client = Anthropic(api_key=api_token)
+        Pick the model and ``max_tokens`` for translating ``text``.
+
+        The input size is estimated locally and looked up in
+        ``settings.claude_model_routes``; ``max_tokens`` is sized from the
+        estimate, so short emails neither wait for nor pay for a large limit.
+
+        Args:
+            text: Text to translate
+
+        Returns:
+            Tuple of (model name, max_tokens)
+        """
+        input_tokens = estimate_tokens(text)
+        for route in settings.claude_model_routes:
+            if input_tokens <= route.max_input_tokens:
+                model, limit = route.model, route.max_output_tokens
+                break
+        else:
+            model = settings.claude_default_model
+            limit = settings.claude_default_max_output_tokens
+        wanted = math.ceil(input_tokens * settings.claude_output_token_ratio)
+        return model, min(limit, max(settings.claude_min_output_tokens, wanted))
+
+    def _request_params(
+        self, text: str, prompt: str = TRANSLATION_PROMPT
+    ) -> MessageCreateParamsNonStreaming:
+        """Build the Messages API parameters for translating ``text``."""
+        model, max_tokens = self.route(text)
+        logger.info(
+            "Routing ~%d input tokens to %s with max_tokens=%d",
+            estimate_tokens(text),
+            model,
+            max_tokens,
+        )
+        return {
+            "max_tokens": max_tokens,
+            "model": model,
+            # 固定の指示はキャッシュ可能なsystemプレフィックスに置く
+            "system": [
+                {
+                    "type": "text",
+                    "text": prompt,
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ],
+            "messages": [{"role": "user", "content": text}],
+        }
+
+    def _record_usage(self, message: Message) -> None:
+        """Add the token counts of one response to ``self.usage``."""
+        for field in USAGE_FIELDS:
+            self.usage[field] += getattr(message.usage, field, None) or 0
+
+    @staticmethod
+    def _message_text(message: Message) -> Optional[str]:
+        """Return the text of the first content block, if any."""
+        if message.content and len(message.content) > 0:
+            content = message.content[0]
+            if hasattr(content, "text"):
+                return str(content.text)
+        return None
+
+    def _cached(self, text: str, version: Optional[str] = None) -> Optional[str]:
+        if self.cache is None:
+            return None
+        key = cache_key(text, version or PROMPT_VERSION, self.route(text)[0])
+        return self.cache.get(key)
+
+    def _store(self, text: str, summary: str, version: Optional[str] = None) -> None:
+        if self.cache is not None:
+            key = cache_key(text, version or PROMPT_VERSION, self.route(text)[0])
+            self.cache.set(key, summary)
+
+    def _passthrough(self, language: str) -> bool:
+        """
+        Whether an email goes to Notion as-is, without calling the API.
+
+        Non-text bodies always do; Japanese ones do unless
+        ``settings.japanese_email_mode`` asks for a summary.
+
+        Args:
+            language: Result of ``detect_language`` for the email body
+
+        Returns:
+            True if the API call is skipped; counted in ``avoided_calls``
+        """
+        if language == NON_TEXT or (
+            language == JAPANESE and settings.japanese_email_mode == "passthrough"
+        ):
+            logger.info("Skipping translation of %s email", language)
+            self.avoided_calls += 1
+            return True
+        return False
+
+    async def _answer_locally(self, text: str) -> Optional[str]:
+        """
+        Answer without translating, when the email allows it.
+
+        Args:
+            text: Email body
+
+        Returns:
+            The body itself, a Japanese summary or a cached translation;
+            None if the body has to be translated
+        """
+        # 既に日本語のメールや本文のないメールは翻訳しない
+        language = detect_language(text)
+        if self._passthrough(language):
+            return text
+        if language == JAPANESE:
+            return await self._summarize_japanese(text) or "No summary generated"
+        return self._cached(text)
+
+    async def _summarize_japanese(self, text: str) -> Optional[str]:
+        """Summarize a Japanese email instead of translating it."""
+        cached = self._cached(text, SUMMARY_PROMPT_VERSION)
+        if cached is not None:
+            return cached
+        summary = await self._translate(text, prompt=SUMMARY_PROMPT)
+        if summary:
+            self._store(text, summary, SUMMARY_PROMPT_VERSION)
+        return summary
 
     @handle_errors
     async def generate_summary(self, text: str) -> str:
         """
         Generate a summary of the provided text.
 
+        The body's language is detected locally first: non-text and, by
+        default, Japanese bodies are returned as-is without an API call.
+
         Args:
             text: Text to summarize
 
         Returns:
             Generated summary text
         """
-        prompt = (
-            "# 指示\n"
-            "あなたはプロの翻訳者です。以下の英文を完全な形で日本語に翻訳してください。\n\n"
-            "# 重要な注意点\n"
-            "- 文章を省略せず、全文を翻訳すること\n"
-            "- 要約や省略をせず、原文の内容を完全に翻訳すること\n"
-            "- [Note: ...] のような注釈は付けないこと\n"
-            "- 翻訳文のみを出力すること\n\n"
-            "# 原文\n"
-            f"{text}"
+        answer = await self._answer_locally(text)
+        if answer is not None:
+            return answer
+
+        if self.memory is not None:
+            summary = await self._translate_segments(text, self.memory)
+        else:
+            summary = await self._translate_chunks(text)
+        if not summary:
+            return "No summary generated"
+
+        self._store(text, summary)
+        return summary
+
+    async def _translate_chunks(self, text: str) -> str:
+        """Translate ``text`` as paragraph chunks in parallel."""
+        # 長文は段落単位で分割して並列に翻訳し、元の順序で結合する
+        chunks = chunk_text(text, settings.claude_chunk_tokens)
+        parts = await asyncio.gather(*(self._translate(chunk) for chunk in chunks))
+        return PARAGRAPH_SEPARATOR.join(part for part in parts if part)
+
+    async def _translate_segments(self, text: str, memory: TranslationMemory) -> str:
+        """
+        Translate ``text`` sentence by sentence through the translation memory.
+
+        Segments already in memory are reused; the rest are sent in groups of
+        at most ``claude_chunk_tokens`` and stored. Translations are merged
+        back in document order. If a group comes back incomplete, the whole
+        text is translated in chunks instead.
+
+        Args:
+            text: Text to translate
+            memory: Translation memory to read and fill
+
+        Returns:
+            Translated text
+        """
+        segments = split_segments(text)
+        wanted = list(
+            dict.fromkeys(
+                segment for segment, _ in segments if needs_translation(segment)
+            )
+        )
+        known = memory.get_many(wanted, SEGMENT_PROMPT_VERSION)
+        missing = [segment for segment in wanted if segment not in known]
+        logger.info(
+            "Translation memory reused %d of %d segments",
+            len(wanted) - len(missing),
+            len(wanted),
         )
 
-        message: Message = self.client.messages.create(
-            max_tokens=8192,
-            model="claude-3-5-sonnet-20241022",
-            messages=[{"role": "user", "content": prompt}],
+        groups = chunk_segments(missing, settings.claude_chunk_tokens)
+        results = await asyncio.gather(
+            *(self._translate_group(group) for group in groups)
+        )
+        for group, translations in zip(groups, results):
+            if translations is not None:
+                new = dict(zip(group, translations))
+                memory.set_many(new, SEGMENT_PROMPT_VERSION)
+                known.update(new)
+        if len(known) < len(wanted):
+            logger.warning("Segment translation incomplete, translating in chunks")
+            return await self._translate_chunks(text)
+        return join_segments(
+            [
+                (known.get(segment, segment), separator)
+                for segment, separator in segments
+            ]
         )
 
-        if message.content and len(message.content) > 0:
-            content = message.content[0]
-            if hasattr(content, "text"):
-                return content.text
+    async def _translate_group(self, segments: List[str]) -> Optional[List[str]]:
+        """
+        Translate a group of segments with one tool-forced request.
+
+        Args:
+            segments: Source segments
+
+        Returns:
+            One translation per segment, or None if the reply does not match
+        """
+        content = json.dumps(segments, ensure_ascii=False)
+        model, max_tokens = self.route(content)
+        async with self._semaphore:
+            message: Message = await self.client.messages.create(
+                max_tokens=max_tokens,
+                model=model,
+                system=[
+                    {
+                        "type": "text",
+                        "text": SEGMENT_PROMPT,
+                        "cache_control": {"type": "ephemeral"},
+                    }
+                ],
+                messages=[{"role": "user", "content": content}],
+                tools=[
+                    {
+                        "name": SEGMENT_TOOL,
+                        "description": "Record one translation per input segment.",
+                        "input_schema": {
+                            "type": "object",
+                            "properties": {
+                                "translations": {
+                                    "type": "array",
+                                    "items": {"type": "string"},
+                                }
+                            },
+                            "required": ["translations"],
+                        },
+                    }
+                ],
+                tool_choice={"type": "tool", "name": SEGMENT_TOOL},
+            )
+        self._record_usage(message)
+
+        for block in message.content:
+            if isinstance(block, ToolUseBlock) and message.stop_reason != "max_tokens":
+                translations = (block.input or {}).get("translations")
+                if (
+                    isinstance(translations, list)
+                    and len(translations) == len(segments)
+                    and all(isinstance(item, str) for item in translations)
+                ):
+                    return translations
+        logger.warning("Expected %d segment translations", len(segments))
+        return None
+
+    async def stream_summary(self, text: str) -> AsyncIterator[str]:
+        """
+        Generate a summary of the provided text incrementally.
+
+        The first chunk is streamed from the Messages API as it is generated.
+        The remaining chunks of a long email are translated concurrently in
+        the meantime and yielded in order once the stream reaches them.
+
+        Args:
+            text: Text to summarize
+
+        Yields:
+            Consecutive pieces of the summary text
+        """
+        answer = await self._answer_locally(text)
+        if answer is not None:
+            yield answer
+            return
+
+        chunks = chunk_text(text, settings.claude_chunk_tokens)
+        if not chunks:
+            return
+
+        parts: List[str] = []
+        rest: List["asyncio.Task[Optional[str]]"] = []
+        try:
+            output = ""
+            params = self._request_params(chunks[0])
+            async with self._semaphore:
+                async with self.client.messages.stream(
+                    max_tokens=params["max_tokens"],
+                    model=params["model"],
+                    system=params["system"],
+                    messages=params["messages"],
+                ) as stream:
+                    # Start the other chunks once the stream holds its slot
+                    rest = [
+                        asyncio.create_task(self._translate(chunk))
+                        for chunk in chunks[1:]
+                    ]
+                    async for delta in stream.text_stream:
+                        output += delta
+                        yield delta
+                    message = await stream.get_final_message()
+            self._record_usage(message)
+
+            if message.stop_reason == "max_tokens":
+                prefill = output.rstrip()
+                output = await self._translate(chunks[0], prefill) or prefill
+                yield output[len(prefill) :]
+            parts.append(output)
 
-        return "No summary generated"
+            for task in rest:
+                part = await task
+                if part:
+                    yield PARAGRAPH_SEPARATOR + part if any(parts) else part
+                    parts.append(part)
+        finally:
+            for task in rest:
+                task.cancel()
+
+        if any(parts):
+            self._store(text, PARAGRAPH_SEPARATOR.join(part for part in parts if part))
+
+    async def _translate(
+        self, text: str, output: str = "", prompt: str = TRANSLATION_PROMPT
+    ) -> Optional[str]:
+        """
+        Translate one chunk, continuing replies cut off at ``max_tokens``.
+
+        A truncated reply is sent back as an assistant prefill so the model
+        picks up where it stopped, at most ``claude_max_continuations`` times.
+
+        Args:
+            text: Chunk to translate
+            output: Partial translation to continue from
+            prompt: System prompt, ``TRANSLATION_PROMPT`` by default
+
+        Returns:
+            Translated text, or None if the model returned no text
+        """
+        params = self._request_params(text, prompt)
+        for _ in range(settings.claude_max_continuations + 1):
+            if output:
+                # Prefills must not end with whitespace
+                output = output.rstrip()
+                params["messages"] = [
+                    {"role": "user", "content": text},
+                    {"role": "assistant", "content": output},
+                ]
+            async with self._semaphore:
+                message: Message = await self.client.messages.create(**params)
+            self._record_usage(message)
+            output += self._message_text(message) or ""
+            if message.stop_reason != "max_tokens":
+                break
+        else:
+            logger.warning(
+                "Translation still truncated after %d continuations",
+                settings.claude_max_continuations,
+            )
+        return output or None
+
+    def _batch_pending(
+        self, texts: Dict[str, str], summaries: Dict[str, str]
+    ) -> Dict[str, str]:
+        """
+        Pick the texts to submit in a batch, answering the others locally.
+
+        Args:
+            texts: Texts to summarize keyed by ID
+            summaries: Filled with pass-through bodies and cached summaries
+
+        Returns:
+            English texts short enough for one request, keyed by ID
+        """
+        pending: Dict[str, str] = {}
+        for custom_id, text in texts.items():
+            language = detect_language(text)
+            if self._passthrough(language):
+                summaries[custom_id] = text
+            elif (cached := self._cached(text)) is not None:
+                summaries[custom_id] = cached
+            elif (
+                language != JAPANESE
+                and estimate_tokens(text) <= settings.claude_chunk_tokens
+            ):
+                pending[custom_id] = text
+        return pending
+
+    @handle_errors
+    async def generate_summaries_batch(self, texts: Dict[str, str]) -> Dict[str, str]:
+        """
+        Generate summaries for many texts with one Message Batch.
+
+        Cached texts are answered locally and the rest are submitted as a
+        single batch whose ``custom_id`` is the caller's key. The batch is
+        polled with exponential backoff until it ends. Texts too long for one
+        chunk, and Japanese texts to be summarized, are left to
+        ``generate_summary``.
+
+        Args:
+            texts: Texts to summarize keyed by ID (e.g. Gmail message ID)
+
+        Returns:
+            Summaries keyed by the same IDs; IDs whose request failed in the
+            batch are missing and should be retried with ``generate_summary``
+        """
+        summaries: Dict[str, str] = {}
+        pending = self._batch_pending(texts, summaries)
+        if not pending:
+            return summaries
+
+        batch = await self.client.messages.batches.create(
+            requests=[
+                {"custom_id": custom_id, "params": self._request_params(text)}
+                for custom_id, text in pending.items()
+            ]
+        )
+        logger.info("Submitted message batch %s (%d requests)", batch.id, len(pending))
+
+        delay = settings.claude_batch_poll_seconds
+        while batch.processing_status != "ended":
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, settings.claude_batch_poll_max_seconds)
+            batch = await self.client.messages.batches.retrieve(batch.id)
+
+        async for entry in await self.client.messages.batches.results(batch.id):
+            if entry.result.type != "succeeded" or entry.custom_id not in pending:
+                logger.warning(
+                    "Batch request %s did not succeed: %s",
+                    entry.custom_id,
+                    entry.result.type,
+                )
+                continue
+            self._record_usage(entry.result.message)
+            if entry.result.message.stop_reason == "max_tokens":
+                continue  # generate_summary continues truncated replies
+            summary = self._message_text(entry.result.message)
+            if summary is not None:
+                summaries[entry.custom_id] = summary
+                self._store(pending[entry.custom_id], summary)
+        return summaries
+
+    @staticmethod
+    def _analysis_prompt(
+        template: Optional[str], include_reply_suggestion: bool
+    ) -> str:
+        """Build the system prompt for ``analyze``."""
+        prompt = ANALYSIS_PROMPT
+        if include_reply_suggestion:
+            prompt += "- reply_suggestion: 返信案（簡潔に）\n"
+        if template is not None:
+            headings = "、".join(ANALYSIS_TEMPLATES[template])
+            prompt += (
+                f"- template_fields: 次の見出しをキーとして内容を記載: {headings}\n"
+            )
+        return prompt
+
+    @handle_errors
+    async def analyze(
+        self,
+        text: str,
+        template: Optional[str] = None,
+        include_reply_suggestion: bool = False,
+    ) -> EmailAnalysis:
+        """
+        Analyze an email in a single request.
+
+        Summary, priority, action items, an optional reply suggestion and the
+        sections of an optional template come back together: the model is
+        forced to call a tool whose input schema is ``EmailAnalysis``, and its
+        input is validated against that model.
+
+        Args:
+            text: Email body to analyze
+            template: Key of ``ANALYSIS_TEMPLATES`` whose sections to fill
+            include_reply_suggestion: Also suggest a reply
+
+        Returns:
+            Validated analysis
+
+        Raises:
+            ValueError: If the template is unknown or the model did not
+                return the analysis
+        """
+        if template is not None and template not in ANALYSIS_TEMPLATES:
+            raise ValueError(f"Template '{template}' not found")
+
+        model, _ = self.route(text)
+        async with self._semaphore:
+            message: Message = await self.client.messages.create(
+                max_tokens=settings.claude_analysis_max_tokens,
+                model=model,
+                system=[
+                    {
+                        "type": "text",
+                        "text": self._analysis_prompt(
+                            template, include_reply_suggestion
+                        ),
+                        "cache_control": {"type": "ephemeral"},
+                    }
+                ],
+                messages=[{"role": "user", "content": text}],
+                tools=[
+                    {
+                        "name": ANALYSIS_TOOL,
+                        "description": "Record the analysis of an email.",
+                        "input_schema": EmailAnalysis.model_json_schema(),
+                    }
+                ],
+                tool_choice={"type": "tool", "name": ANALYSIS_TOOL},
+            )
+        self._record_usage(message)
+
+        block = next(
+            (block for block in message.content if isinstance(block, ToolUseBlock)),
+            None,
+        )
+        if block is None:
+            raise ValueError("No analysis returned by Claude")
+        analysis = EmailAnalysis.model_validate(block.input)
+
+        missing = set(ANALYSIS_TEMPLATES.get(template or "", [])) - set(
+            analysis.template_fields
+        )
+        if missing:
+            raise ValueError(f"Analysis is missing template fields: {sorted(missing)}")
+        return analysis
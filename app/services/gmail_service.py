@@ -1,46 +1,212 @@
 """Gmail service for email operations."""
 
-import base64
+import asyncio
+import functools
 import json
 import logging
 import os
 import os.path
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, cast
-
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Callable,
+    ClassVar,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    cast,
+)
+
+import googleapiclient.discovery_cache
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib import flow
-from googleapiclient.discovery import Resource, build
+from googleapiclient.discovery import Resource, build_from_document
+from googleapiclient.errors import HttpError
 
 from app.config import settings
 from app.utils.error_handler import handle_errors
+from app.utils.mime import extract_text_body
 
 logger = logging.getLogger(__name__)
 
 SCOPES = ["https://www.googleapis.com/auth/gmail.modify"]
 TOKEN_FILE = os.getenv("GMAIL_TOKEN_FILE", "token.json")
 CREDENTIALS_FILE = os.getenv("GMAIL_CREDENTIALS_FILE", "credentials.json")
+GMAIL_BATCH_LIMIT = 100  # Maximum number of calls in one Gmail batch request
+GMAIL_PAGE_LIMIT = 500  # Maximum maxResults accepted by messages.list
+GMAIL_BULK_LIMIT = 1000  # Maximum IDs per batchModify/batchDelete request
+
+# Partial-response masks: request only what parse_email and the filters read
+LIST_FIELDS = "messages(id,threadId),nextPageToken"
+HISTORY_FIELDS = "history(messagesAdded/message/id),historyId,nextPageToken"
+METADATA_HEADERS = ["Subject", "From", "Date"]
+METADATA_FIELDS = "id,threadId,labelIds,payload/headers"
+FULL_FIELDS = "id,threadId,labelIds,payload"
+
+R = TypeVar("R")
+
+
+@functools.lru_cache(maxsize=1)
+def _discovery_document() -> Dict[str, Any]:
+    """Load the Gmail discovery document bundled with googleapiclient once."""
+    document = googleapiclient.discovery_cache.get_static_doc("gmail", "v1")
+    if document is None:
+        raise ValueError("Bundled Gmail discovery document not found")
+    return cast(Dict[str, Any], json.loads(document))
 
 
 class GmailService:
     """Service for Gmail API operations."""
 
+    _shared: ClassVar[Optional["GmailService"]] = None
+    _shared_lock: ClassVar[threading.Lock] = threading.Lock()
+
     def __init__(
-        self, token_path: Optional[str] = None, credentials_path: Optional[str] = None
+        self,
+        token_path: Optional[str] = None,
+        credentials_path: Optional[str] = None,
+        max_workers: Optional[int] = None,
     ) -> None:
         """Initialize Gmail service with authentication.
 
+        Gmail calls are blocking, so they run on a thread pool and every worker
+        thread gets its own Resource (httplib2.Http is not thread-safe).
+
         Args:
             token_path: Optional custom path for token file
             credentials_path: Optional custom path for credentials file
+            max_workers: Optional thread pool size, defaults to
+                settings.gmail_max_workers
         """
         self.token_path = token_path or TOKEN_FILE
         self.credentials_path = credentials_path or CREDENTIALS_FILE
+        self.history_path = settings.gmail_history_file
+        self._pending_history_id: Optional[str] = None
         logger.info("Using token path: %s", self.token_path)
         logger.info("Using credentials path: %s", self.credentials_path)
         self.creds = self._get_credentials()
-        self._service: Resource = build("gmail", "v1", credentials=self.creds)
+        # Every worker builds from the same parsed discovery document, so no
+        # thread fetches or parses it again
+        self._build_service = functools.partial(
+            build_from_document, _discovery_document(), credentials=self.creds
+        )
+        self._refresh_task: Optional[asyncio.Task[None]] = None
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.gmail_max_workers,
+            thread_name_prefix="gmail",
+        )
+        # Build eagerly so that configuration errors surface at startup
+        self._local.service = self._build_service()
+
+    @property
+    def _service(self) -> Resource:
+        """Gmail API resource owned by the calling thread.
+
+        Each thread lazily builds and keeps its own Resource, so the blocking
+        helpers below may run on any pool thread without sharing an
+        httplib2.Http. Never hand a Resource from one thread to another.
+        """
+        service = getattr(self._local, "service", None)
+        if service is None:
+            service = self._build_service()
+            self._local.service = service
+        return service
+
+    async def _run(self, func: Callable[..., R], *args: Any, **kwargs: Any) -> R:
+        """Run a blocking Gmail call on the worker pool.
+
+        Args:
+            func: Blocking callable to run
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            The return value of func
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
+
+    @classmethod
+    def shared(cls) -> "GmailService":
+        """
+        Get the process-wide service instance, creating it on first use.
+
+        Returns:
+            GmailService shared by every processing cycle
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @classmethod
+    def close_shared(cls) -> None:
+        """Close and forget the process-wide service instance."""
+        with cls._shared_lock:
+            shared, cls._shared = cls._shared, None
+        if shared is not None:
+            shared.close()
+
+    def close(self) -> None:
+        """Shut down the worker pool, waiting for in-flight Gmail calls."""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+        self._executor.shutdown(wait=True)
+
+    def start_token_refresh(self) -> None:
+        """Start refreshing the access token in the background before it expires.
+
+        Safe to call repeatedly; only one refresh task runs at a time.
+        """
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.get_running_loop().create_task(
+                self._refresh_token_loop()
+            )
+
+    async def _refresh_token_loop(self) -> None:
+        """Refresh credentials settings.gmail_token_refresh_margin_seconds early."""
+        if not getattr(self.creds, "refresh_token", None):
+            return
+
+        while True:
+            expiry = getattr(self.creds, "expiry", None)
+            if expiry is not None:
+                # google-auth keeps expiry as a naive UTC datetime
+                now = datetime.now(timezone.utc).replace(tzinfo=None)
+                delay = (expiry - now).total_seconds()
+                await asyncio.sleep(
+                    max(0.0, delay - settings.gmail_token_refresh_margin_seconds)
+                )
+            try:
+                await self._run(self._refresh_credentials)
+            except Exception as e:
+                logger.error("Error refreshing Gmail credentials: %s", str(e))
+                await asyncio.sleep(settings.RETRY_DELAY)
+                continue
+            if getattr(self.creds, "expiry", None) is None:
+                return
+
+    def _refresh_credentials(self) -> None:
+        """Refresh the access token and persist it."""
+        self.creds.refresh(Request())
+        self._save_credentials(self.creds)
+        logger.info("Refreshed Gmail credentials, expiring at %s", self.creds.expiry)
+
+    @staticmethod
+    def _batch_size(batch_size: Optional[int]) -> int:
+        """Resolve a batch size within the limits accepted by Gmail."""
+        return max(1, min(batch_size or settings.gmail_batch_size, GMAIL_BATCH_LIMIT))
 
     def _save_credentials(self, creds: Credentials) -> None:
         """Save credentials to a JSON file.
@@ -55,6 +221,7 @@ class GmailService:
             "client_id": creds.client_id,
             "client_secret": creds.client_secret,
             "scopes": creds.scopes,
+            "expiry": creds.expiry.isoformat() if creds.expiry else None,
         }
         with open(self.token_path, "w", encoding="utf-8") as f:
             json.dump(creds_data, f)
@@ -79,8 +246,13 @@ class GmailService:
                 client_id=creds_data["client_id"],
                 client_secret=creds_data["client_secret"],
                 scopes=creds_data["scopes"],
+                expiry=(
+                    datetime.fromisoformat(creds_data["expiry"])
+                    if creds_data.get("expiry")
+                    else None
+                ),
             )
-        except (FileNotFoundError, json.JSONDecodeError, KeyError) as e:
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, ValueError) as e:
             logger.error("Failed to load credentials: %s", str(e))
             return None
 
@@ -116,12 +288,324 @@ class GmailService:
             logger.error("Error obtaining credentials: %s", str(e))
             raise ValueError("Failed to obtain valid credentials") from e
 
+    def _batch_get(
+        self, message_ids: List[str], batch_size: int, **params: Any
+    ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Exception]]:
+        """
+        Run messages.get for many IDs through the Gmail batch endpoint.
+
+        Args:
+            message_ids: IDs of the messages to fetch
+            batch_size: Calls per batch request
+            **params: Extra messages.get parameters such as format
+
+        Returns:
+            Tuple of raw message resources and errors, both keyed by message ID
+        """
+        # Cast to Any to handle dynamic attributes of the Gmail service
+        gmail_service = cast(Any, self._service)
+        messages_service = gmail_service.users().messages()
+
+        raw_messages: Dict[str, Dict[str, Any]] = {}
+        errors: Dict[str, Exception] = {}
+
+        def on_response(
+            request_id: str, response: Dict[str, Any], exception: Optional[Exception]
+        ) -> None:
+            if exception is not None:
+                errors[request_id] = exception
+            else:
+                raw_messages[request_id] = response
+
+        for start in range(0, len(message_ids), batch_size):
+            chunk = message_ids[start : start + batch_size]
+            batch = gmail_service.new_batch_http_request(callback=on_response)
+            for message_id in chunk:
+                batch.add(
+                    messages_service.get(userId="me", id=message_id, **params),
+                    request_id=message_id,
+                )
+            try:
+                batch.execute()
+            except Exception as e:
+                # The whole batch failed; blame every message in it and go on
+                for message_id in chunk:
+                    if message_id not in raw_messages:
+                        errors.setdefault(message_id, e)
+
+        return raw_messages, errors
+
+    def _passes_filter(
+        self,
+        message: Dict[str, Any],
+        exclude_ids: Optional[Set[str]],
+        match_filter: bool,
+    ) -> bool:
+        """Check a raw or metadata-only message against the fetch filters."""
+        if exclude_ids and message["id"] in exclude_ids:
+            return False
+        if not match_filter:
+            return True
+        subject = next(
+            (
+                header["value"]
+                for header in message.get("payload", {}).get("headers", [])
+                if header["name"].lower() == "subject"
+            ),
+            "",
+        )
+        return (
+            "INBOX" in message.get("labelIds", [])
+            and settings.email_subject_filter.lower() in subject.lower()
+        )
+
+    def get_messages(
+        self,
+        message_ids: List[str],
+        batch_size: Optional[int] = None,
+        exclude_ids: Optional[Set[str]] = None,
+        match_filter: bool = False,
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Exception]]:
+        """
+        Fetch and parse messages through the Gmail batch endpoint.
+
+        Messages are requested ``batch_size`` at a time, so N messages cost
+        ceil(N / batch_size) round trips instead of N. When there is something
+        to filter on, a cheap ``format=metadata`` pass runs first and only the
+        surviving messages are fetched in full. This call blocks and uses the
+        calling thread's Resource; async code should use fetch_messages, which
+        runs it on the worker pool.
+
+        Args:
+            message_ids: IDs of the messages to fetch
+            batch_size: Calls per batch request, defaults to settings.gmail_batch_size
+            exclude_ids: Optional IDs already processed, which are skipped
+            match_filter: Skip messages outside the inbox or whose subject does
+                not contain settings.email_subject_filter
+
+        Returns:
+            Tuple of parsed emails in the order of message_ids and a mapping of
+            message ID to the error raised for each message that failed
+        """
+        size = self._batch_size(batch_size)
+        message_ids = list(dict.fromkeys(message_ids))
+        errors: Dict[str, Exception] = {}
+
+        if settings.gmail_two_phase_fetch and match_filter:
+            metadata, errors = self._batch_get(
+                message_ids,
+                size,
+                format="metadata",
+                metadataHeaders=METADATA_HEADERS,
+                fields=METADATA_FIELDS,
+            )
+            message_ids = [
+                message_id
+                for message_id in message_ids
+                if message_id in metadata
+                and self._passes_filter(metadata[message_id], exclude_ids, True)
+            ]
+        elif exclude_ids:
+            message_ids = [
+                message_id
+                for message_id in message_ids
+                if message_id not in exclude_ids
+            ]
+
+        raw_messages, full_errors = self._batch_get(
+            message_ids, size, format="full", fields=FULL_FIELDS
+        )
+        errors.update(full_errors)
+        if match_filter:
+            message_ids = [
+                message_id
+                for message_id in message_ids
+                if message_id not in raw_messages
+                or self._passes_filter(raw_messages[message_id], None, True)
+            ]
+
+        emails = []
+        for message_id in message_ids:
+            if message_id not in raw_messages:
+                continue
+            try:
+                emails.append(self.parse_email(raw_messages[message_id]))
+            except Exception as e:
+                errors[message_id] = e
+
+        return emails, errors
+
+    async def fetch_messages(
+        self,
+        message_ids: List[str],
+        batch_size: Optional[int] = None,
+        exclude_ids: Optional[Set[str]] = None,
+        match_filter: bool = False,
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Exception]]:
+        """
+        Fetch and parse messages, running batch requests concurrently on the pool.
+
+        Args:
+            message_ids: IDs of the messages to fetch
+            batch_size: Calls per batch request, defaults to settings.gmail_batch_size
+            exclude_ids: Optional IDs already processed, which are skipped
+            match_filter: Skip messages that do not match the subject filter
+
+        Returns:
+            Tuple of parsed emails in the order of message_ids and a mapping of
+            message ID to the error raised for each message that failed
+        """
+        size = self._batch_size(batch_size)
+        results = await asyncio.gather(
+            *(
+                self._run(
+                    self.get_messages,
+                    message_ids[start : start + size],
+                    size,
+                    exclude_ids,
+                    match_filter,
+                )
+                for start in range(0, len(message_ids), size)
+            )
+        )
+
+        emails: List[Dict[str, Any]] = []
+        errors: Dict[str, Exception] = {}
+        for chunk_emails, chunk_errors in results:
+            emails.extend(chunk_emails)
+            errors.update(chunk_errors)
+        return emails, errors
+
+    def _list_messages(
+        self,
+        query: str,
+        max_results: int,
+        label_ids: Optional[List[str]],
+        page_token: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """List one page of messages matching a search query."""
+        # Cast to Any to handle dynamic attributes of the Gmail service
+        gmail_service = cast(Any, self._service)
+        return cast(
+            Dict[str, Any],
+            gmail_service.users()
+            .messages()
+            .list(
+                userId="me",
+                q=query,
+                maxResults=min(max_results, GMAIL_PAGE_LIMIT),
+                labelIds=label_ids,
+                pageToken=page_token,
+                fields=LIST_FIELDS,
+            )
+            .execute(),
+        )
+
+    def _build_query(self, hours: int) -> str:
+        """Build the search query for mail received in the last ``hours``."""
+        return (
+            f'subject:"{settings.email_subject_filter}" '
+            f"after:{int((datetime.now() - timedelta(hours=hours)).timestamp())} "
+            f"in:inbox"
+        )
+
+    async def _iter_message_ids(
+        self,
+        query: str,
+        max_results: Optional[int],
+        label_ids: Optional[List[str]],
+    ) -> AsyncIterator[List[str]]:
+        """Yield pages of matching message IDs, following nextPageToken."""
+        remaining = max_results
+        page_token: Optional[str] = None
+        while remaining is None or remaining > 0:
+            page_size = settings.gmail_page_size
+            if remaining is not None:
+                page_size = min(page_size, remaining)
+            response = await self._run(
+                self._list_messages, query, page_size, label_ids, page_token
+            )
+            message_ids = [message["id"] for message in response.get("messages", [])]
+            if remaining is not None:
+                message_ids = message_ids[:remaining]
+                remaining -= len(message_ids)
+            if message_ids:
+                yield message_ids
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return
+
+    async def iter_emails(
+        self,
+        hours: int = 24,
+        max_results: Optional[int] = None,
+        label_ids: Optional[List[str]] = None,
+        batch_size: Optional[int] = None,
+        prefetch: Optional[int] = None,
+        exclude_ids: Optional[Set[str]] = None,
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Stream recent emails, fetching pages and batches lazily.
+
+        A background task lists pages and fetches one batch at a time, and
+        stops once ``prefetch`` parsed emails are waiting, so memory stays
+        bounded however large the backlog is.
+
+        Args:
+            hours: How many hours back to look for emails
+            max_results: Optional cap on the number of emails, None for all
+            label_ids: Optional list of label IDs to filter by
+            batch_size: Optional number of messages fetched per batch request
+            prefetch: Optional number of parsed emails buffered ahead of the
+                consumer, defaults to settings.gmail_prefetch_depth
+            exclude_ids: Optional IDs already processed, which are not fetched
+
+        Yields:
+            Processed email data in list order
+        """
+        query = self._build_query(hours)
+        logger.info("Using query filter: %s", query)
+        size = self._batch_size(batch_size)
+        queue: asyncio.Queue[Optional[Dict[str, Any]]] = asyncio.Queue(
+            maxsize=max(1, prefetch or settings.gmail_prefetch_depth)
+        )
+
+        async def produce() -> None:
+            try:
+                async for page in self._iter_message_ids(query, max_results, label_ids):
+                    for start in range(0, len(page), size):
+                        emails, errors = await self._run(
+                            self.get_messages,
+                            page[start : start + size],
+                            size,
+                            exclude_ids,
+                        )
+                        for message_id, error in errors.items():
+                            logger.error(
+                                "Error processing email %s: %s", message_id, str(error)
+                            )
+                        for email in emails:
+                            await queue.put(email)
+            finally:
+                await queue.put(None)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while (email := await queue.get()) is not None:
+                yield email
+            # Surface listing errors raised by the producer
+            await producer
+        finally:
+            producer.cancel()
+
     @handle_errors
     async def fetch_recent_emails(
         self,
         hours: int = 24,
         max_results: int = 10,
         label_ids: Optional[List[str]] = None,
+        batch_size: Optional[int] = None,
+        exclude_ids: Optional[Set[str]] = None,
     ) -> List[Dict[str, Any]]:
         """
         Fetch recent emails from Gmail.
@@ -130,6 +614,8 @@ class GmailService:
             hours: How many hours back to look for emails
             max_results: Maximum number of emails to retrieve
             label_ids: Optional list of label IDs to filter by
+            batch_size: Optional number of messages fetched per batch request
+            exclude_ids: Optional IDs already processed, which are not fetched
 
         Returns:
             List of processed email data
@@ -138,38 +624,22 @@ class GmailService:
             Exception: If there's an error fetching emails
         """
         try:
-            query = (
-                f'subject:"{settings.email_subject_filter}" '
-                f"after:{int((datetime.now() - timedelta(hours=hours)).timestamp())} "
-                f"in:inbox"
-            )
+            query = self._build_query(hours)
             logger.info("Using query filter: %s", query)
 
-            # Cast to Any to handle dynamic attributes of the Gmail service
-            gmail_service = cast(Any, self._service)
-            messages_service = gmail_service.users().messages()
+            message_ids: List[str] = []
+            async for page in self._iter_message_ids(query, max_results, label_ids):
+                message_ids.extend(page)
 
-            response = messages_service.list(
-                userId="me",
-                q=query,
-                maxResults=max_results,
-                labelIds=label_ids,
-            ).execute()
-
-            messages = response.get("messages", [])
-            if not messages:
+            if not message_ids:
                 logger.info("No emails found")
                 return []
 
-            emails = []
-            for message in messages:
-                try:
-                    email_data = messages_service.get(
-                        userId="me", id=message["id"], format="full"
-                    ).execute()
-                    emails.append(self.parse_email(email_data))
-                except Exception as e:
-                    logger.error("Error processing email %s: %s", message["id"], str(e))
+            emails, errors = await self.fetch_messages(
+                message_ids, batch_size=batch_size, exclude_ids=exclude_ids
+            )
+            for message_id, error in errors.items():
+                logger.error("Error processing email %s: %s", message_id, str(error))
 
             logger.info("Successfully fetched %d emails", len(emails))
             return emails
@@ -193,11 +663,7 @@ class GmailService:
             Exception: If there's an error archiving the email
         """
         try:
-            # Cast to Any to handle dynamic attributes of the Gmail service
-            gmail_service = cast(Any, self._service)
-            gmail_service.users().messages().modify(
-                userId="me", id=email_id, body={"removeLabelIds": ["INBOX"]}
-            ).execute()
+            await self._run(self._modify_message, email_id, ["INBOX"])
 
             logger.info("Successfully archived email: %s", email_id)
             return True
@@ -221,9 +687,7 @@ class GmailService:
             Exception: If there's an error deleting the email
         """
         try:
-            # Cast to Any to handle dynamic attributes of the Gmail service
-            gmail_service = cast(Any, self._service)
-            gmail_service.users().messages().delete(userId="me", id=email_id).execute()
+            await self._run(self._delete_message, email_id)
 
             logger.info("Successfully deleted email: %s", email_id)
             return True
@@ -232,6 +696,262 @@ class GmailService:
             logger.error("Error deleting email %s: %s", email_id, str(e))
             return False
 
+    async def _bulk_call(
+        self, func: Callable[[List[str]], None], email_ids: List[str], action: str
+    ) -> Dict[str, bool]:
+        """Run a bulk Gmail call over chunks of IDs and collect per-ID outcomes.
+
+        Args:
+            func: Blocking callable handling one chunk of IDs
+            email_ids: IDs of the emails to act on
+            action: Description of the action for log messages
+
+        Returns:
+            Mapping of email ID to True if its chunk succeeded, False otherwise
+        """
+        unique_ids = list(dict.fromkeys(email_ids))
+        chunks = [
+            unique_ids[start : start + GMAIL_BULK_LIMIT]
+            for start in range(0, len(unique_ids), GMAIL_BULK_LIMIT)
+        ]
+        results = await asyncio.gather(
+            *(self._run(func, chunk) for chunk in chunks), return_exceptions=True
+        )
+
+        outcomes: Dict[str, bool] = {}
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, BaseException):
+                logger.error(
+                    "Error trying to %s %d emails: %s", action, len(chunk), str(result)
+                )
+            outcomes.update(dict.fromkeys(chunk, not isinstance(result, BaseException)))
+
+        logger.info(
+            "Bulk %s succeeded for %d of %d emails",
+            action,
+            sum(outcomes.values()),
+            len(outcomes),
+        )
+        return outcomes
+
+    @handle_errors
+    async def archive_emails(self, email_ids: List[str]) -> Dict[str, bool]:
+        """
+        Archive many emails with messages.batchModify.
+
+        Args:
+            email_ids: IDs of the emails to archive
+
+        Returns:
+            Mapping of email ID to True if archiving was successful
+        """
+        return await self._bulk_call(self._batch_archive, email_ids, "archive")
+
+    @handle_errors
+    async def delete_emails(self, email_ids: List[str]) -> Dict[str, bool]:
+        """
+        Permanently delete many emails with messages.batchDelete.
+
+        Args:
+            email_ids: IDs of the emails to delete
+
+        Returns:
+            Mapping of email ID to True if deletion was successful
+        """
+        return await self._bulk_call(self._batch_delete, email_ids, "delete")
+
+    def _batch_archive(self, email_ids: List[str]) -> None:
+        """Remove the INBOX label from up to GMAIL_BULK_LIMIT messages."""
+        # Cast to Any to handle dynamic attributes of the Gmail service
+        gmail_service = cast(Any, self._service)
+        gmail_service.users().messages().batchModify(
+            userId="me", body={"ids": email_ids, "removeLabelIds": ["INBOX"]}
+        ).execute()
+
+    def _batch_delete(self, email_ids: List[str]) -> None:
+        """Permanently delete up to GMAIL_BULK_LIMIT messages."""
+        # Cast to Any to handle dynamic attributes of the Gmail service
+        gmail_service = cast(Any, self._service)
+        gmail_service.users().messages().batchDelete(
+            userId="me", body={"ids": email_ids}
+        ).execute()
+
+    def _modify_message(self, email_id: str, remove_label_ids: List[str]) -> None:
+        """Remove labels from a single message."""
+        # Cast to Any to handle dynamic attributes of the Gmail service
+        gmail_service = cast(Any, self._service)
+        gmail_service.users().messages().modify(
+            userId="me", id=email_id, body={"removeLabelIds": remove_label_ids}
+        ).execute()
+
+    def _delete_message(self, email_id: str) -> None:
+        """Permanently delete a single message."""
+        # Cast to Any to handle dynamic attributes of the Gmail service
+        gmail_service = cast(Any, self._service)
+        gmail_service.users().messages().delete(userId="me", id=email_id).execute()
+
+    def _load_sync_checkpoint(self) -> Dict[str, Any]:
+        """Load the incremental sync checkpoint.
+
+        Returns:
+            Checkpoint with ``history_id`` and ``retry_ids``, empty if none exists
+        """
+        try:
+            if not os.path.exists(self.history_path):
+                return {}
+
+            with open(self.history_path, "r", encoding="utf-8") as f:
+                checkpoint = json.load(f)
+
+            return {
+                "history_id": str(checkpoint["history_id"]),
+                "retry_ids": list(checkpoint.get("retry_ids", [])),
+            }
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            logger.error("Failed to load sync checkpoint: %s", str(e))
+            return {}
+
+    def commit_sync_checkpoint(self, retry_ids: Optional[List[str]] = None) -> None:
+        """Persist the history ID reached by the last sync_emails call.
+
+        Call this once the synced emails have been processed, so a crash in
+        between replays the same delta instead of losing it.
+
+        Args:
+            retry_ids: IDs of synced emails that failed and must be fetched again
+        """
+        if self._pending_history_id is None:
+            return
+
+        with open(self.history_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "history_id": self._pending_history_id,
+                    "retry_ids": retry_ids or [],
+                },
+                f,
+            )
+        self._pending_history_id = None
+
+    def _get_history_id(self) -> str:
+        """Get the mailbox's current history ID."""
+        # Cast to Any to handle dynamic attributes of the Gmail service
+        gmail_service = cast(Any, self._service)
+        profile = gmail_service.users().getProfile(userId="me").execute()
+        return str(profile["historyId"])
+
+    def _list_history(self, start_history_id: str) -> Tuple[List[str], str]:
+        """List IDs of inbox messages added after a history ID.
+
+        Args:
+            start_history_id: History ID of the last checkpoint
+
+        Returns:
+            Tuple of added message IDs in delivery order and the latest history ID
+
+        Raises:
+            HttpError: With status 404 if start_history_id has expired
+        """
+        # Cast to Any to handle dynamic attributes of the Gmail service
+        gmail_service = cast(Any, self._service)
+        history_service = gmail_service.users().history()
+
+        message_ids: Dict[str, None] = {}
+        latest_history_id = start_history_id
+        page_token: Optional[str] = None
+        while True:
+            response = history_service.list(
+                userId="me",
+                startHistoryId=start_history_id,
+                historyTypes=["messageAdded"],
+                labelId="INBOX",
+                pageToken=page_token,
+                fields=HISTORY_FIELDS,
+            ).execute()
+            for record in response.get("history", []):
+                for added in record.get("messagesAdded", []):
+                    message_ids[added["message"]["id"]] = None
+            latest_history_id = str(response.get("historyId", latest_history_id))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return list(message_ids), latest_history_id
+
+    @handle_errors
+    async def sync_emails(
+        self,
+        hours: int = 24,
+        max_results: int = 10,
+        batch_size: Optional[int] = None,
+        exclude_ids: Optional[Set[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch emails added since the last checkpoint via users.history.list.
+
+        history.list cannot filter by subject, so new messages go through the
+        metadata pass of get_messages and only matching ones are fetched in
+        full. The first sync, and any sync whose checkpoint has expired, falls
+        back to fetch_recent_emails. Call commit_sync_checkpoint after
+        processing.
+
+        Args:
+            hours: Lookback window for the full-query fallback
+            max_results: Maximum number of emails for the full-query fallback
+            batch_size: Optional number of messages fetched per batch request
+            exclude_ids: Optional IDs already processed, which are not fetched
+
+        Returns:
+            List of processed email data
+        """
+        checkpoint = self._load_sync_checkpoint()
+        start_history_id = checkpoint.get("history_id")
+
+        if start_history_id is not None:
+            try:
+                message_ids, history_id = await self._run(
+                    self._list_history, start_history_id
+                )
+            except HttpError as e:
+                if e.resp.status != 404:
+                    raise
+                logger.warning(
+                    "History ID %s expired, falling back to full query",
+                    start_history_id,
+                )
+            else:
+                retry_ids = [
+                    message_id
+                    for message_id in checkpoint["retry_ids"]
+                    if message_id not in message_ids
+                ]
+                emails, errors = await self.fetch_messages(
+                    retry_ids + message_ids,
+                    batch_size=batch_size,
+                    exclude_ids=exclude_ids,
+                    match_filter=True,
+                )
+                for message_id, error in errors.items():
+                    logger.error(
+                        "Error processing email %s: %s", message_id, str(error)
+                    )
+                logger.info(
+                    "Synced %d new emails since history ID %s",
+                    len(emails),
+                    start_history_id,
+                )
+                self._pending_history_id = history_id
+                return emails
+
+        # Take the history ID before listing so nothing delivered meanwhile is lost
+        history_id = await self._run(self._get_history_id)
+        emails = await self.fetch_recent_emails(
+            hours=hours,
+            max_results=max_results,
+            batch_size=batch_size,
+            exclude_ids=exclude_ids,
+        )
+        self._pending_history_id = history_id
+        return emails
+
     def parse_email(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Parse raw email data into structured format.
@@ -261,21 +981,13 @@ class GmailService:
         """
         Extract email body from payload.
 
+        Handles nested multipart messages, declared charsets and HTML-only
+        mail, capped at settings.email_body_max_chars characters.
+
         Args:
             payload: Email payload data
 
         Returns:
             Decoded email body text
         """
-        if "parts" in payload:
-            for part in payload["parts"]:
-                if part["mimeType"] == "text/plain":
-                    return base64.urlsafe_b64decode(
-                        part["body"]["data"].encode("UTF-8")
-                    ).decode("UTF-8")
-        elif "body" in payload and "data" in payload["body"]:
-            return base64.urlsafe_b64decode(
-                payload["body"]["data"].encode("UTF-8")
-            ).decode("UTF-8")
-
-        return ""
+        return extract_text_body(payload, settings.email_body_max_chars)
@@ -1,37 +1,289 @@
 """Notion integration service."""
 
+import asyncio
+import difflib
+import hashlib
 import logging
-from typing import Any, Dict, List
+import re
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
 
-from notion_client import AsyncClient
+from notion_client import APIErrorCode, APIResponseError, AsyncClient
 
+from app.config import settings
 from app.utils.error_handler import handle_errors
+from app.utils.page_index import PageIndex
+from app.utils.rate_limiter import AdaptiveRateLimiter
 
 logger = logging.getLogger(__name__)
 
+_HEADING_PATTERN = re.compile(r"(#{1,6})\s+(.*)")
+_BULLET_PATTERN = re.compile(r"\s*[-*+]\s+(.*)")
+_NUMBERED_PATTERN = re.compile(r"\s*\d+[.)]\s+(.*)")
+_MARKER_STARTS = frozenset("#-*+0123456789")  # Most lines skip the patterns
+
+# ("update", block ID, new block), ("delete", block ID, None) or
+# ("insert", ID of the block to insert after or None for the end, new blocks)
+BlockChange = Tuple[str, Optional[str], Any]
+
+
+def _retry_after(error: APIResponseError) -> Optional[float]:
+    """Seconds to wait from a throttled response's Retry-After header."""
+    try:
+        return max(0.0, float(error.headers.get("Retry-After", "")))
+    except ValueError:
+        return None
+
+
+def _plain_text(page: Dict[str, Any], name: str) -> str:
+    """Plain text of a rich text property of a queried page."""
+    prop = page.get("properties", {}).get(name, {})
+    return "".join(part.get("plain_text", "") for part in prop.get("rich_text", []))
+
+
+def _block_text(block: Dict[str, Any]) -> str:
+    """Plain text of a text block, built locally or read back from Notion."""
+    parts = block.get(block.get("type", ""), {}).get("rich_text", [])
+    return "".join(
+        part.get("plain_text") or part.get("text", {}).get("content", "")
+        for part in parts
+    )
+
+
+def _content_hash(block: Dict[str, Any]) -> str:
+    """Hash of a block's type and text, equal for blocks showing the same."""
+    digest = hashlib.sha256()
+    for part in (block.get("type", ""), _block_text(block)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _diff_region(
+    old: List[Dict[str, Any]],
+    new: List[Dict[str, Any]],
+    anchor: Optional[str],
+    changes: List[BlockChange],
+) -> Optional[str]:
+    """
+    Plan the changes turning one differing run of blocks into another.
+
+    Blocks are paired by position: a pair of the same type is patched in
+    place, anything else is archived or inserted.
+
+    Args:
+        old: Existing blocks of the run
+        new: Blocks replacing them
+        anchor: ID of the block the run follows, None at the page start
+        changes: List the planned changes are added to
+
+    Returns:
+        ID of the last block of the run that is kept, or ``anchor``
+    """
+    pending: List[Dict[str, Any]] = []
+    for index in range(max(len(old), len(new))):
+        before = old[index] if index < len(old) else None
+        after = new[index] if index < len(new) else None
+        if before is not None and after is not None:
+            if before.get("type") == after["type"]:
+                if pending:
+                    changes.append(("insert", anchor, pending))
+                    pending = []
+                changes.append(("update", before["id"], after))
+                anchor = before["id"]
+                continue
+        if before is not None:
+            changes.append(("delete", before["id"], None))
+        if after is not None:
+            pending.append(after)
+    if pending:
+        changes.append(("insert", anchor, pending))
+    return anchor
+
+
+def _diff_blocks(
+    old: List[Dict[str, Any]], new: List[Dict[str, Any]]
+) -> Optional[List[BlockChange]]:
+    """
+    Plan the block changes turning a page's blocks into new ones.
+
+    Blocks are matched by content hash; matching runs are kept untouched.
+
+    Args:
+        old: Existing blocks of the page, with their ``id``
+        new: Blocks the page should hold
+
+    Returns:
+        Changes in the order to apply them, or None if blocks would have to
+        go before the first kept block, which the API cannot insert
+    """
+    matcher = difflib.SequenceMatcher(
+        None,
+        [_content_hash(block) for block in old],
+        [_content_hash(block) for block in new],
+        autojunk=False,
+    )
+    changes: List[BlockChange] = []
+    anchor: Optional[str] = None
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            anchor = old[i2 - 1]["id"]
+        else:
+            anchor = _diff_region(old[i1:i2], new[j1:j2], anchor, changes)
+
+    # Inserts without an anchor land at the end of the page, which is only
+    # right when no existing block stays
+    kept = len(old) - sum(kind == "delete" for kind, _, _ in changes)
+    if kept and any(kind == "insert" and after is None for kind, after, _ in changes):
+        return None
+    return changes
+
+
+def _classify_line(line: str) -> Tuple[str, str]:
+    """Return the Notion block type for a markdown line and its text."""
+    if line.lstrip()[:1] not in _MARKER_STARTS:
+        return "paragraph", line
+    match = _HEADING_PATTERN.fullmatch(line)
+    if match:
+        # Notion has three heading levels; deeper ones become heading_3
+        return f"heading_{min(len(match.group(1)), 3)}", match.group(2)
+    match = _BULLET_PATTERN.fullmatch(line)
+    if match:
+        return "bulleted_list_item", match.group(1)
+    match = _NUMBERED_PATTERN.fullmatch(line)
+    if match:
+        return "numbered_list_item", match.group(1)
+    return "paragraph", line
+
 
 class NotionService:
     """Service for interacting with Notion API."""
 
     NOTION_TEXT_LIMIT = 2000  # Maximum character limit per Notion block
+    NOTION_CHILDREN_LIMIT = 100  # Maximum blocks per create or append request
+    NOTION_PAGE_SIZE = 100  # Maximum results per databases.query request
+    # Database properties holding the email metadata
+    MESSAGE_ID_PROPERTY = "Message ID"
+    SENDER_PROPERTY = "Sender"
+    RECEIVED_AT_PROPERTY = "Received At"
 
-    def __init__(self, api_token: str, database_id: str) -> None:
+    def __init__(
+        self,
+        api_token: str,
+        database_id: str,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        page_index: Optional[PageIndex] = None,
+    ) -> None:
         """
         Initialize Notion service.
 
         Args:
             api_token: Notion API token
             database_id: Target Notion database ID
+            rate_limiter: Limiter every request waits on; defaults to the
+                process-wide limiter, so all instances share one budget
+            page_index: Message ID to page index making ``add_entry``
+                idempotent
         """
         self.client = AsyncClient(auth=api_token)
         self.database_id = database_id
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter.shared(
+            settings.notion_requests_per_second, settings.notion_request_burst
+        )
+        self.page_index = page_index
+        # Blocks past the first NOTION_CHILDREN_LIMIT, still being appended
+        self._appends: Dict[str, "asyncio.Task[None]"] = {}
+
+    async def _request(
+        self, method: Callable[..., Awaitable[Any]], **kwargs: Any
+    ) -> Any:
+        """
+        Call a Notion API method through the rate limiter.
+
+        Throttled calls (HTTP 429) slow the limiter down, wait for
+        ``Retry-After`` and are retried up to ``settings.notion_max_retries``
+        times.
+
+        Args:
+            method: Client method, e.g. ``self.client.pages.create``
+            **kwargs: Arguments for the method
+
+        Returns:
+            Response of the method
+        """
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire()
+            try:
+                response = await method(**kwargs)
+            except APIResponseError as error:
+                if (
+                    error.code != APIErrorCode.RateLimited
+                    or attempt >= settings.notion_max_retries
+                ):
+                    raise
+                attempt += 1
+                retry_after = _retry_after(error)
+                logger.warning(
+                    "Notion rate limited, retry %d after %s seconds",
+                    attempt,
+                    "?" if retry_after is None else retry_after,
+                )
+                self.rate_limiter.throttled(retry_after)
+                continue
+            self.rate_limiter.succeeded()
+            return response
+
+    def _split_lines(self, lines: Iterable[str]) -> Iterator[str]:
+        """
+        Pack lines into newline-joined chunks of at most NOTION_TEXT_LIMIT.
+
+        Lines are collected in a list and joined once per chunk, so the text
+        is copied a constant number of times. A line longer than the limit
+        is cut into limit-sized slices.
+
+        Args:
+            lines: Lines in document order
+
+        Yields:
+            Non-blank chunks without leading or trailing blank lines, each
+            within the character limit
+        """
+        limit = self.NOTION_TEXT_LIMIT
+        pieces: List[str] = []
+        size = -1  # Length of "\n".join(pieces)
+        for line in lines:
+            if pieces and size + 1 + len(line) > limit:
+                chunk = "\n".join(pieces).strip("\n")
+                if chunk.strip():
+                    yield chunk
+                pieces, size = [], -1
+            # Force split if a single line exceeds the limit
+            while len(line) > limit:
+                yield line[:limit]
+                line = line[limit:]
+            pieces.append(line)
+            size += 1 + len(line)
+        chunk = "\n".join(pieces).strip("\n")
+        if chunk.strip():
+            yield chunk
 
     def _split_content(self, content: str) -> List[str]:
         """
         Split content into chunks of maximum 2000 characters.
 
         Maintains meaningful content blocks by splitting on newlines. Only forces
-        a mid-paragraph split if a single paragraph exceeds the character limit.
+        a mid-line split if a single line exceeds the character limit.
 
         Args:
             content: The input text to be split
@@ -39,82 +291,280 @@ class NotionService:
         Returns:
             A list of text chunks, each under 2000 characters
         """
-        current_chunk = ""
-        chunks = []
-        paragraphs = content.split("\n")
-
-        for paragraph in paragraphs:
-            # Check chunk size after adding current paragraph
-            new_chunk = current_chunk + ("\n" if current_chunk else "") + paragraph
-
-            if len(new_chunk) > self.NOTION_TEXT_LIMIT:
-                # Save current chunk if it exists
-                if current_chunk:
-                    chunks.append(current_chunk)
-                    current_chunk = paragraph
-                else:
-                    # Force split if a single paragraph exceeds limit
-                    chunks.append(paragraph[: self.NOTION_TEXT_LIMIT])
-                    remaining = paragraph[self.NOTION_TEXT_LIMIT :]
-                    if remaining:
-                        current_chunk = remaining
-            else:
-                current_chunk = new_chunk
-
-        # Add the final chunk
-        if current_chunk:
-            chunks.append(current_chunk)
+        return list(self._split_lines(content.split("\n")))
 
-        return chunks
+    @staticmethod
+    def _block(block_type: str, text: str) -> Dict[str, Any]:
+        """Build a Notion block of ``block_type`` holding ``text``."""
+        return {
+            "object": "block",
+            "type": block_type,
+            block_type: {"rich_text": [{"type": "text", "text": {"content": text}}]},
+        }
 
-    def _create_block_objects(self, chunks: List[str]) -> List[Dict[str, Any]]:
+    def _create_block_objects(self, content: str) -> List[Dict[str, Any]]:
         """
-        Create Notion block objects from text chunks.
+        Convert markdown-style text into Notion block objects.
+
+        Headings (``#`` to ``###``), bullet items (``-``, ``*``, ``+``) and
+        numbered items (``1.``, ``1)``) become native Notion blocks; runs of
+        other lines are packed into paragraph blocks. Every block's text is
+        within NOTION_TEXT_LIMIT.
 
         Args:
-            chunks: List of text chunks to be converted to blocks
+            content: Text to convert
 
         Returns:
             List of Notion block objects ready for API submission
         """
-        return [
-            {
-                "object": "block",
-                "type": "paragraph",
-                "paragraph": {
-                    "rich_text": [{"type": "text", "text": {"content": chunk}}]
-                },
+        blocks: List[Dict[str, Any]] = []
+        paragraph: List[str] = []
+        for line in content.split("\n"):
+            block_type, text = _classify_line(line)
+            if block_type == "paragraph":
+                paragraph.append(line)
+                continue
+            if paragraph:
+                blocks.extend(
+                    self._block("paragraph", chunk)
+                    for chunk in self._split_lines(paragraph)
+                )
+                paragraph = []
+            if len(text) <= self.NOTION_TEXT_LIMIT:
+                if text.strip():
+                    blocks.append(self._block(block_type, text))
+                continue
+            blocks.extend(
+                self._block(block_type, chunk) for chunk in self._split_lines([text])
+            )
+        blocks.extend(
+            self._block("paragraph", chunk) for chunk in self._split_lines(paragraph)
+        )
+        return blocks
+
+    def _page_properties(
+        self, title: str, metadata: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Build page properties from the title and optional email metadata."""
+        properties: Dict[str, Any] = {"Name": {"title": [{"text": {"content": title}}]}}
+        metadata = metadata or {}
+        for key, name in (
+            ("message_id", self.MESSAGE_ID_PROPERTY),
+            ("sender", self.SENDER_PROPERTY),
+        ):
+            if metadata.get(key):
+                properties[name] = {
+                    "rich_text": [{"text": {"content": str(metadata[key])}}]
+                }
+        if metadata.get("received_at"):
+            properties[self.RECEIVED_AT_PROPERTY] = {
+                "date": {"start": str(metadata["received_at"])}
             }
-            for chunk in chunks
-        ]
+        return properties
+
+    def find_page(self, message_id: Optional[str]) -> Optional[Dict[str, str]]:
+        """
+        Look up the page already stored for an email.
+
+        Args:
+            message_id: Gmail message ID
+
+        Returns:
+            Dict with the page ``id`` and ``url``, or None
+        """
+        if self.page_index is None or not message_id:
+            return None
+        return self.page_index.get(message_id)
 
     @handle_errors
-    async def add_entry(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    async def create_page(
+        self,
+        title: str,
+        children: Optional[List[Dict[str, Any]]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
         """
-        Add a new entry to the Notion database.
+        Create a page in the Notion database.
 
         Args:
-            data: Entry data containing title and content
+            title: Page title
+            children: Up to NOTION_CHILDREN_LIMIT blocks created with the page
+            metadata: ``message_id``, ``sender`` and ``received_at`` stored as
+                database properties; the page is recorded in the page index
 
         Returns:
             Created Notion page data
         """
-        logger.info("Adding new entry to Notion - Title: %s", data["title"])
+        properties = self._page_properties(title, metadata)
+        if children:
+            page = await self._request(
+                self.client.pages.create,
+                parent={"database_id": self.database_id},
+                properties=properties,
+                children=children,
+            )
+        else:
+            page = await self._request(
+                self.client.pages.create,
+                parent={"database_id": self.database_id},
+                properties=properties,
+            )
+        message_id = (metadata or {}).get("message_id")
+        if self.page_index is not None and message_id:
+            self.page_index.set(message_id, page["id"], page.get("url", ""))
+        return page
 
-        # Create the page first
-        page = await self.client.pages.create(
-            parent={"database_id": self.database_id},
-            properties={
-                "Name": {"title": [{"text": {"content": data["title"]}}]},
+    @handle_errors
+    async def warm_page_index(self) -> int:
+        """
+        Fill the page index from the database, once per process.
+
+        One paginated ``databases.query`` lists every page with a message ID,
+        so pages created by a run that crashed before updating the local
+        index are known too.
+
+        Returns:
+            Number of pages read, 0 if already warmed or there is no index
+        """
+        if self.page_index is None or self.page_index.warmed:
+            return 0
+        count = 0
+        params: Dict[str, Any] = {
+            "database_id": self.database_id,
+            "page_size": self.NOTION_PAGE_SIZE,
+            "filter": {
+                "property": self.MESSAGE_ID_PROPERTY,
+                "rich_text": {"is_not_empty": True},
             },
-        )
+        }
+        while True:
+            response = await self._request(self.client.databases.query, **params)
+            entries = [
+                (message_id, page["id"], page.get("url", ""))
+                for page in response["results"]
+                if (message_id := _plain_text(page, self.MESSAGE_ID_PROPERTY))
+            ]
+            self.page_index.set_many(entries)
+            count += len(entries)
+            if not response.get("has_more"):
+                break
+            params["start_cursor"] = response["next_cursor"]
+        self.page_index.warmed = True
+        logger.info("Loaded %d Notion pages into the page index", count)
+        return count
+
+    async def _append_blocks(
+        self,
+        page_id: str,
+        blocks: List[Dict[str, Any]],
+        after: Optional[str] = None,
+    ) -> None:
+        """
+        Append blocks in order, NOTION_CHILDREN_LIMIT per request.
+
+        Args:
+            page_id: ID of the page to append to
+            blocks: Blocks to append
+            after: ID of the block to insert after; None appends at the end
+        """
+        limit = self.NOTION_CHILDREN_LIMIT
+        if after is None:
+            for start in range(0, len(blocks), limit):
+                await self._request(
+                    self.client.blocks.children.append,
+                    block_id=page_id,
+                    children=blocks[start : start + limit],
+                )
+            return
+        # Every batch goes right after the anchor, so the last one is sent first
+        for start in reversed(range(0, len(blocks), limit)):
+            await self._request(
+                self.client.blocks.children.append,
+                block_id=page_id,
+                children=blocks[start : start + limit],
+                after=after,
+            )
+
+    async def _list_blocks(self, page_id: str) -> List[Dict[str, Any]]:
+        """Fetch every top-level block of a page, NOTION_PAGE_SIZE at a time."""
+        blocks: List[Dict[str, Any]] = []
+        params: Dict[str, Any] = {
+            "block_id": page_id,
+            "page_size": self.NOTION_PAGE_SIZE,
+        }
+        while True:
+            response = await self._request(self.client.blocks.children.list, **params)
+            blocks.extend(response["results"])
+            if not response.get("has_more"):
+                return blocks
+            params["start_cursor"] = response["next_cursor"]
+
+    async def _apply_change(self, page_id: str, change: BlockChange) -> None:
+        """Send one planned block change to Notion."""
+        kind, block_id, payload = change
+        if kind == "update":
+            await self._request(
+                self.client.blocks.update,
+                block_id=block_id,
+                **{payload["type"]: payload[payload["type"]]},
+            )
+        elif kind == "delete":
+            await self._request(self.client.blocks.delete, block_id=block_id)
+        else:
+            await self._append_blocks(page_id, payload, after=block_id)
+
+    async def _append_text(self, page_id: str, text: str) -> int:
+        """Append text to a page as Notion blocks and return the block count."""
+        blocks = self._create_block_objects(text)
+        await self._append_blocks(page_id, blocks)
+        return len(blocks)
 
-        # Split content and create blocks
-        content_chunks = self._split_content(data["content"])
-        blocks = self._create_block_objects(content_chunks)
+    @handle_errors
+    async def add_entry(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Add a new entry to the Notion database.
+
+        The first NOTION_CHILDREN_LIMIT blocks are created with the page, so
+        most summaries take a single request. Longer ones have the remaining
+        blocks appended in the background, NOTION_CHILDREN_LIMIT at a time,
+        while the caller moves on; ``wait_for_page`` waits for them.
+
+        An email whose ``message_id`` is already in the page index is not
+        stored again; its existing page is returned instead, after
+        ``update_entry`` brings it up to date if
+        ``settings.notion_update_existing`` is set.
+
+        Args:
+            data: Entry data containing title and content, and optionally
+                ``message_id``, ``sender`` and ``received_at``
+
+        Returns:
+            Created (or already existing) Notion page data
+        """
+        existing = self.find_page(data.get("message_id"))
+        if existing is not None and settings.notion_update_existing:
+            await self.update_entry(existing["id"], data["content"])
+            return existing
+        if existing is not None:
+            logger.info(
+                "Email %s already stored in Notion - URL: %s, skipping",
+                data["message_id"],
+                existing["url"] or "N/A",
+            )
+            return existing
 
-        # Add content blocks to the page
-        await self.client.blocks.children.append(block_id=page["id"], children=blocks)
+        logger.info("Adding new entry to Notion - Title: %s", data["title"])
+
+        # Split content and create the page with as many blocks as allowed
+        blocks = self._create_block_objects(data["content"])
+        page = await self.create_page(
+            data["title"], blocks[: self.NOTION_CHILDREN_LIMIT], metadata=data
+        )
+        rest = blocks[self.NOTION_CHILDREN_LIMIT :]
+        if rest:
+            self._appends[page["id"]] = asyncio.create_task(
+                self._append_blocks(page["id"], rest)
+            )
 
         logger.info(
             "Successfully added entry to Notion - URL: %s, Number of blocks: %d",
@@ -123,3 +573,90 @@ class NotionService:
         )
 
         return page
+
+    @handle_errors
+    async def update_entry(self, page_id: str, content: str) -> Dict[str, int]:
+        """
+        Update a page's content, changing only the blocks that differ.
+
+        The existing blocks are fetched and matched against the new ones by
+        content hash; unchanged blocks are left alone, changed blocks of the
+        same type are patched in place and the rest archived or inserted. A
+        small edit to a long summary thus takes a few requests instead of a
+        rewrite. Should new blocks have to go before the first kept block,
+        which the API cannot do, the page is rewritten.
+
+        Args:
+            page_id: ID of the page to update
+            content: New page content
+
+        Returns:
+            Number of blocks kept, updated, deleted and inserted
+        """
+        await self.wait_for_page(page_id)
+        old = await self._list_blocks(page_id)
+        new = self._create_block_objects(content)
+        changes = _diff_blocks(old, new)
+        if changes is None:
+            logger.info("Rewriting Notion page %s", page_id)
+            changes = [("delete", block["id"], None) for block in old]
+            changes.append(("insert", None, new))
+
+        stats = {"kept": len(old), "updated": 0, "deleted": 0, "inserted": 0}
+        for change in changes:
+            kind, _, payload = change
+            if kind == "insert":
+                if not payload:
+                    continue
+                stats["inserted"] += len(payload)
+            else:
+                stats["updated" if kind == "update" else "deleted"] += 1
+                stats["kept"] -= 1
+            await self._apply_change(page_id, change)
+        logger.info("Updated Notion page %s: %s", page_id, stats)
+        return stats
+
+    @handle_errors
+    async def wait_for_page(self, page_id: str) -> None:
+        """
+        Wait until the blocks of a page created by ``add_entry`` are appended.
+
+        Args:
+            page_id: ID of the created page
+        """
+        task = self._appends.pop(page_id, None)
+        if task is not None:
+            await task
+
+    async def flush(self) -> None:
+        """Wait for every page still being appended to."""
+        while self._appends:
+            await self.wait_for_page(next(iter(self._appends)))
+
+    @handle_errors
+    async def stream_content(self, page_id: str, chunks: AsyncIterator[str]) -> str:
+        """
+        Append streamed text to a page paragraph by paragraph.
+
+        Text is buffered until a blank line completes a paragraph; completed
+        paragraphs are appended right away and the remainder when the stream
+        ends.
+
+        Args:
+            page_id: ID of the page to append to
+            chunks: Incremental pieces of text
+
+        Returns:
+            The full streamed text
+        """
+        pieces: List[str] = []
+        buffer = ""
+        async for chunk in chunks:
+            pieces.append(chunk)
+            buffer += chunk
+            completed, separator, rest = buffer.rpartition("\n\n")
+            if separator:
+                await self._append_text(page_id, completed)
+                buffer = rest
+        await self._append_text(page_id, buffer)
+        return "".join(pieces)
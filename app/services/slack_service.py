@@ -41,3 +41,22 @@ class SlackService:
         if isinstance(response.data, dict):
             return dict(response.data)
         return {"status": "sent", "raw_response": str(response.data)}
+
+    @handle_errors
+    async def update_notification(self, ts: str, message: str) -> Dict[str, Any]:
+        """
+        Replace the text of a notification sent earlier.
+
+        Args:
+            ts: Timestamp of the message returned by ``send_notification``
+            message: The new message text
+
+        Returns:
+            Slack API response
+        """
+        response = await self.client.chat_update(
+            channel=self.channel_id, ts=ts, text=message
+        )
+        if isinstance(response.data, dict):
+            return dict(response.data)
+        return {"status": "updated", "raw_response": str(response.data)}
@@ -0,0 +1,202 @@
+"""SimHash fingerprints and a persistent near-duplicate index."""
+
+import hashlib
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+FINGERPRINT_BITS = 64
+SHINGLE_SIZE = 3  # Words per shingle
+
+_URL_QUERY_PATTERN = re.compile(r"(https?://[^\s?#]+)[?#]\S*")
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def _to_signed(value: int) -> int:
+    """Map an unsigned 64-bit value onto SQLite's signed INTEGER range."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value & ((1 << 64) - 1)
+
+
+def simhash(text: str) -> int:
+    """
+    Compute the 64-bit SimHash of a text.
+
+    URLs lose their query strings (tracking parameters), case and
+    punctuation are ignored and overlapping word shingles are hashed, so
+    resent or forwarded copies land within a few bits of each other.
+
+    Args:
+        text: Text to fingerprint
+
+    Returns:
+        Unsigned 64-bit fingerprint
+    """
+    words = _WORD_PATTERN.findall(_URL_QUERY_PATTERN.sub(r"\1", text).lower())
+    shingles = {
+        " ".join(words[i : i + SHINGLE_SIZE])
+        for i in range(max(1, len(words) - SHINGLE_SIZE + 1))
+    }
+    rows = [
+        format(
+            int.from_bytes(
+                hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big"
+            ),
+            "064b",
+        )
+        for shingle in shingles
+    ]
+    # Column-wise majority vote; zip() transposes the bit strings in C
+    fingerprint = 0
+    for column in zip(*rows):
+        fingerprint = fingerprint << 1 | (column.count("1") * 2 > len(rows))
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two fingerprints."""
+    return bin(a ^ b).count("1")
+
+
+def _bands(fingerprint: int, count: int) -> List[int]:
+    """Split a fingerprint into ``count`` contiguous bit ranges."""
+    bands = []
+    start = 0
+    for index in range(count):
+        width = FINGERPRINT_BITS // count + (index < FINGERPRINT_BITS % count)
+        bands.append(fingerprint >> start & ((1 << width) - 1))
+        start += width
+    return bands
+
+
+@dataclass
+class DuplicateMatch:
+    """An indexed email close enough to count as a duplicate."""
+
+    message_id: str
+    page_url: str
+    summary: str
+    distance: int
+
+
+class DuplicateIndex:
+    """SQLite-backed SimHash index answering near-duplicate lookups.
+
+    Fingerprints are split into ``max_distance + 1`` bands. Two fingerprints
+    within ``max_distance`` bits agree exactly on at least one band
+    (pigeonhole), so a lookup only compares the entries sharing a band value,
+    found through an index, instead of scanning every entry.
+    """
+
+    def __init__(self, path: str, max_distance: int = 3) -> None:
+        """
+        Open (or create) the index database.
+
+        Args:
+            path: SQLite database file, or ``":memory:"``
+            max_distance: Largest Hamming distance treated as a duplicate
+        """
+        self.max_distance = max_distance
+        self.band_count = max_distance + 1
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "id INTEGER PRIMARY KEY, message_id TEXT NOT NULL, "
+            "fingerprint INTEGER NOT NULL, page_url TEXT NOT NULL, "
+            "summary TEXT NOT NULL, created_at REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS bands ("
+            "band INTEGER NOT NULL, value INTEGER NOT NULL, entry_id INTEGER NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS bands_lookup ON bands (band, value);"
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);"
+        )
+        self._rebuild_bands_if_needed()
+
+    def _rebuild_bands_if_needed(self) -> None:
+        """Re-split stored fingerprints when the distance threshold changed."""
+        row = self._conn.execute(
+            "SELECT value FROM meta WHERE key = 'band_count'"
+        ).fetchone()
+        if row is not None and int(row[0]) == self.band_count:
+            return
+        self._conn.execute("DELETE FROM bands")
+        for entry_id, fingerprint in self._conn.execute(
+            "SELECT id, fingerprint FROM entries"
+        ).fetchall():
+            self._insert_bands(entry_id, _to_unsigned(fingerprint))
+        self._conn.execute(
+            "INSERT OR REPLACE INTO meta VALUES ('band_count', ?)",
+            (str(self.band_count),),
+        )
+        self._conn.commit()
+
+    def _insert_bands(self, entry_id: int, fingerprint: int) -> None:
+        self._conn.executemany(
+            "INSERT INTO bands VALUES (?, ?, ?)",
+            [
+                (band, _to_signed(value), entry_id)
+                for band, value in enumerate(_bands(fingerprint, self.band_count))
+            ],
+        )
+
+    def __len__(self) -> int:
+        row = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        return int(row[0])
+
+    def find(self, text: str) -> Optional[DuplicateMatch]:
+        """
+        Find the closest indexed near-duplicate of a text.
+
+        Args:
+            text: Normalised email body
+
+        Returns:
+            Closest match within ``max_distance`` bits, or None
+        """
+        fingerprint = simhash(text)
+        conditions = " OR ".join(["(b.band = ? AND b.value = ?)"] * self.band_count)
+        params: List[int] = []
+        for band, value in enumerate(_bands(fingerprint, self.band_count)):
+            params.extend((band, _to_signed(value)))
+        rows = self._conn.execute(
+            "SELECT DISTINCT e.message_id, e.fingerprint, e.page_url, e.summary "
+            f"FROM bands b JOIN entries e ON e.id = b.entry_id WHERE {conditions}",
+            params,
+        ).fetchall()
+
+        best: Optional[Tuple[int, DuplicateMatch]] = None
+        for message_id, stored, page_url, summary in rows:
+            distance = hamming_distance(fingerprint, _to_unsigned(stored))
+            if distance <= self.max_distance and (best is None or distance < best[0]):
+                best = (
+                    distance,
+                    DuplicateMatch(message_id, page_url, summary, distance),
+                )
+        return best[1] if best else None
+
+    def add(self, message_id: str, text: str, page_url: str, summary: str) -> None:
+        """
+        Index a summarized email.
+
+        Args:
+            message_id: Gmail message ID
+            text: Normalised email body that was summarized
+            page_url: Notion page holding the summary
+            summary: Generated summary
+        """
+        fingerprint = simhash(text)
+        cursor = self._conn.execute(
+            "INSERT INTO entries (message_id, fingerprint, page_url, summary, "
+            "created_at) VALUES (?, ?, ?, ?, ?)",
+            (message_id, _to_signed(fingerprint), page_url, summary, time.time()),
+        )
+        self._insert_bands(int(cursor.lastrowid or 0), fingerprint)
+        self._conn.commit()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._conn.close()
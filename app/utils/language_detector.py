@@ -0,0 +1,67 @@
+"""Local language and script detection from character-class statistics."""
+
+JAPANESE = "ja"
+ENGLISH = "en"
+OTHER = "other"  # Text in a script other than Japanese or Latin
+NON_TEXT = "non_text"  # Empty, or mostly numbers, symbols and markup
+
+SAMPLE_CHARS = 2000  # Head of the body inspected; enough to tell the script
+MIN_LETTER_SHARE = 0.25  # Letters among non-space characters for text
+JAPANESE_SHARE = 0.3  # Japanese characters among letters for Japanese
+
+# Classes are counted on UTF-8 bytes with bytes.count/translate, which run in
+# C without building a list per match the way re.findall does
+_HIGH_BYTES = bytes(range(0x80, 0x100))
+_NON_LATIN_BYTES = bytes(
+    b for b in range(0x100) if not (0x41 <= b <= 0x5A or 0x61 <= b <= 0x7A)
+)
+_SPACE_BYTES = b" \t\n\r\x0b\x0c"
+_KANA_PREFIXES = (b"\xe3\x81", b"\xe3\x82", b"\xe3\x83")  # U+3040-U+30FF
+# Every byte but the UTF-8 lead bytes of U+4000-U+9FFF (kanji)
+_NON_KANJI_LEAD_BYTES = bytes(b for b in range(0x100) if not 0xE4 <= b <= 0xE9)
+_NON_LETTER_PREFIXES = (
+    b"\xe3\x80",  # CJK punctuation (U+3000-U+303F)
+    b"\xef\xbc",  # Fullwidth forms (U+FF00-U+FF3F)
+    b"\xef\xbd",  # Fullwidth and halfwidth forms (U+FF40-U+FF7F)
+    b"\xe2",  # General punctuation, arrows and symbols (U+2000-U+2FFF)
+)
+
+
+def detect_language(text: str) -> str:
+    """
+    Classify a body as Japanese, English, another script or non-text.
+
+    Characters of the first ``SAMPLE_CHARS`` are counted by class (Latin
+    letters, kana, kanji, other letters, spaces); nothing leaves the
+    process. A Latin letter carries far less text than a kana or kanji, so a
+    body counts as Japanese once Japanese characters make up
+    ``JAPANESE_SHARE`` of its letters. Kanji without any kana is treated as
+    another language (e.g. Chinese).
+
+    Args:
+        text: Plain-text email body
+
+    Returns:
+        ``JAPANESE``, ``ENGLISH``, ``OTHER`` or ``NON_TEXT``
+    """
+    sample = text[:SAMPLE_CHARS]
+    data = sample.encode("utf-8", "ignore")
+    visible = len(sample) - (len(data) - len(data.translate(None, _SPACE_BYTES)))
+    latin = len(data.translate(None, _NON_LATIN_BYTES))
+
+    kana = japanese = other = 0
+    if not sample.isascii():
+        non_ascii = len(sample) - len(data.translate(None, _HIGH_BYTES))
+        kana = sum(data.count(prefix) for prefix in _KANA_PREFIXES)
+        japanese = kana + len(data.translate(None, _NON_KANJI_LEAD_BYTES))
+        symbols = sum(data.count(prefix) for prefix in _NON_LETTER_PREFIXES)
+        other = max(0, non_ascii - japanese - symbols)
+
+    letters = latin + japanese + other
+    if not visible or letters < visible * MIN_LETTER_SHARE:
+        return NON_TEXT
+    if kana and japanese >= letters * JAPANESE_SHARE:
+        return JAPANESE
+    if latin * 2 >= letters:
+        return ENGLISH
+    return OTHER
@@ -0,0 +1,180 @@
+"""MIME body extraction utilities for Gmail message payloads."""
+
+import base64
+import codecs
+import re
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple
+
+# Tags whose text never reaches the reader
+_SKIPPED_TAGS = {"head", "script", "style", "template", "noscript"}
+# Tags that start a new line in rendered text
+_BLOCK_TAGS = {
+    "address",
+    "article",
+    "blockquote",
+    "div",
+    "dl",
+    "dt",
+    "dd",
+    "footer",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "header",
+    "hr",
+    "li",
+    "ol",
+    "p",
+    "pre",
+    "section",
+    "table",
+    "tr",
+    "ul",
+}
+_CHARSET_PATTERN = re.compile(r'charset\s*=\s*"?([^";\s]+)', re.IGNORECASE)
+_BLANK_LINES_PATTERN = re.compile(r"\n\s*\n\s*\n+")
+_SPACES_PATTERN = re.compile(r"[ \t\r\f\v]+")
+_HTML_FEED_SIZE = 64 * 1024
+
+
+class _HTMLTextExtractor(HTMLParser):
+    """Streaming HTML to plain text converter that stops at a size cap."""
+
+    def __init__(self, max_chars: int) -> None:
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.pieces: List[str] = []
+        self.length = 0
+        self.skip_depth = 0
+
+    @property
+    def full(self) -> bool:
+        """Whether the size cap has been reached."""
+        return self.length >= self.max_chars
+
+    def _append(self, text: str) -> None:
+        if self.full:
+            return
+        text = text[: self.max_chars - self.length]
+        self.pieces.append(text)
+        self.length += len(text)
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag in _SKIPPED_TAGS:
+            self.skip_depth += 1
+        elif tag == "br":
+            self._append("\n")
+        elif tag == "li":
+            self._append("\n- ")
+        elif tag in _BLOCK_TAGS:
+            self._append("\n")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in _SKIPPED_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag in _BLOCK_TAGS:
+            self._append("\n")
+
+    def handle_data(self, data: str) -> None:
+        if not self.skip_depth:
+            self._append(_SPACES_PATTERN.sub(" ", data))
+
+
+def html_to_text(html: str, max_chars: int) -> str:
+    """
+    Convert HTML to readable plain text.
+
+    The document is fed to the parser in chunks and parsing stops once
+    ``max_chars`` characters of text have been produced.
+
+    Args:
+        html: HTML document
+        max_chars: Maximum length of the returned text
+
+    Returns:
+        Plain text with block elements on separate lines
+    """
+    extractor = _HTMLTextExtractor(max_chars)
+    for start in range(0, len(html), _HTML_FEED_SIZE):
+        extractor.feed(html[start : start + _HTML_FEED_SIZE])
+        if extractor.full:
+            break
+    else:
+        extractor.close()
+
+    text = "\n".join(line.strip() for line in "".join(extractor.pieces).split("\n"))
+    return _BLANK_LINES_PATTERN.sub("\n\n", text).strip()
+
+
+def _part_headers(part: Dict[str, Any]) -> Dict[str, str]:
+    return {
+        header["name"].lower(): header["value"] for header in part.get("headers", [])
+    }
+
+
+def _is_attachment(part: Dict[str, Any], headers: Dict[str, str]) -> bool:
+    return bool(part.get("filename")) or headers.get(
+        "content-disposition", ""
+    ).lower().startswith("attachment")
+
+
+def _decode_part(part: Dict[str, Any], headers: Dict[str, str]) -> str:
+    """Decode a part's base64url body using the charset it declares."""
+    data = part.get("body", {}).get("data")
+    if not data:
+        return ""
+    raw = base64.urlsafe_b64decode(data.encode("ascii") + b"==")
+
+    match = _CHARSET_PATTERN.search(headers.get("content-type", ""))
+    charset = "utf-8"
+    if match:
+        try:
+            charset = codecs.lookup(match.group(1)).name
+        except LookupError:
+            pass
+    return raw.decode(charset, errors="replace")
+
+
+def extract_text_body(payload: Dict[str, Any], max_chars: int) -> str:
+    """
+    Extract the most readable text body from a Gmail message payload.
+
+    The MIME tree is walked iteratively, so arbitrarily deep nesting is safe.
+    The first non-empty text/plain part wins; otherwise the first text/html
+    part is converted to text. Attachments are ignored.
+
+    Args:
+        payload: Gmail ``payload`` object of a message fetched with format=full
+        max_chars: Maximum length of the returned text
+
+    Returns:
+        Decoded body text, or an empty string if there is no text part
+    """
+    html_part: Optional[Tuple[Dict[str, Any], Dict[str, str]]] = None
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        if "parts" in part:
+            # Reversed so that parts are visited in document order
+            stack.extend(reversed(part["parts"]))
+            continue
+
+        headers = _part_headers(part)
+        if _is_attachment(part, headers):
+            continue
+
+        mime_type = part.get("mimeType", "text/plain").lower()
+        if mime_type == "text/plain":
+            text = _decode_part(part, headers)
+            if text.strip():
+                return text[:max_chars]
+        elif mime_type == "text/html" and html_part is None:
+            html_part = (part, headers)
+
+    if html_part is not None:
+        return html_to_text(_decode_part(*html_part), max_chars)
+    return ""
@@ -0,0 +1,78 @@
+"""Persistent Gmail message ID to Notion page index."""
+
+import sqlite3
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class PageIndex:
+    """SQLite-backed map from Gmail message IDs to the Notion pages holding them.
+
+    ``warmed`` starts out False for every process; the owner fills the index
+    from Notion once and sets it, so pages created before a crash are known
+    even if they never reached the local file.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Open (or create) the index database.
+
+        Args:
+            path: SQLite database file, or ``":memory:"``
+        """
+        self.warmed = False
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "message_id TEXT PRIMARY KEY, page_id TEXT NOT NULL, "
+            "url TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        row = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()
+        return int(row[0])
+
+    def get(self, message_id: str) -> Optional[Dict[str, str]]:
+        """
+        Look up the page stored for a message.
+
+        Args:
+            message_id: Gmail message ID
+
+        Returns:
+            Dict with the page ``id`` and ``url``, or None
+        """
+        row = self._conn.execute(
+            "SELECT page_id, url FROM pages WHERE message_id = ?", (message_id,)
+        ).fetchone()
+        return {"id": row[0], "url": row[1]} if row else None
+
+    def set(self, message_id: str, page_id: str, url: str = "") -> None:
+        """
+        Record the page stored for a message.
+
+        Args:
+            message_id: Gmail message ID
+            page_id: Notion page ID
+            url: Notion page URL
+        """
+        self.set_many([(message_id, page_id, url)])
+
+    def set_many(self, entries: Iterable[Tuple[str, str, str]]) -> None:
+        """
+        Record several pages in one transaction.
+
+        Args:
+            entries: (message ID, page ID, page URL) tuples
+        """
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)",
+            [(message_id, page_id, url, now) for message_id, page_id, url in entries],
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._conn.close()
@@ -0,0 +1,116 @@
+"""Rule-based clean-up of email bodies before they are sent to Claude."""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Set
+
+from app.utils.text_chunker import estimate_tokens
+
+# Compiled once at import; every rule is a single pass over the body
+_QUOTE_HEADER_PATTERN = re.compile(
+    r"^(?:On .{1,200}wrote:|-{2,}\s*Original Message\s*-{2,}"
+    r"|-{2,}\s*Forwarded message\s*-{2,}|From: .+\n(?:Sent|Date): )",
+    re.MULTILINE | re.IGNORECASE,
+)
+_QUOTED_LINE_PATTERN = re.compile(r"^[ \t]*>.*(?:\n|$)", re.MULTILINE)
+_SIGNATURE_PATTERN = re.compile(r"^-- ?$", re.MULTILINE)
+_FOOTER_PATTERN = re.compile(
+    r"unsubscribe|manage (?:your )?(?:email )?(?:preferences|subscription)"
+    r"|you(?: are|'re)? receiving this|privacy policy|all rights reserved"
+    r"|©|\(c\) \d{4}|update your (?:email )?preferences"
+)  # Matched against lower-cased text: much faster than re.IGNORECASE
+FOOTER_SEARCH_FRACTION = 0.3  # Footers are only looked for in the last 30%
+URL_LIST_MIN_LINES = 3  # Runs of this many URL-only lines are dropped
+LEARNED_TAIL_LINES = 15  # Trailing lines remembered per sender
+
+# A line holding only a link, optionally bulleted or labelled ("Docs: https://...")
+_URL_LINE = r"[^\w\n]{0,3}(?:[\w ]{0,40}:[^\S\n]*)?<?https?://\S+>?[^\S\n]*"
+_URL_LIST_PATTERN = re.compile(
+    rf"^(?:{_URL_LINE}(?:\n|\Z)){{{URL_LIST_MIN_LINES},}}", re.MULTILINE
+)
+_BLANK_LINES_PATTERN = re.compile(r"\n[ \t]*\n(?:[ \t]*\n)+")
+
+
+@dataclass
+class PreprocessResult:
+    """Cleaned body with the estimated token counts before and after."""
+
+    text: str
+    tokens_before: int
+    tokens_after: int
+
+    @property
+    def tokens_saved(self) -> int:
+        """Estimated input tokens removed by pre-processing."""
+        return self.tokens_before - self.tokens_after
+
+
+def _strip_quoted(text: str) -> str:
+    match = _QUOTE_HEADER_PATTERN.search(text)
+    if match and match.start() > 0:
+        text = text[: match.start()]
+    return _QUOTED_LINE_PATTERN.sub("", text)
+
+
+def _strip_signature(text: str) -> str:
+    match = _SIGNATURE_PATTERN.search(text)
+    return text[: match.start()] if match else text
+
+
+def _strip_footer(lines: List[str]) -> List[str]:
+    start = int(len(lines) * (1 - FOOTER_SEARCH_FRACTION))
+    tail = "\n".join(lines[start:]).lower()
+    match = _FOOTER_PATTERN.search(tail)
+    if match is None:
+        return lines
+    return lines[: start + tail.count("\n", 0, match.start())]
+
+
+class EmailPreprocessor:
+    """Strip quoted replies, signatures, footers and URL lists from bodies.
+
+    Besides the generic rules, the trailing lines of each sender's previous
+    email are remembered; lines a sender repeats at the end of every email
+    (a footer the generic rules missed) are stripped from the next one.
+    """
+
+    def __init__(self) -> None:
+        """Initialize with no learned footers."""
+        self.learned_tails: Dict[str, Set[str]] = {}
+
+    def _strip_learned_footer(self, lines: List[str], sender: str) -> List[str]:
+        tail = {line.strip() for line in lines[-LEARNED_TAIL_LINES:] if line.strip()}
+        known = self.learned_tails.get(sender)
+        self.learned_tails[sender] = tail
+        if not known:
+            return lines
+
+        end = len(lines)
+        while end > 0 and (
+            not lines[end - 1].strip() or lines[end - 1].strip() in known
+        ):
+            end -= 1
+        # Never strip more than the remembered tail, or the whole body
+        if end == 0 or len(lines) - end > LEARNED_TAIL_LINES * 2:
+            return lines
+        return lines[:end]
+
+    def preprocess(self, text: str, sender: str = "") -> PreprocessResult:
+        """
+        Clean an email body before translation.
+
+        Args:
+            text: Plain-text email body
+            sender: Sender address, used to learn repeated footers
+
+        Returns:
+            Cleaned text with estimated tokens before and after
+        """
+        tokens_before = estimate_tokens(text)
+        cleaned = _strip_signature(_strip_quoted(text.replace("\r\n", "\n")))
+        cleaned = _URL_LIST_PATTERN.sub("", cleaned)
+        lines = _strip_footer(cleaned.split("\n"))
+        if sender:
+            lines = self._strip_learned_footer(lines, sender)
+        cleaned = _BLANK_LINES_PATTERN.sub("\n\n", "\n".join(lines)).strip()
+        return PreprocessResult(cleaned, tokens_before, estimate_tokens(cleaned))
@@ -0,0 +1,142 @@
+"""Adaptive token-bucket rate limiter for API clients."""
+
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+
+
+class AdaptiveRateLimiter:
+    """Token bucket that slows down when the API throttles.
+
+    Callers wait in ``acquire`` for a token; tokens refill at ``rate`` per
+    second up to ``burst``. A throttled response (HTTP 429) pauses every
+    caller until its ``Retry-After`` has passed and halves the rate; each
+    successful call then raises the rate by ``recovery`` until it is back at
+    the configured maximum (additive increase, multiplicative decrease).
+    """
+
+    _shared: Optional["AdaptiveRateLimiter"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        min_rate: float = 0.1,
+        recovery: float = 0.05,
+    ) -> None:
+        """
+        Initialize the limiter with a full bucket.
+
+        Args:
+            rate: Maximum requests per second
+            burst: Bucket size, i.e. requests allowed back to back
+            min_rate: Lowest rate throttling can push the limiter down to
+            recovery: Requests per second regained per successful call
+        """
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.min_rate = min(min_rate, rate)
+        self.recovery = recovery
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Metrics
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.requests = 0
+        self.throttled_count = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    @classmethod
+    def shared(cls, rate: float, burst: int = 1) -> "AdaptiveRateLimiter":
+        """
+        Get the process-wide limiter, creating it on first use.
+
+        Args:
+            rate: Maximum requests per second, used on creation only
+            burst: Bucket size, used on creation only
+
+        Returns:
+            AdaptiveRateLimiter shared by every caller in the process
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(rate, burst)
+            return cls._shared
+
+    @property
+    def metrics(self) -> Dict[str, float]:
+        """Current rate, queue depth and wait statistics."""
+        return {
+            "rate": self.rate,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "requests": self.requests,
+            "throttled": self.throttled_count,
+            "mean_wait_seconds": self.total_wait_seconds / max(1, self.requests),
+            "max_wait_seconds": self.max_wait_seconds,
+        }
+
+    def _get_lock(self) -> asyncio.Lock:
+        # asyncio.Lock is bound to one event loop; each loop gets its own
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._loop is not loop:
+            self._lock, self._loop = asyncio.Lock(), loop
+        return self._lock
+
+    def _delay(self, now: float) -> float:
+        """Refill the bucket and return the wait before the next token."""
+        if now > self._updated:
+            elapsed = now - self._updated
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._updated = now
+        # _updated lies in the future while paused for Retry-After
+        return self._updated - now + max(0.0, 1 - self._tokens) / self.rate
+
+    async def acquire(self) -> float:
+        """
+        Wait for a request slot, first come first served.
+
+        Returns:
+            Seconds spent waiting
+        """
+        started = time.monotonic()
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        try:
+            async with self._get_lock():
+                while (delay := self._delay(time.monotonic())) > 0:
+                    await asyncio.sleep(delay)
+                self._tokens -= 1
+        finally:
+            self.queue_depth -= 1
+
+        waited = time.monotonic() - started
+        self.requests += 1
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return waited
+
+    def throttled(self, retry_after: Optional[float] = None) -> None:
+        """
+        Record a throttled response: pause all callers and halve the rate.
+
+        Args:
+            retry_after: Seconds from the ``Retry-After`` header, if any
+        """
+        self.throttled_count += 1
+        self.rate = max(self.min_rate, self.rate / 2)
+        pause = retry_after if retry_after is not None else 1 / self.rate
+        resume = time.monotonic() + pause
+        if resume > self._updated:
+            # One request may go at ``resume``, then the reduced rate applies
+            self._tokens, self._updated = 1.0, resume
+
+    def succeeded(self) -> None:
+        """Record a successful call: creep back toward the maximum rate."""
+        self.rate = min(self.max_rate, self.rate + self.recovery)
@@ -0,0 +1,125 @@
+"""Persistent content-hash cache for generated summaries."""
+
+import hashlib
+import logging
+import re
+import sqlite3
+import time
+import unicodedata
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different copies share a cache key."""
+    return _WHITESPACE_PATTERN.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def cache_key(text: str, prompt_version: str, model: str) -> str:
+    """
+    Build the cache key for a summary request.
+
+    Args:
+        text: Input text sent to the model
+        prompt_version: Hash of the prompt template
+        model: Model name
+
+    Returns:
+        Hex digest identifying the request
+    """
+    digest = hashlib.sha256()
+    for part in (prompt_version, model, normalize_text(text)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class SummaryCache:
+    """SQLite-backed summary cache with TTL and size eviction."""
+
+    def __init__(
+        self, path: str, max_entries: int = 10_000, ttl_seconds: int = 30 * 86400
+    ) -> None:
+        """
+        Open (or create) the cache database.
+
+        Args:
+            path: SQLite database file, or ``":memory:"``
+            max_entries: Entries kept after eviction, least recently used first out
+            ttl_seconds: Age after which an entry is no longer returned
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Hit and miss counters since the cache was opened."""
+        return {"hits": self.hits, "misses": self.misses}
+
+    def __len__(self) -> int:
+        row = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()
+        return int(row[0])
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached summary.
+
+        Args:
+            key: Key built with ``cache_key``
+
+        Returns:
+            Cached summary, or None on a miss or an expired entry
+        """
+        now = time.time()
+        row = self._conn.execute(
+            "SELECT value FROM summaries WHERE key = ? AND created_at > ?",
+            (key, now - self.ttl_seconds),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self._conn.execute(
+            "UPDATE summaries SET accessed_at = ? WHERE key = ?", (now, key)
+        )
+        self._conn.commit()
+        self.hits += 1
+        return str(row[0])
+
+    def set(self, key: str, value: str) -> None:
+        """
+        Store a summary and evict expired and excess entries.
+
+        Args:
+            key: Key built with ``cache_key``
+            value: Summary to store
+        """
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?)",
+            (key, value, now, now),
+        )
+        self._conn.execute(
+            "DELETE FROM summaries WHERE created_at <= ?", (now - self.ttl_seconds,)
+        )
+        self._conn.execute(
+            "DELETE FROM summaries WHERE key NOT IN (SELECT key FROM summaries "
+            "ORDER BY accessed_at DESC, rowid DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._conn.close()
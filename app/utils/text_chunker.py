@@ -0,0 +1,110 @@
+"""Token estimation and paragraph-based text chunking."""
+
+import re
+from typing import Iterator, List
+
+_PARAGRAPH_PATTERN = re.compile(r"\n\s*\n")
+_NON_ASCII_PATTERN = re.compile(r"[^\x00-\x7f]")
+PARAGRAPH_SEPARATOR = "\n\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Roughly estimate the number of tokens in ``text``.
+
+    ASCII text averages about four characters per token, while Japanese and
+    other non-ASCII text is closer to one token per character.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Estimated token count
+    """
+    non_ascii = 0 if text.isascii() else len(_NON_ASCII_PATTERN.findall(text))
+    return (len(text) - non_ascii + 3) // 4 + non_ascii
+
+
+def _split_oversized(paragraph: str, max_tokens: int) -> Iterator[str]:
+    """Split one paragraph over budget on line breaks, then by length."""
+    for line in paragraph.split("\n"):
+        while estimate_tokens(line) > max_tokens:
+            # Binary search the longest prefix within budget
+            low, high = 1, len(line)
+            while low < high:
+                middle = (low + high + 1) // 2
+                if estimate_tokens(line[:middle]) <= max_tokens:
+                    low = middle
+                else:
+                    high = middle - 1
+            cut = line.rfind(" ", 0, low)
+            cut = cut if cut > 0 else low
+            yield line[:cut]
+            line = line[cut:].lstrip()
+        if line:
+            yield line
+
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """
+    Split text into chunks of at most ``max_tokens`` estimated tokens.
+
+    Chunks break on paragraph boundaries (blank lines) and pack as many whole
+    paragraphs as fit. A paragraph that alone exceeds the budget is split on
+    line breaks and, failing that, on the last space within budget. Joining
+    the chunks with ``PARAGRAPH_SEPARATOR`` restores the paragraph layout.
+
+    Args:
+        text: Text to split
+        max_tokens: Token budget per chunk
+
+    Returns:
+        Non-empty chunks in document order
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    separator_tokens = estimate_tokens(PARAGRAPH_SEPARATOR)
+
+    for paragraph in _PARAGRAPH_PATTERN.split(text.strip()):
+        pieces = (
+            [paragraph]
+            if estimate_tokens(paragraph) <= max_tokens
+            else list(_split_oversized(paragraph, max_tokens))
+        )
+        for piece in pieces:
+            tokens = estimate_tokens(piece)
+            if current and current_tokens + separator_tokens + tokens > max_tokens:
+                chunks.append(PARAGRAPH_SEPARATOR.join(current))
+                current, current_tokens = [], 0
+            current_tokens += tokens + (separator_tokens if current else 0)
+            current.append(piece)
+
+    if current:
+        chunks.append(PARAGRAPH_SEPARATOR.join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+def chunk_segments(segments: List[str], max_tokens: int) -> List[List[str]]:
+    """
+    Group segments into runs of at most ``max_tokens`` estimated tokens.
+
+    A segment over budget on its own forms a group by itself.
+
+    Args:
+        segments: Segments to group, kept in order
+        max_tokens: Token budget per group
+
+    Returns:
+        Non-empty groups in order
+    """
+    groups: List[List[str]] = []
+    current_tokens = 0
+    for segment in segments:
+        tokens = estimate_tokens(segment)
+        if not groups or current_tokens + tokens > max_tokens:
+            groups.append([])
+            current_tokens = 0
+        groups[-1].append(segment)
+        current_tokens += tokens
+    return groups
@@ -0,0 +1,196 @@
+"""Persistent sentence-level translation memory."""
+
+import hashlib
+import re
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from app.utils.summary_cache import normalize_text
+
+# Sentence ends followed by spaces, or line breaks; the group keeps separators
+_SEGMENT_PATTERN = re.compile(r"((?<=[.!?])[ \t]+|[ \t]*\n\s*)")
+_LETTER_PATTERN = re.compile(r"[A-Za-z]")
+_QUERY_BATCH = 500  # Keys per SELECT, well under SQLite's variable limit
+
+
+def split_segments(text: str) -> List[Tuple[str, str]]:
+    """
+    Split text into sentences and line-level segments.
+
+    Args:
+        text: Text to split
+
+    Returns:
+        (segment, following whitespace) pairs in document order
+    """
+    pieces = _SEGMENT_PATTERN.split(text.strip())
+    # re.split with one group alternates text, separator, text, ...
+    return [
+        (pieces[i], pieces[i + 1] if i + 1 < len(pieces) else "")
+        for i in range(0, len(pieces), 2)
+    ]
+
+
+def join_segments(segments: Sequence[Tuple[str, str]]) -> str:
+    """
+    Join translated segments, keeping line and paragraph breaks.
+
+    Japanese sentences are not separated by spaces, so separators without a
+    line break are dropped.
+
+    Args:
+        segments: (translated segment, original separator) pairs
+
+    Returns:
+        Joined text
+    """
+    parts = []
+    for segment, separator in segments:
+        parts.append(segment)
+        newlines = separator.count("\n")
+        parts.append("\n\n" if newlines > 1 else "\n" if newlines else "")
+    return "".join(parts).strip()
+
+
+def needs_translation(segment: str) -> bool:
+    """Whether a segment holds English text (not only numbers or symbols)."""
+    return bool(_LETTER_PATTERN.search(segment))
+
+
+def segment_key(segment: str, prompt_version: str, normalized: bool = False) -> str:
+    """
+    Build the memory key for a segment.
+
+    Args:
+        segment: Source segment
+        prompt_version: Hash of the segment translation prompt
+        normalized: Key the whitespace- and case-normalized form instead
+
+    Returns:
+        Hex digest identifying the segment
+    """
+    text = normalize_text(segment).casefold() if normalized else segment
+    digest = hashlib.sha256()
+    for part in (prompt_version, "n" if normalized else "e", text):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class TranslationMemory:
+    """SQLite-backed store of segment translations with size eviction.
+
+    Every translation is stored under an exact key and a normalized key, so
+    a segment repeated with different spacing or case still hits.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100_000) -> None:
+        """
+        Open (or create) the memory database.
+
+        Args:
+            path: SQLite database file, or ``":memory:"``
+            max_entries: Keys kept after eviction, least recently used first out
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS segments ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of looked-up segments found since the memory was opened."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Hit and miss counters since the memory was opened."""
+        return {"hits": self.hits, "misses": self.misses}
+
+    def __len__(self) -> int:
+        row = self._conn.execute("SELECT COUNT(*) FROM segments").fetchone()
+        return int(row[0])
+
+    def _select(self, keys: List[str]) -> Dict[str, str]:
+        found: Dict[str, str] = {}
+        for start in range(0, len(keys), _QUERY_BATCH):
+            batch = keys[start : start + _QUERY_BATCH]
+            found.update(
+                self._conn.execute(
+                    "SELECT key, value FROM segments WHERE key IN "
+                    f"({', '.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+            )
+        return found
+
+    def get_many(self, segments: Iterable[str], prompt_version: str) -> Dict[str, str]:
+        """
+        Look up translations, exact matches first, then normalized ones.
+
+        Args:
+            segments: Source segments
+            prompt_version: Hash of the segment translation prompt
+
+        Returns:
+            Translations of the segments found, keyed by segment
+        """
+        keys = {
+            segment: (
+                segment_key(segment, prompt_version),
+                segment_key(segment, prompt_version, normalized=True),
+            )
+            for segment in segments
+        }
+        found = self._select([key for pair in keys.values() for key in pair])
+
+        translations: Dict[str, str] = {}
+        used: List[Tuple[float, str]] = []
+        now = time.time()
+        for segment, (exact, normalized) in keys.items():
+            key = exact if exact in found else normalized
+            if key in found:
+                translations[segment] = found[key]
+                used.extend([(now, exact), (now, normalized)])
+        self._conn.executemany(
+            "UPDATE segments SET accessed_at = ? WHERE key = ?", used
+        )
+        self._conn.commit()
+        self.hits += len(translations)
+        self.misses += len(keys) - len(translations)
+        return translations
+
+    def set_many(self, translations: Dict[str, str], prompt_version: str) -> None:
+        """
+        Store segment translations and evict excess entries.
+
+        Args:
+            translations: Translations keyed by source segment
+            prompt_version: Hash of the segment translation prompt
+        """
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO segments VALUES (?, ?, ?)",
+            [
+                (segment_key(segment, prompt_version, normalized), value, now)
+                for segment, value in translations.items()
+                for normalized in (False, True)
+            ],
+        )
+        self._conn.execute(
+            "DELETE FROM segments WHERE key NOT IN (SELECT key FROM segments "
+            "ORDER BY accessed_at DESC, rowid DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._conn.close()
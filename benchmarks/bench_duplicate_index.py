@@ -0,0 +1,63 @@
+"""Measure near-duplicate index inserts and lookups at 100k entries.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_duplicate_index
+"""
+
+import random
+import time
+
+from app.utils.duplicate_index import DuplicateIndex, simhash
+
+ENTRY_COUNT = 100_000
+LOOKUP_COUNT = 1000
+WORDS = [f"word{i}" for i in range(5000)]
+
+
+def body(rng: random.Random) -> str:
+    """Random 200-word email body."""
+    return " ".join(rng.choices(WORDS, k=200))
+
+
+def main() -> None:
+    """Fill an in-memory index and time lookups of copies and new bodies."""
+    rng = random.Random(0)
+    index = DuplicateIndex(":memory:")
+    bodies = [body(rng) for _ in range(ENTRY_COUNT)]
+
+    started = time.perf_counter()
+    for number, text in enumerate(bodies):
+        index.add(f"msg{number}", text, "", "")
+    insert_seconds = time.perf_counter() - started
+
+    copies = [f"Fwd: {text}" for text in rng.sample(bodies, LOOKUP_COUNT)]
+    fresh = [body(rng) for _ in range(LOOKUP_COUNT)]
+    started = time.perf_counter()
+    found = sum(index.find(text) is not None for text in copies)
+    copy_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    false_hits = sum(index.find(text) is not None for text in fresh)
+    fresh_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for text in fresh:
+        simhash(text)
+    hash_seconds = time.perf_counter() - started
+
+    print(f"entries:        {len(index)}")
+    print(f"simhash only:   {hash_seconds / LOOKUP_COUNT * 1e6:.0f} µs")
+    print(f"insert:         {insert_seconds / ENTRY_COUNT * 1e6:.0f} µs/entry")
+    print(
+        f"lookup (copy):  {copy_seconds / LOOKUP_COUNT * 1e6:.0f} µs, "
+        f"{found}/{LOOKUP_COUNT} found"
+    )
+    print(
+        f"lookup (fresh): {fresh_seconds / LOOKUP_COUNT * 1e6:.0f} µs, "
+        f"{false_hits}/{LOOKUP_COUNT} false matches"
+    )
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
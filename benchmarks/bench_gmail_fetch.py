@@ -0,0 +1,84 @@
+"""Measure Gmail fetch cost with and without field masks and two-phase fetch.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_gmail_fetch
+
+Uses the local fake Gmail server from the test suite, so no credentials are
+needed. Half of the messages match the subject filter, as happens when
+history-based sync sees every new inbox message.
+"""
+
+import asyncio
+import time
+from typing import Optional
+from unittest.mock import patch
+
+from app.services.gmail_service import GmailService
+from tests.fakes.gmail_server import FakeGmailServer, make_message
+
+MESSAGE_COUNT = 200
+BODY_SIZE = 10_000
+LATENCY = 0.02
+
+
+def create_service(server: FakeGmailServer) -> GmailService:
+    """Create a GmailService wired to the fake server."""
+    with (
+        patch.object(GmailService, "_get_credentials", return_value=None),
+        patch(
+            "app.services.gmail_service.build_from_document",
+            side_effect=lambda *args, **kwargs: server.build_resource(),
+        ),
+    ):
+        return GmailService(token_path="unused.json", credentials_path="unused.json")
+
+
+async def measure(
+    label: str, two_phase: bool, full_fields: Optional[str], metadata_fields: str
+) -> None:
+    """Fetch all messages once and print bytes, round trips and latency."""
+    messages = [
+        make_message(
+            f"m{i:04d}",
+            subject="The Briefing" if i % 2 else "Weekly digest",
+            body="x" * BODY_SIZE,
+        )
+        for i in range(MESSAGE_COUNT)
+    ]
+    with (
+        FakeGmailServer(messages, latency=LATENCY) as server,
+        patch("app.services.gmail_service.settings.gmail_two_phase_fetch", two_phase),
+        patch("app.services.gmail_service.FULL_FIELDS", full_fields),
+        patch("app.services.gmail_service.METADATA_FIELDS", metadata_fields),
+    ):
+        service = create_service(server)
+        started = time.perf_counter()
+        emails, _ = await service.fetch_messages(
+            [message["id"] for message in messages], match_filter=True
+        )
+        elapsed = time.perf_counter() - started
+        service.close()
+
+    print(
+        f"{label:<28} emails={len(emails):>4} "
+        f"bytes={server.response_bytes:>10,} "
+        f"round_trips={server.round_trips:>3} "
+        f"latency={elapsed * 1000:8.1f} ms"
+    )
+
+
+async def main() -> None:
+    """Run all scenarios."""
+    await measure("full, no field mask", False, None, "")
+    await measure("full, field mask", False, "id,threadId,labelIds,payload", "")
+    await measure(
+        "metadata then full, masks",
+        True,
+        "id,threadId,labelIds,payload",
+        "id,threadId,labelIds,payload/headers",
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,32 @@
+"""Measure local language detection latency per email.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_language_detector
+"""
+
+import time
+
+from app.utils.language_detector import detect_language
+
+ROUNDS = 10_000
+BODIES = {
+    "English": "Hello team, the quarterly review moved to Friday at 10am. " * 200,
+    "Japanese": "お世話になっております。来週の定例会議は水曜日に変更となりました。"
+    * 200,
+    "Mixed": "Hi 田中さん, the meeting is moved to Friday. Please confirm. " * 200,
+}
+
+
+def main() -> None:
+    """Detect each sample body ROUNDS times and report the mean latency."""
+    for name, body in BODIES.items():
+        started = time.perf_counter()
+        for _ in range(ROUNDS):
+            language = detect_language(body)
+        elapsed = time.perf_counter() - started
+        print(f"{name:9} -> {language:8} {elapsed / ROUNDS * 1e6:6.1f} µs/email")
+
+
+if __name__ == "__main__":
+    main()
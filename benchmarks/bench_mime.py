@@ -0,0 +1,107 @@
+"""Microbenchmarks for MIME body extraction on large synthetic payloads.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_mime
+"""
+
+import base64
+import timeit
+from typing import Any, Callable, Dict
+
+from app.utils.mime import extract_text_body
+
+MAX_CHARS = 200_000
+
+
+def encode(text: str) -> str:
+    """Base64url-encode text the way Gmail does."""
+    return base64.urlsafe_b64encode(text.encode("utf-8")).decode()
+
+
+def html_newsletter(size: int) -> Dict[str, Any]:
+    """HTML-only newsletter of roughly ``size`` bytes inside multipart/mixed."""
+    block = (
+        '<table><tr><td style="padding:8px"><h2>Section</h2>'
+        '<p>Lorem ipsum dolor sit amet, <a href="https://example.com/t?id=1">'
+        "consectetur</a> adipiscing elit &amp; more.</p></td></tr></table>"
+    )
+    html = "<html><body>" + block * (size // len(block)) + "</body></html>"
+    return {
+        "mimeType": "multipart/mixed",
+        "parts": [
+            {
+                "mimeType": "multipart/alternative",
+                "parts": [
+                    {
+                        "mimeType": "text/html",
+                        "headers": [
+                            {
+                                "name": "Content-Type",
+                                "value": "text/html; charset=utf-8",
+                            }
+                        ],
+                        "body": {"data": encode(html)},
+                    }
+                ],
+            }
+        ],
+    }
+
+
+def plain_with_attachments(size: int, attachments: int) -> Dict[str, Any]:
+    """Plain-text body after many large attachments."""
+    parts = [
+        {
+            "mimeType": "application/pdf",
+            "filename": f"file{i}.pdf",
+            "body": {"data": encode("x" * 10_000)},
+        }
+        for i in range(attachments)
+    ]
+    parts.append({"mimeType": "text/plain", "body": {"data": encode("y" * size)}})
+    return {"mimeType": "multipart/mixed", "parts": parts}
+
+
+def deeply_nested(depth: int) -> Dict[str, Any]:
+    """Plain-text body nested ``depth`` multipart levels deep."""
+    payload: Dict[str, Any] = {
+        "mimeType": "text/plain",
+        "body": {"data": encode("Deep body")},
+    }
+    for _ in range(depth):
+        payload = {"mimeType": "multipart/mixed", "parts": [payload]}
+    return payload
+
+
+def bench(label: str, func: Callable[[], str], number: int) -> None:
+    """Time ``func`` and print the mean per call."""
+    seconds = min(timeit.repeat(func, number=number, repeat=3)) / number
+    print(f"{label:<36} {seconds * 1000:9.2f} ms/call  ({len(func()):,} chars)")
+
+
+def main() -> None:
+    """Run all microbenchmarks."""
+    for size in (100_000, 1_000_000, 5_000_000):
+        payload = html_newsletter(size)
+        bench(
+            f"HTML newsletter {size // 1000:,} KB",
+            lambda payload=payload: extract_text_body(payload, MAX_CHARS),
+            5,
+        )
+    payload = plain_with_attachments(1_000_000, 200)
+    bench(
+        "plain 1 MB after 200 attachments",
+        lambda: extract_text_body(payload, MAX_CHARS),
+        20,
+    )
+    payload = deeply_nested(10_000)
+    bench(
+        "10,000 nested multipart levels",
+        lambda: extract_text_body(payload, MAX_CHARS),
+        20,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Compare the Notion content splitter with the previous concatenating one.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_notion_split
+"""
+
+import time
+from typing import Callable, List
+
+from app.services.notion_service import NotionService
+
+LIMIT = NotionService.NOTION_TEXT_LIMIT
+TARGET_BYTES = 1_000_000
+
+
+def legacy_split(content: str) -> List[str]:
+    """Previous splitter: rebuilds the current chunk string on every line."""
+    current_chunk = ""
+    chunks = []
+    for paragraph in content.split("\n"):
+        new_chunk = current_chunk + ("\n" if current_chunk else "") + paragraph
+        if len(new_chunk) > LIMIT:
+            if current_chunk:
+                chunks.append(current_chunk)
+                current_chunk = paragraph
+            else:
+                chunks.append(paragraph[:LIMIT])
+                current_chunk = paragraph[LIMIT:]
+        else:
+            current_chunk = new_chunk
+    if current_chunk:
+        chunks.append(current_chunk)
+    return chunks
+
+
+def sample(line: str) -> str:
+    """Repeat ``line`` up to about TARGET_BYTES of UTF-8."""
+    return "\n".join([line] * (TARGET_BYTES // len(line.encode("utf-8"))))
+
+
+def block_texts(service: NotionService) -> Callable[[str], List[str]]:
+    """Wrap markdown-to-block conversion to return the block texts."""
+
+    def convert(content: str) -> List[str]:
+        return [
+            block[block["type"]]["rich_text"][0]["text"]["content"]
+            for block in service._create_block_objects(content)
+        ]
+
+    return convert
+
+
+def measure(name: str, split: Callable[[str], List[str]], content: str) -> None:
+    """Time one splitter and report chunk count and the longest chunk."""
+    started = time.perf_counter()
+    chunks = split(content)
+    elapsed = time.perf_counter() - started
+    longest = max(len(chunk) for chunk in chunks)
+    print(
+        f"  {name:8} {elapsed * 1000:8.1f} ms  {len(chunks):6} chunks  "
+        f"longest {longest}"
+    )
+
+
+def main() -> None:
+    """Split 1 MB inputs of short, Japanese and over-limit lines."""
+    service = NotionService("token", "database")
+    inputs = {
+        "short English lines": sample("- Item with a short line of text"),
+        "Japanese lines": sample("来週の定例会議は水曜日に変更となりました。"),
+        "over-limit lines": sample("x" * (LIMIT * 2 + 500)),
+    }
+    for name, content in inputs.items():
+        print(f"{name} ({len(content.encode('utf-8')) / 1e6:.1f} MB):")
+        measure("legacy", legacy_split, content)
+        measure("current", service._split_content, content)
+        measure("blocks", block_texts(service), content)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Measure pre-processing cost and token savings on synthetic newsletters.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_preprocessor
+"""
+
+import time
+
+from app.utils.preprocessor import EmailPreprocessor
+
+EMAIL_COUNT = 1000
+
+
+def newsletter(issue: int) -> str:
+    """Newsletter with stories, a tracking-link list, a footer and a reply."""
+    stories = "\n\n".join(
+        f"Story {i}: Markets moved on issue {issue} as analysts weighed new data."
+        for i in range(20)
+    )
+    links = "\n".join(
+        f"https://click.example.com/track/{issue}/{i}?utm_source=briefing"
+        for i in range(30)
+    )
+    footer = (
+        "The Briefing, 1 Market Street, New York\n"
+        "You are receiving this because you signed up.\n"
+        "Unsubscribe | Manage preferences | Privacy policy\n"
+        "© 2025 The Briefing. All rights reserved."
+    )
+    return f"{stories}\n\n{links}\n\n{footer}"
+
+
+def main() -> None:
+    """Pre-process EMAIL_COUNT newsletters and report time and savings."""
+    preprocessor = EmailPreprocessor()
+    bodies = [newsletter(issue) for issue in range(EMAIL_COUNT)]
+
+    started = time.perf_counter()
+    results = [preprocessor.preprocess(body, "briefing@example.com") for body in bodies]
+    elapsed = time.perf_counter() - started
+
+    before = sum(result.tokens_before for result in results)
+    after = sum(result.tokens_after for result in results)
+    print(f"{EMAIL_COUNT} emails in {elapsed * 1000:.1f} ms")
+    print(f"{elapsed / EMAIL_COUNT * 1e6:.1f} us/email")
+    print(f"tokens ~{before} -> ~{after} ({(before - after) / before:.0%} saved)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Local stand-ins for the external APIs used by the services."""
@@ -0,0 +1,320 @@
+"""Local fake of the Anthropic Messages and Message Batches APIs for tests."""
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+# A responder returns the reply text, (text, stop_reason), or a dict that is
+# sent back as the input of a call to the tool the request forces
+Responder = Callable[[Dict[str, Any]], Union[str, Tuple[str, str], Dict[str, Any]]]
+
+
+def echo_responder(request: Dict[str, Any]) -> str:
+    """Answer with the text of the last user message."""
+    content = request["messages"][-1]["content"]
+    if isinstance(content, list):
+        content = "".join(block.get("text", "") for block in content)
+    return f"翻訳: {content}"
+
+
+class FakeAnthropicServer:
+    """Threaded HTTP server emulating the Messages and Message Batches APIs.
+
+    Every request sleeps for ``latency`` seconds before answering, and the
+    highest number of requests served at once is kept in ``max_in_flight``.
+
+    Streaming requests are answered as server-sent events, one text delta per
+    word, with ``stream_delay`` seconds between deltas.
+
+    Message Batches are answered synchronously but report ``in_progress``
+    until they have been retrieved ``batch_polls_to_end`` times. Requests
+    whose ``custom_id`` is in ``batch_error_ids`` come back ``errored``.
+    """
+
+    def __init__(
+        self, latency: float = 0.0, responder: Optional[Responder] = None
+    ) -> None:
+        self.latency = latency
+        self.responder = responder or echo_responder
+        self.requests: List[Dict[str, Any]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.stream_delay = 0.0
+        self.cached_prefixes: set[str] = set()
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self.batch_polls_to_end = 2
+        self.batch_polls = 0
+        self.batch_error_ids: set[str] = set()
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        """Root URL of the fake server."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    def __enter__(self) -> "FakeAnthropicServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def usage(self, request: Dict[str, Any], text: str) -> Dict[str, int]:
+        """Count tokens (one per four characters) the way prompt caching does.
+
+        System blocks up to the last ``cache_control`` boundary form the
+        cached prefix: the first request writes it, later ones read it.
+        """
+        system = request.get("system", [])
+        if isinstance(system, str):
+            system = [{"type": "text", "text": system}]
+        boundary = max(
+            (i + 1 for i, block in enumerate(system) if "cache_control" in block),
+            default=0,
+        )
+        prefix = "".join(block["text"] for block in system[:boundary])
+        rest = "".join(block["text"] for block in system[boundary:])
+        rest += json.dumps(request["messages"], ensure_ascii=False)
+        usage = {
+            "input_tokens": len(rest) // 4,
+            "output_tokens": len(text) // 4,
+            "cache_creation_input_tokens": 0,
+            "cache_read_input_tokens": 0,
+        }
+        if prefix:
+            with self._lock:
+                cached = prefix in self.cached_prefixes
+                self.cached_prefixes.add(prefix)
+            key = "cache_read_input_tokens" if cached else "cache_creation_input_tokens"
+            usage[key] = len(prefix) // 4
+        return usage
+
+    def create_message(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Build a Messages API response for one request body."""
+        reply = self.responder(request)
+        content: List[Dict[str, Any]]
+        if isinstance(reply, dict):
+            text, stop_reason = json.dumps(reply), "tool_use"
+            content = [
+                {
+                    "type": "tool_use",
+                    "id": f"toolu_{len(self.requests):04d}",
+                    "name": request["tool_choice"]["name"],
+                    "input": reply,
+                }
+            ]
+        else:
+            text, stop_reason = (
+                reply if isinstance(reply, tuple) else (reply, "end_turn")
+            )
+            content = [{"type": "text", "text": text}]
+        return {
+            "id": f"msg_{len(self.requests):04d}",
+            "type": "message",
+            "role": "assistant",
+            "model": request["model"],
+            "content": content,
+            "stop_reason": stop_reason,
+            "stop_sequence": None,
+            "usage": self.usage(request, text),
+        }
+
+    def stream_events(self, message: Dict[str, Any]) -> Iterator[bytes]:
+        """Encode a message as the server-sent events of a streaming response."""
+
+        def event(name: str, data: Dict[str, Any]) -> bytes:
+            payload = json.dumps({"type": name, **data}, ensure_ascii=False)
+            return f"event: {name}\ndata: {payload}\n\n".encode()
+
+        text = message["content"][0]["text"]
+        start = {**message, "content": [], "stop_reason": None}
+        yield event("message_start", {"message": start})
+        yield event(
+            "content_block_start",
+            {"index": 0, "content_block": {"type": "text", "text": ""}},
+        )
+        for piece in re.findall(r"\S*\s*", text):
+            if piece:
+                yield event(
+                    "content_block_delta",
+                    {"index": 0, "delta": {"type": "text_delta", "text": piece}},
+                )
+        yield event("content_block_stop", {"index": 0})
+        yield event(
+            "message_delta",
+            {
+                "delta": {"stop_reason": message["stop_reason"], "stop_sequence": None},
+                "usage": {"output_tokens": message["usage"]["output_tokens"]},
+            },
+        )
+        yield event("message_stop", {})
+
+    def dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+        """Route one API call and return status and payload.
+
+        The payload is JSON-serialisable data, bytes for JSONL results, or an
+        iterator of server-sent events for streaming requests.
+        """
+        route = path.split("?")[0].strip("/").split("/")
+        if method == "POST" and route == ["v1", "messages"]:
+            request = json.loads(body)
+            with self._lock:
+                self.requests.append(request)
+            message = self.create_message(request)
+            if request.get("stream"):
+                return 200, self.stream_events(message)
+            return 200, message
+        if method == "POST" and route == ["v1", "messages", "batches"]:
+            return 200, self._create_batch(json.loads(body)["requests"])
+        if method == "GET" and route[:3] == ["v1", "messages", "batches"]:
+            batch = self.batches.get(route[3]) if len(route) > 3 else None
+            if batch is not None and route[4:] == []:
+                return 200, self._poll_batch(batch)
+            if batch is not None and route[4:] == ["results"]:
+                return 200, self._batch_results(batch)
+        return 404, {
+            "type": "error",
+            "error": {"type": "not_found_error", "message": "Not Found"},
+        }
+
+    def _create_batch(self, requests: List[Dict[str, Any]]) -> Dict[str, Any]:
+        batch_id = f"msgbatch_{len(self.batches):04d}"
+        batch = {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "in_progress",
+            "request_counts": {
+                "processing": len(requests),
+                "succeeded": 0,
+                "errored": 0,
+                "canceled": 0,
+                "expired": 0,
+            },
+            "created_at": "2025-01-01T00:00:00Z",
+            "expires_at": "2025-01-02T00:00:00Z",
+            "ended_at": None,
+            "archived_at": None,
+            "cancel_initiated_at": None,
+            "results_url": None,
+        }
+        with self._lock:
+            self.batches[batch_id] = {"batch": batch, "requests": requests}
+        return batch
+
+    def _poll_batch(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        batch: Dict[str, Any] = record["batch"]
+        with self._lock:
+            self.batch_polls += 1
+            record["polls"] = record.get("polls", 0) + 1
+            if record["polls"] < self.batch_polls_to_end:
+                return batch
+        errored = sum(
+            request["custom_id"] in self.batch_error_ids
+            for request in record["requests"]
+        )
+        batch.update(
+            processing_status="ended",
+            ended_at="2025-01-01T00:10:00Z",
+            results_url=f"{self.base_url}/v1/messages/batches/{batch['id']}/results",
+            request_counts={
+                "processing": 0,
+                "succeeded": len(record["requests"]) - errored,
+                "errored": errored,
+                "canceled": 0,
+                "expired": 0,
+            },
+        )
+        return batch
+
+    def _batch_results(self, record: Dict[str, Any]) -> bytes:
+        lines = []
+        for request in record["requests"]:
+            result: Dict[str, Any]
+            if request["custom_id"] in self.batch_error_ids:
+                result = {
+                    "type": "errored",
+                    "error": {
+                        "type": "error",
+                        "error": {"type": "api_error", "message": "Internal error"},
+                    },
+                }
+            else:
+                result = {
+                    "type": "succeeded",
+                    "message": self.create_message(request["params"]),
+                }
+            lines.append(
+                json.dumps({"custom_id": request["custom_id"], "result": result})
+            )
+        return "\n".join(lines).encode()
+
+    def serve(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+        """Answer one HTTP request after ``latency``, tracking concurrency."""
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency)
+            return self.dispatch(method, path, body)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _handler_class(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Request handler bound to the enclosing fake server."""
+
+            def log_message(self, *args: Any) -> None:  # noqa: D401
+                """Silence the default stderr access log."""
+
+            def _serve(self, method: str) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length) if length else b""
+                status, data = server.serve(method, self.path, body)
+                if isinstance(data, Iterator):
+                    self._stream(status, data)
+                else:
+                    self._respond(status, data)
+
+            def _respond(self, status: int, data: Any) -> None:
+                if isinstance(data, bytes):
+                    payload, content_type = data, "application/binary"
+                else:
+                    payload, content_type = (
+                        json.dumps(data).encode(),
+                        "application/json",
+                    )
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _stream(self, status: int, events: Iterator[bytes]) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for event in events:
+                    self.wfile.write(event)
+                    self.wfile.flush()
+                    time.sleep(server.stream_delay)
+
+            def do_GET(self) -> None:  # noqa: N802
+                """Handle GET requests."""
+                self._serve("GET")
+
+            def do_POST(self) -> None:  # noqa: N802
+                """Handle POST requests."""
+                self._serve("POST")
+
+        return Handler
@@ -0,0 +1,401 @@
+"""Local fake of the Gmail REST API for round-trip level tests."""
+
+import base64
+import email.parser
+import json
+import threading
+import time
+import urllib.parse
+from email.message import Message
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple, cast
+
+import googleapiclient.discovery_cache
+import httplib2
+from googleapiclient.discovery import Resource, build_from_document
+
+API_PREFIX = "/gmail/v1/users/me/"
+
+FieldTree = Dict[str, Any]
+
+
+def parse_fields(expression: str) -> FieldTree:
+    """Parse a partial-response ``fields`` expression into a selection tree.
+
+    ``"id,payload/headers,messages(id,threadId)"`` becomes
+    ``{"id": {}, "payload": {"headers": {}}, "messages": {"id": {}, ...}}``,
+    where an empty dict selects the whole value.
+    """
+    tree: FieldTree = {}
+    position = 0
+
+    def parse_list(target: FieldTree) -> None:
+        nonlocal position
+        while position < len(expression) and expression[position] != ")":
+            node = target
+            while True:
+                start = position
+                while position < len(expression) and expression[position] not in ",/()":
+                    position += 1
+                node = node.setdefault(expression[start:position].strip(), {})
+                if position < len(expression) and expression[position] == "/":
+                    position += 1
+                    continue
+                break
+            if position < len(expression) and expression[position] == "(":
+                position += 1
+                parse_list(node)
+                position += 1  # closing parenthesis
+            if position < len(expression) and expression[position] == ",":
+                position += 1
+
+    parse_list(tree)
+    return tree
+
+
+def apply_fields(data: Any, tree: FieldTree) -> Any:
+    """Keep only the parts of ``data`` selected by a parsed fields tree."""
+    if not tree:
+        return data
+    if isinstance(data, list):
+        return [apply_fields(item, tree) for item in data]
+    if isinstance(data, dict):
+        return {
+            key: apply_fields(data[key], subtree)
+            for key, subtree in tree.items()
+            if key in data
+        }
+    return data
+
+
+def make_message(
+    msg_id: str,
+    subject: str = "The Briefing",
+    body: str = "Test email body",
+    sender: str = "sender@example.com",
+    date: str = "Wed, 1 Jan 2025 10:00:00 +0000",
+    labels: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Build a Gmail ``format=full`` message resource."""
+    return {
+        "id": msg_id,
+        "threadId": f"thread-{msg_id}",
+        "labelIds": labels if labels is not None else ["INBOX", "UNREAD"],
+        "snippet": body[:100],
+        "sizeEstimate": len(body),
+        "payload": {
+            "mimeType": "text/plain",
+            "headers": [
+                {"name": "Subject", "value": subject},
+                {"name": "From", "value": sender},
+                {"name": "Date", "value": date},
+            ],
+            "body": {
+                "size": len(body),
+                "data": base64.urlsafe_b64encode(body.encode("utf-8")).decode(),
+            },
+        },
+    }
+
+
+class FakeGmailServer:
+    """Threaded HTTP server emulating the Gmail endpoints used by GmailService.
+
+    Every HTTP request that reaches the server is counted in ``round_trips``,
+    so batched calls count once no matter how many sub-requests they carry.
+    """
+
+    def __init__(
+        self, messages: Optional[List[Dict[str, Any]]] = None, latency: float = 0.0
+    ) -> None:
+        self.messages: Dict[str, Dict[str, Any]] = {}
+        self.history_id = 1000
+        self.oldest_history_id = 1000
+        self.history: List[Tuple[int, str]] = []
+        for message in messages or []:
+            self.add_message(message)
+        self.latency = latency
+        self.round_trips = 0
+        self.response_bytes = 0
+        self.calls: List[Tuple[str, str]] = []
+        self.params: List[Dict[str, List[str]]] = []
+        self.failing_ids: set[str] = set()
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        """Root URL of the fake server."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host!s}:{port}/"
+
+    def __enter__(self) -> "FakeGmailServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def add_message(self, message: Dict[str, Any]) -> None:
+        """Deliver a message and record a messageAdded history event."""
+        self.history_id += 1
+        message["historyId"] = str(self.history_id)
+        self.messages[message["id"]] = message
+        self.history.append((self.history_id, message["id"]))
+
+    def expire_history(self) -> None:
+        """Drop all history records, as Gmail does after about a week."""
+        self.oldest_history_id = self.history_id + 1
+        self.history = []
+
+    def build_resource(self) -> Resource:
+        """Build a real googleapiclient Resource pointed at this server."""
+        document = json.loads(
+            googleapiclient.discovery_cache.get_static_doc("gmail", "v1")
+        )
+        document["rootUrl"] = self.base_url
+        return build_from_document(document, http=httplib2.Http())
+
+    def dispatch(
+        self, method: str, target: str, body: bytes
+    ) -> Tuple[int, Dict[str, Any]]:
+        """Route one (possibly batched) API call and return status and payload."""
+        parsed = urllib.parse.urlparse(target)
+        params = urllib.parse.parse_qs(parsed.query)
+        path = parsed.path
+        with self._lock:
+            self.calls.append((method, path))
+            self.params.append(params)
+        if not path.startswith(API_PREFIX):
+            return 404, {"error": {"code": 404, "message": "Not Found"}}
+        route = path[len(API_PREFIX) :].split("/")
+        status, payload = self._route(method, route, params, body)
+        if status < 300 and "fields" in params:
+            payload = apply_fields(payload, parse_fields(params["fields"][0]))
+        return status, payload
+
+    def _route(
+        self, method: str, route: List[str], params: Dict[str, List[str]], body: bytes
+    ) -> Tuple[int, Dict[str, Any]]:
+
+        if route == ["messages"] and method == "GET":
+            return 200, self._list_messages(params)
+        if route == ["profile"] and method == "GET":
+            return 200, {
+                "emailAddress": "me@example.com",
+                "historyId": str(self.history_id),
+            }
+        if route == ["history"] and method == "GET":
+            return self._list_history(params)
+        if len(route) == 2 and route[0] == "messages" and method == "GET":
+            return self._get_message(route[1], params)
+        if len(route) == 2 and route[0] == "messages" and method == "DELETE":
+            return self._pop_message(route[1])
+        if route == ["messages", "batchModify"] and method == "POST":
+            return self._batch_modify(json.loads(body or b"{}"))
+        if route == ["messages", "batchDelete"] and method == "POST":
+            return self._batch_delete(json.loads(body or b"{}"))
+        if len(route) == 3 and route[2] == "modify" and method == "POST":
+            return self._modify_message(route[1], json.loads(body or b"{}"))
+        return 404, {"error": {"code": 404, "message": "Not Found"}}
+
+    def _list_messages(self, params: Dict[str, List[str]]) -> Dict[str, Any]:
+        label_ids = params.get("labelIds", [])
+        ids = [
+            msg_id
+            for msg_id, message in self.messages.items()
+            if all(label in message.get("labelIds", []) for label in label_ids)
+        ]
+        start = int(params.get("pageToken", ["0"])[0])
+        size = int(params.get("maxResults", ["100"])[0])
+        page = ids[start : start + size]
+        response: Dict[str, Any] = {
+            "messages": [
+                {"id": msg_id, "threadId": self.messages[msg_id]["threadId"]}
+                for msg_id in page
+            ],
+            "resultSizeEstimate": len(ids),
+        }
+        if start + size < len(ids):
+            response["nextPageToken"] = str(start + size)
+        return response
+
+    def _list_history(self, params: Dict[str, List[str]]) -> Tuple[int, Dict[str, Any]]:
+        start = int(params["startHistoryId"][0])
+        if start < self.oldest_history_id:
+            return 404, {
+                "error": {"code": 404, "message": "Requested entity was not found."}
+            }
+        label_id = params.get("labelId", [None])[0]
+        records = [
+            {
+                "id": str(history_id),
+                "messagesAdded": [
+                    {
+                        "message": {
+                            "id": msg_id,
+                            "threadId": self.messages[msg_id]["threadId"],
+                            "labelIds": self.messages[msg_id]["labelIds"],
+                        }
+                    }
+                ],
+            }
+            for history_id, msg_id in self.history
+            if history_id > start
+            and msg_id in self.messages
+            and (label_id is None or label_id in self.messages[msg_id]["labelIds"])
+        ]
+        offset = int(params.get("pageToken", ["0"])[0])
+        size = int(params.get("maxResults", ["100"])[0])
+        response: Dict[str, Any] = {
+            "history": records[offset : offset + size],
+            "historyId": str(self.history_id),
+        }
+        if offset + size < len(records):
+            response["nextPageToken"] = str(offset + size)
+        return 200, response
+
+    def _get_message(
+        self, msg_id: str, params: Dict[str, List[str]]
+    ) -> Tuple[int, Dict[str, Any]]:
+        if msg_id in self.failing_ids or msg_id not in self.messages:
+            return 404, {
+                "error": {"code": 404, "message": "Requested entity was not found."}
+            }
+        message = self.messages[msg_id]
+        if params.get("format", ["full"])[0] != "metadata":
+            return 200, message
+        wanted = {name.lower() for name in params.get("metadataHeaders", [])}
+        headers = [
+            header
+            for header in message["payload"]["headers"]
+            if not wanted or header["name"].lower() in wanted
+        ]
+        metadata = {key: value for key, value in message.items() if key != "payload"}
+        metadata["payload"] = {
+            "mimeType": message["payload"]["mimeType"],
+            "headers": headers,
+        }
+        return 200, metadata
+
+    def _pop_message(self, msg_id: str) -> Tuple[int, Dict[str, Any]]:
+        if self.messages.pop(msg_id, None) is None:
+            return 404, {"error": {"code": 404, "message": "Not Found"}}
+        return 204, {}
+
+    def _modify_message(
+        self, msg_id: str, body: Dict[str, Any]
+    ) -> Tuple[int, Dict[str, Any]]:
+        message = self.messages.get(msg_id)
+        if message is None:
+            return 404, {"error": {"code": 404, "message": "Not Found"}}
+        labels = [
+            label
+            for label in message.get("labelIds", [])
+            if label not in body.get("removeLabelIds", [])
+        ]
+        labels.extend(body.get("addLabelIds", []))
+        message["labelIds"] = labels
+        return 200, {"id": msg_id, "labelIds": labels}
+
+    def _check_bulk_ids(self, body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        ids = body.get("ids", [])
+        if len(ids) > 1000:
+            return {"error": {"code": 400, "message": "Too many ids"}}
+        if any(msg_id not in self.messages for msg_id in ids):
+            return {"error": {"code": 400, "message": "Invalid id value"}}
+        return None
+
+    def _batch_modify(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        error = self._check_bulk_ids(body)
+        if error is not None:
+            return 400, error
+        for msg_id in body["ids"]:
+            self._modify_message(msg_id, body)
+        return 204, {}
+
+    def _batch_delete(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        error = self._check_bulk_ids(body)
+        if error is not None:
+            return 400, error
+        for msg_id in body["ids"]:
+            self.messages.pop(msg_id)
+        return 204, {}
+
+    def _handle_batch(self, content_type: str, body: bytes) -> Tuple[str, bytes]:
+        """Answer a multipart/mixed batch the way the Gmail batch endpoint does."""
+        parser = email.parser.BytesFeedParser()
+        parser.feed(f"Content-Type: {content_type}\r\n\r\n".encode())
+        parser.feed(body)
+        request = parser.close()
+
+        boundary = "batch_fake_boundary"
+        out: List[str] = []
+        for part in cast(List[Message], request.get_payload()):
+            content_id = str(part["Content-ID"])
+            inner = str(part.get_payload())
+            request_line, _, rest = inner.partition("\n")
+            method, target, _ = request_line.split(" ", 2)
+            _, _, inner_body = rest.partition("\n\n")
+            status, payload = self.dispatch(method, target, inner_body.encode())
+            payload_text = json.dumps(payload) if status != 204 else ""
+            out.append(
+                f"--{boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id[1:-1]}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status < 300 else 'Error'}\r\n"
+                "Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{payload_text}\r\n"
+            )
+        out.append(f"--{boundary}--\r\n")
+        return f"multipart/mixed; boundary={boundary}", "".join(out).encode()
+
+    def _handler_class(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Request handler bound to the enclosing fake server."""
+
+            def log_message(self, *args: Any) -> None:  # noqa: D401
+                """Silence the default stderr access log."""
+
+            def _respond(self, status: int, content_type: str, body: bytes) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with server._lock:
+                    server.response_bytes += len(body)
+
+            def _serve(self, method: str) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length) if length else b""
+                with server._lock:
+                    server.round_trips += 1
+                time.sleep(server.latency)
+                if self.path.startswith("/batch"):
+                    content_type, payload = server._handle_batch(
+                        self.headers["Content-Type"], body
+                    )
+                    self._respond(200, content_type, payload)
+                    return
+                status, data = server.dispatch(method, self.path, body)
+                payload = json.dumps(data).encode() if status != 204 else b""
+                self._respond(status, "application/json; charset=UTF-8", payload)
+
+            def do_GET(self) -> None:  # noqa: N802
+                """Handle GET requests."""
+                self._serve("GET")
+
+            def do_POST(self) -> None:  # noqa: N802
+                """Handle POST requests."""
+                self._serve("POST")
+
+            def do_DELETE(self) -> None:  # noqa: N802
+                """Handle DELETE requests."""
+                self._serve("DELETE")
+
+        return Handler
@@ -0,0 +1,269 @@
+"""Local fake of the Notion pages and block children APIs for tests."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+_NOT_FOUND = {
+    "object": "error",
+    "status": 404,
+    "code": "object_not_found",
+    "message": "Not found",
+}
+
+
+class FakeNotionServer:
+    """Threaded HTTP server emulating the Notion API, with throttling.
+
+    Requests whose zero-based index is in ``throttle_requests`` are answered
+    with HTTP 429 and a ``Retry-After`` of ``retry_after`` seconds. When
+    ``rate_limit`` is set, the server also enforces that many requests per
+    second itself (one-request bucket) and throttles anything faster.
+
+    Pages created and blocks appended are kept in ``pages``, each block
+    with a generated ``id``, and the arrival time and method of every
+    request in ``request_times`` and ``methods``. ``databases.query`` lists
+    every page regardless of the filter, ``page_size`` at a time; block
+    children are listed, updated, deleted and inserted ``after`` a block
+    like the real API.
+    """
+
+    def __init__(
+        self, rate_limit: Optional[float] = None, retry_after: float = 0.1
+    ) -> None:
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.throttle_requests: Set[int] = set()
+        self.throttled = 0
+        self.request_times: List[float] = []
+        self.methods: List[str] = []
+        self.pages: Dict[str, Dict[str, Any]] = {}
+        self.queries = 0
+        self._block_count = 0
+        self._next_allowed = 0.0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        """Root URL of the fake server."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    def __enter__(self) -> "FakeNotionServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def texts(self, page_id: str) -> List[str]:
+        """Text of every block of a page, in order."""
+        return [
+            "".join(
+                part["text"]["content"] for part in block[block["type"]]["rich_text"]
+            )
+            for block in self.pages[page_id]["children"]
+        ]
+
+    def _should_throttle(self, method: str) -> bool:
+        """Record a request and decide whether to answer it with 429."""
+        with self._lock:
+            now = time.monotonic()
+            index = len(self.request_times)
+            self.request_times.append(now)
+            self.methods.append(method)
+            throttle = index in self.throttle_requests
+            if self.rate_limit and not throttle:
+                throttle = now < self._next_allowed
+                if not throttle:
+                    self._next_allowed = now + 1 / self.rate_limit
+            self.throttled += throttle
+            return throttle
+
+    def dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+        """Route one API call and return status and JSON payload."""
+        if self._should_throttle(method):
+            return 429, {
+                "object": "error",
+                "status": 429,
+                "code": "rate_limited",
+                "message": "You have been rate limited.",
+            }
+        url = urlsplit(path)
+        route = url.path.strip("/").split("/")
+        data = json.loads(body) if body else {}
+        if url.query:
+            data.update({k: v[0] for k, v in parse_qs(url.query).items()})
+        if method == "POST" and route == ["v1", "pages"]:
+            with self._lock:
+                page_id = f"page-{len(self.pages):04d}"
+                children = self._new_blocks(data.get("children", []))
+                self.pages[page_id] = {**data, "children": children}
+            return 200, {
+                "object": "page",
+                "id": page_id,
+                "url": f"https://www.notion.so/{page_id}",
+            }
+        if (
+            method == "POST"
+            and route[:2] == ["v1", "databases"]
+            and route[3:] == ["query"]
+        ):
+            return 200, self._query(data)
+        if route[:2] == ["v1", "blocks"] and len(route) > 2:
+            return self._blocks(method, route[2:], data)
+        return 404, _NOT_FOUND
+
+    def _query(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer databases.query with every page, paginated by page_size."""
+        with self._lock:
+            self.queries += 1
+            page_ids = sorted(self.pages)
+        start = int(data.get("start_cursor") or 0)
+        end = start + data.get("page_size", 100)
+        results = []
+        for page_id in page_ids[start:end]:
+            properties = {
+                name: {
+                    "rich_text": [
+                        {"plain_text": part["text"]["content"]}
+                        for part in value.get("rich_text", [])
+                    ]
+                }
+                for name, value in self.pages[page_id]["properties"].items()
+            }
+            results.append(
+                {
+                    "object": "page",
+                    "id": page_id,
+                    "url": f"https://www.notion.so/{page_id}",
+                    "properties": properties,
+                }
+            )
+        has_more = end < len(page_ids)
+        return {
+            "object": "list",
+            "results": results,
+            "has_more": has_more,
+            "next_cursor": str(end) if has_more else None,
+        }
+
+    def _blocks(
+        self, method: str, route: List[str], data: Dict[str, Any]
+    ) -> Tuple[int, Any]:
+        """Route a call below /v1/blocks/."""
+        if route[1:] == ["children"] and method == "GET":
+            return 200, self._list_children(route[0], data)
+        if route[1:] == ["children"] and method == "PATCH":
+            return 200, self._append_children(route[0], data)
+        if len(route) == 1 and method == "PATCH":
+            return self._update_block(route[0], data)
+        if len(route) == 1 and method == "DELETE":
+            return self._update_block(route[0], {"archived": True})
+        return 404, _NOT_FOUND
+
+    def _new_blocks(self, blocks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Give blocks IDs; the caller holds the lock."""
+        created = []
+        for block in blocks:
+            created.append({**block, "id": f"block-{self._block_count:05d}"})
+            self._block_count += 1
+        return created
+
+    def _list_children(self, page_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer blocks.children.list, with plain_text like the real API."""
+        with self._lock:
+            children = list(self.pages[page_id]["children"])
+        start = int(data.get("start_cursor") or 0)
+        end = start + int(data.get("page_size", 100))
+        results = []
+        for block in children[start:end]:
+            content = block[block["type"]]
+            rich_text = [
+                {**part, "plain_text": part["text"]["content"]}
+                for part in content["rich_text"]
+            ]
+            results.append(
+                {**block, block["type"]: {**content, "rich_text": rich_text}}
+            )
+        has_more = end < len(children)
+        return {
+            "object": "list",
+            "results": results,
+            "has_more": has_more,
+            "next_cursor": str(end) if has_more else None,
+        }
+
+    def _append_children(self, page_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer blocks.children.append, at the end or ``after`` a block."""
+        with self._lock:
+            children = self.pages[page_id]["children"]
+            created = self._new_blocks(data["children"])
+            if "after" in data:
+                index = [block["id"] for block in children].index(data["after"])
+                children[index + 1 : index + 1] = created
+            else:
+                children.extend(created)
+        return {"object": "list", "results": created}
+
+    def _update_block(self, block_id: str, data: Dict[str, Any]) -> Tuple[int, Any]:
+        """Answer blocks.update and blocks.delete; archived blocks are dropped."""
+        with self._lock:
+            for page in self.pages.values():
+                for index, block in enumerate(page["children"]):
+                    if block["id"] != block_id:
+                        continue
+                    if data.get("archived"):
+                        del page["children"][index]
+                        return 200, {**block, "archived": True}
+                    block_type = block["type"]
+                    if block_type in data:
+                        block[block_type] = data[block_type]
+                    return 200, block
+        return 404, _NOT_FOUND
+
+    def _handler_class(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Request handler bound to the enclosing fake server."""
+
+            def log_message(self, *args: Any) -> None:  # noqa: D401
+                """Silence the default stderr access log."""
+
+            def _serve(self, method: str) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length) if length else b""
+                status, data = server.dispatch(method, self.path, body)
+                payload = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                if status == 429:
+                    self.send_header("Retry-After", str(server.retry_after))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self) -> None:  # noqa: N802
+                """Handle POST requests."""
+                self._serve("POST")
+
+            def do_GET(self) -> None:  # noqa: N802
+                """Handle GET requests."""
+                self._serve("GET")
+
+            def do_PATCH(self) -> None:  # noqa: N802
+                """Handle PATCH requests."""
+                self._serve("PATCH")
+
+            def do_DELETE(self) -> None:  # noqa: N802
+                """Handle DELETE requests."""
+                self._serve("DELETE")
+
+        return Handler
@@ -23,3 +23,6 @@ def test_email_to_notion_data() -> None:
     # Then
     assert result["title"] == "Test Subject"
     assert result["content"] == "Test content"
+    assert result["message_id"] == "test123"
+    assert result["sender"] == "test@example.com"
+    assert result["received_at"] == "2024-01-01T12:00:00"
@@ -0,0 +1,516 @@
+"""Wall-clock tests for ClaudeService against a local fake Messages API."""
+
+import asyncio
+import json
+import logging
+import math
+import time
+from typing import Any, Dict, Iterator, List, Tuple, Union
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from anthropic import AsyncAnthropic
+from pydantic import ValidationError
+
+from app.config import ModelRoute, settings
+from app.main import publish_streaming
+from app.models.analysis import EmailAnalysis
+from app.services.claude_service import (
+    ANALYSIS_TEMPLATES,
+    SUMMARY_PROMPT,
+    TRANSLATION_PROMPT,
+    ClaudeService,
+)
+from app.services.notion_service import NotionService
+from app.utils.summary_cache import SummaryCache
+from app.utils.text_chunker import estimate_tokens
+from app.utils.translation_memory import TranslationMemory
+from tests.fakes.anthropic_server import FakeAnthropicServer, echo_responder
+
+LATENCY = 0.2
+EMAIL_COUNT = 8
+
+
+@pytest.fixture(name="claude_server")
+def claude_server() -> Iterator[FakeAnthropicServer]:
+    """Start a fake Messages API that answers after LATENCY seconds."""
+    with FakeAnthropicServer(latency=LATENCY) as server:
+        yield server
+
+
+def create_service(server: FakeAnthropicServer, max_concurrency: int) -> ClaudeService:
+    """Create a ClaudeService wired to the fake server."""
+    service = ClaudeService(api_token="test-key", max_concurrency=max_concurrency)
+    service.client = AsyncAnthropic(
+        api_key="test-key", base_url=server.base_url, max_retries=0
+    )
+    return service
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("max_concurrency", [1, 4])
+async def test_concurrent_translation_wall_clock(
+    claude_server: FakeAnthropicServer, max_concurrency: int
+) -> None:
+    """Test that N emails take about ceil(N / k) x latency with k slots."""
+    service = create_service(claude_server, max_concurrency)
+
+    started = time.perf_counter()
+    summaries = await asyncio.gather(
+        *(service.generate_summary(f"Email {i}") for i in range(EMAIL_COUNT))
+    )
+    elapsed = time.perf_counter() - started
+
+    rounds = -(-EMAIL_COUNT // max_concurrency)
+    assert all(summary.endswith(f"Email {i}") for i, summary in enumerate(summaries))
+    assert claude_server.max_in_flight == max_concurrency
+    assert rounds * LATENCY <= elapsed < rounds * LATENCY + 0.5
+
+
+@pytest.mark.asyncio
+async def test_translation_does_not_block_event_loop(
+    claude_server: FakeAnthropicServer,
+) -> None:
+    """Test that other coroutines keep running while a request is pending."""
+    service = create_service(claude_server, max_concurrency=1)
+    ticks = 0
+
+    async def ticker() -> None:
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    await service.generate_summary("Hello")
+    task.cancel()
+
+    assert ticks >= LATENCY / 0.01 / 2
+
+
+@pytest.mark.asyncio
+async def test_cached_summary_skips_api_call(
+    claude_server: FakeAnthropicServer,
+) -> None:
+    """Test that a repeated body is served from the cache."""
+    service = create_service(claude_server, max_concurrency=1)
+    service.cache = SummaryCache(":memory:")
+
+    first = await service.generate_summary("Weekly news")
+    second = await service.generate_summary("Weekly  news\n")
+
+    assert first == second
+    assert len(claude_server.requests) == 1
+    assert service.cache.stats == {"hits": 1, "misses": 1}
+
+
+@pytest.mark.asyncio
+async def test_prompt_change_invalidates_cache(
+    claude_server: FakeAnthropicServer,
+) -> None:
+    """Test that bumping the prompt text misses old cache entries."""
+    service = create_service(claude_server, max_concurrency=1)
+    service.cache = SummaryCache(":memory:")
+    await service.generate_summary("Weekly news")
+
+    with patch("app.services.claude_service.PROMPT_VERSION", "changed"):
+        await service.generate_summary("Weekly news")
+
+    assert len(claude_server.requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_mode_maps_results_by_custom_id(
+    claude_server: FakeAnthropicServer,
+) -> None:
+    """Test that batch results come back keyed by message ID."""
+    service = create_service(claude_server, max_concurrency=1)
+    claude_server.batch_error_ids = {"msg3"}
+    texts = {f"msg{i}": f"Email {i}" for i in range(5)}
+
+    with patch("app.services.claude_service.settings.claude_batch_poll_seconds", 0):
+        summaries = await service.generate_summaries_batch(texts)
+
+    assert sorted(summaries) == ["msg0", "msg1", "msg2", "msg4"]
+    assert all(summaries[key].endswith(texts[key]) for key in summaries)
+    assert len(claude_server.batches) == 1
+    # results() retrieves the batch once more to find its results_url
+    assert claude_server.batch_polls == claude_server.batch_polls_to_end + 1
+    assert claude_server.requests == []
+
+
+@pytest.mark.asyncio
+async def test_batch_mode_polls_with_backoff(
+    claude_server: FakeAnthropicServer,
+) -> None:
+    """Test that the poll delay doubles up to the configured maximum."""
+    service = create_service(claude_server, max_concurrency=1)
+    claude_server.batch_polls_to_end = 4
+
+    with (
+        patch("app.services.claude_service.settings.claude_batch_poll_seconds", 1),
+        patch("app.services.claude_service.settings.claude_batch_poll_max_seconds", 3),
+        patch(
+            "app.services.claude_service.asyncio.sleep", new_callable=AsyncMock
+        ) as sleep_mock,
+    ):
+        await service.generate_summaries_batch({"msg0": "Email 0"})
+
+    assert [call.args[0] for call in sleep_mock.await_args_list] == [1, 2, 3, 3]
+
+
+@pytest.mark.asyncio
+async def test_batch_mode_skips_cached_texts(
+    claude_server: FakeAnthropicServer,
+) -> None:
+    """Test that cached summaries are not resubmitted in a batch."""
+    service = create_service(claude_server, max_concurrency=1)
+    service.cache = SummaryCache(":memory:")
+    await service.generate_summary("Email 0")
+
+    summaries = await service.generate_summaries_batch({"msg0": "Email 0"})
+
+    assert summaries["msg0"].endswith("Email 0")
+    assert claude_server.batches == {}
+
+
+@pytest.mark.asyncio
+async def test_instructions_sent_as_cached_system_prefix(
+    claude_server: FakeAnthropicServer,
+) -> None:
+    """Test that only the first call writes the instruction prefix to the cache."""
+    service = create_service(claude_server, max_concurrency=1)
+
+    await service.generate_summary("Email 0")
+    first = dict(service.usage)
+    await service.generate_summary("Email 1")
+
+    request = claude_server.requests[0]
+    assert request["system"][0]["text"] == TRANSLATION_PROMPT
+    assert request["system"][0]["cache_control"] == {"type": "ephemeral"}
+    assert request["messages"] == [{"role": "user", "content": "Email 0"}]
+    assert first["cache_creation_input_tokens"] > 0
+    assert first["cache_read_input_tokens"] == 0
+    assert (
+        service.usage["cache_read_input_tokens"] == first["cache_creation_input_tokens"]
+    )
+    assert (
+        service.usage["cache_creation_input_tokens"]
+        == first["cache_creation_input_tokens"]
+    )
+
+
+@pytest.mark.asyncio
+async def test_long_email_chunks_translated_in_parallel(
+    claude_server: FakeAnthropicServer,
+) -> None:
+    """Test that chunk latency, not email length, bounds a long translation."""
+    service = create_service(claude_server, max_concurrency=EMAIL_COUNT)
+    paragraphs = [f"Paragraph {i}." + " word" * 100 for i in range(EMAIL_COUNT)]
+
+    with patch("app.services.claude_service.settings.claude_chunk_tokens", 150):
+        started = time.perf_counter()
+        summary = await service.generate_summary("\n\n".join(paragraphs))
+        elapsed = time.perf_counter() - started
+
+    assert len(claude_server.requests) == EMAIL_COUNT
+    assert summary == "\n\n".join(f"翻訳: {text}" for text in paragraphs)
+    assert elapsed < 2 * LATENCY
+
+
+@pytest.mark.asyncio
+async def test_truncated_reply_is_continued() -> None:
+    """Test that a max_tokens stop triggers a prefilled continuation request."""
+
+    def responder(request: Dict[str, Any]) -> Union[str, Tuple[str, str]]:
+        if request["messages"][-1]["role"] == "user":
+            return "前半の翻訳 ", "max_tokens"
+        return "と後半の翻訳"
+
+    with FakeAnthropicServer(responder=responder) as server:
+        service = create_service(server, max_concurrency=1)
+        summary = await service.generate_summary("A long email")
+
+    assert summary == "前半の翻訳と後半の翻訳"
+    assert len(server.requests) == 2
+    assert server.requests[1]["messages"] == [
+        {"role": "user", "content": "A long email"},
+        {"role": "assistant", "content": "前半の翻訳"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stream_summary_yields_incrementally(
+    claude_server: FakeAnthropicServer,
+) -> None:
+    """Test that streamed pieces concatenate to the cached full summary."""
+    service = create_service(claude_server, max_concurrency=1)
+    service.cache = SummaryCache(":memory:")
+
+    pieces = [piece async for piece in service.stream_summary("One two three")]
+
+    assert len(pieces) > 1
+    assert "".join(pieces) == "翻訳: One two three"
+    assert claude_server.requests[0]["stream"] is True
+    assert service.usage["output_tokens"] > 0
+    assert await service.generate_summary("One two three") == "翻訳: One two three"
+    assert len(claude_server.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_streaming_pipeline_shows_content_before_generation_ends(
+    claude_server: FakeAnthropicServer,
+) -> None:
+    """Test that Notion and Slack see output long before the stream finishes."""
+    paragraphs = [f"Paragraph {i} " + "word " * 5 for i in range(4)]
+    claude_server.responder = lambda request: "\n\n".join(paragraphs)
+    claude_server.stream_delay = 0.02
+    service = create_service(claude_server, max_concurrency=1)
+    events: List[Tuple[str, float]] = []
+    started = time.perf_counter()
+
+    def record(name: str, result: Any) -> AsyncMock:
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            events.append((name, time.perf_counter() - started))
+            return result
+
+        return AsyncMock(side_effect=call)
+
+    notion_service = NotionService("token", "database")
+    notion_service.client = AsyncMock()
+    notion_service.client.pages.create = record(
+        "page", {"id": "page-id", "url": "https://notion.so/page"}
+    )
+    notion_service.client.blocks.children.append = record("append", {})
+    slack_service = Mock()
+    slack_service.send_notification = record("slack", {"ts": "1.0"})
+    slack_service.update_notification = record("slack-update", {})
+    email = {"id": "msg0", "subject": "Weekly", "body": "Body", "sender": "a@b.c"}
+    email["date"] = "Wed, 1 Jan 2025 10:00:00 +0000"
+
+    await publish_streaming(email, service, notion_service, slack_service)
+
+    names = [name for name, _ in events]
+    assert names[:2] == ["page", "slack"]
+    assert names.count("append") > 1
+    assert names[-1] == "slack-update"
+    first_append = next(at for name, at in events if name == "append")
+    assert first_append < events[-1][1] / 2
+    update = slack_service.update_notification.await_args
+    assert update.args[0] == "1.0"
+    assert "https://notion.so/page" in update.args[1]
+
+
+@pytest.mark.asyncio
+async def test_short_email_routed_to_fast_model(
+    claude_server: FakeAnthropicServer, caplog: pytest.LogCaptureFixture
+) -> None:
+    """Test that a short email goes to the first route with a sized max_tokens."""
+    service = create_service(claude_server, max_concurrency=1)
+    routes = [
+        ModelRoute(max_input_tokens=100, model="fast-model", max_output_tokens=4096)
+    ]
+
+    with (
+        patch("app.services.claude_service.settings.claude_model_routes", routes),
+        patch("app.services.claude_service.settings.claude_min_output_tokens", 16),
+        caplog.at_level(logging.INFO, logger="app.services.claude_service"),
+    ):
+        await service.generate_summary("Short note " * 10)
+
+    request = claude_server.requests[0]
+    assert request["model"] == "fast-model"
+    assert request["max_tokens"] == math.ceil(estimate_tokens("Short note " * 10) * 2)
+    assert "Routing ~28 input tokens to fast-model" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_long_email_routed_to_default_model(
+    claude_server: FakeAnthropicServer,
+) -> None:
+    """Test that inputs past every route use the default model and limit."""
+    service = create_service(claude_server, max_concurrency=1)
+    routes = [ModelRoute(max_input_tokens=10, model="fast-model")]
+
+    with (
+        patch("app.services.claude_service.settings.claude_model_routes", routes),
+        patch("app.services.claude_service.settings.claude_output_token_ratio", 100),
+    ):
+        await service.generate_summary("A longer newsletter body " * 20)
+
+    request = claude_server.requests[0]
+    assert request["model"] == settings.claude_default_model
+    assert request["max_tokens"] == settings.claude_default_max_output_tokens
+
+
+def test_routing_table_order_wins() -> None:
+    """Test that the first matching route is used."""
+    routes = [
+        ModelRoute(max_input_tokens=5, model="tiny", max_output_tokens=100),
+        ModelRoute(max_input_tokens=500, model="small", max_output_tokens=200),
+    ]
+
+    with (
+        patch("app.services.claude_service.settings.claude_model_routes", routes),
+        patch("app.services.claude_service.settings.claude_min_output_tokens", 10),
+    ):
+        assert ClaudeService.route("abcd") == ("tiny", 10)
+        assert ClaudeService.route("abcd" * 100) == ("small", 200)
+
+
+ANALYSIS = {
+    "summary": "来週火曜日に四半期レビュー会議を開催",
+    "priority": "High",
+    "priority_reason": "資料の提出期限が近い",
+    "action_items": [{"description": "進捗報告資料の提出", "deadline": "月曜日17:00"}],
+    "template_fields": {
+        heading: "..." for heading in ANALYSIS_TEMPLATES["meeting_summary"]
+    },
+}
+
+
+@pytest.mark.asyncio
+async def test_analyze_returns_all_fields_in_one_call() -> None:
+    """Test that one forced tool call yields summary, priority and template."""
+    with FakeAnthropicServer(responder=lambda request: ANALYSIS) as server:
+        service = create_service(server, max_concurrency=1)
+        analysis = await service.analyze(
+            "Quarterly review on Tuesday", template="meeting_summary"
+        )
+
+    assert isinstance(analysis, EmailAnalysis)
+    assert analysis.priority == "High"
+    assert analysis.action_items[0].deadline == "月曜日17:00"
+    assert set(analysis.template_fields) == set(ANALYSIS_TEMPLATES["meeting_summary"])
+    assert len(server.requests) == 1
+    request = server.requests[0]
+    assert request["tool_choice"] == {"type": "tool", "name": "record_analysis"}
+    assert request["tools"][0]["input_schema"] == EmailAnalysis.model_json_schema()
+    assert "会議概要" in request["system"][0]["text"]
+    assert request["messages"] == [
+        {"role": "user", "content": "Quarterly review on Tuesday"}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_analyze_rejects_invalid_output() -> None:
+    """Test that output failing the schema raises instead of passing through."""
+    invalid = {**ANALYSIS, "priority": "Urgent"}
+    with FakeAnthropicServer(responder=lambda request: invalid) as server:
+        service = create_service(server, max_concurrency=1)
+        with pytest.raises(ValidationError):
+            await service.analyze("Hello")
+
+
+@pytest.mark.asyncio
+async def test_analyze_requires_template_fields() -> None:
+    """Test that a reply missing template sections is rejected."""
+    partial = {**ANALYSIS, "template_fields": {}}
+    with FakeAnthropicServer(responder=lambda request: partial) as server:
+        service = create_service(server, max_concurrency=1)
+        with pytest.raises(ValueError, match="missing template fields"):
+            await service.analyze("Hello", template="meeting_summary")
+        with pytest.raises(ValueError, match="not found"):
+            await service.analyze("Hello", template="unknown")
+
+
+def segment_responder(request: Dict[str, Any]) -> Union[str, Dict[str, Any]]:
+    """Translate segment arrays as tool calls and plain text as text."""
+    if "tool_choice" not in request:
+        return echo_responder(request)
+    segments = json.loads(request["messages"][-1]["content"])
+    return {"translations": [f"訳[{segment}]" for segment in segments]}
+
+
+ISSUE = (
+    "Weekly Briefing. Issue {number}.\n\n"
+    "{story}\n\n"
+    "Sponsored by Example Cloud. Thanks for reading."
+)
+
+
+@pytest.mark.asyncio
+async def test_translation_memory_sends_only_new_segments() -> None:
+    """Test that boilerplate repeated between issues is not retranslated."""
+    with FakeAnthropicServer(responder=segment_responder) as server:
+        service = create_service(server, max_concurrency=1)
+        service.memory = TranslationMemory(":memory:")
+
+        first = await service.generate_summary(
+            ISSUE.format(number=1, story="Rates rose.")
+        )
+        second = await service.generate_summary(
+            ISSUE.format(number=2, story="Stocks  fell. 2024")
+        )
+
+    assert first == (
+        "訳[Weekly Briefing.]訳[Issue 1.]\n\n訳[Rates rose.]\n\n"
+        "訳[Sponsored by Example Cloud.]訳[Thanks for reading.]"
+    )
+    assert second == (
+        "訳[Weekly Briefing.]訳[Issue 2.]\n\n訳[Stocks  fell.]2024\n\n"
+        "訳[Sponsored by Example Cloud.]訳[Thanks for reading.]"
+    )
+    assert json.loads(server.requests[1]["messages"][0]["content"]) == [
+        "Issue 2.",
+        "Stocks  fell.",
+    ]
+    assert service.memory.stats == {"hits": 3, "misses": 7}
+
+
+@pytest.mark.asyncio
+async def test_mismatched_segment_reply_falls_back_to_chunks() -> None:
+    """Test that a reply with the wrong number of segments is not merged."""
+
+    def responder(request: Dict[str, Any]) -> Union[str, Dict[str, Any]]:
+        if "tool_choice" in request:
+            return {"translations": ["訳"]}
+        return echo_responder(request)
+
+    with FakeAnthropicServer(responder=responder) as server:
+        service = create_service(server, max_concurrency=1)
+        service.memory = TranslationMemory(":memory:")
+        summary = await service.generate_summary("One. Two.")
+
+    assert summary == "翻訳: One. Two."
+    assert len(service.memory) == 0
+
+
+JAPANESE_EMAIL = "お世話になっております。来週の定例会議は水曜日に変更となりました。"
+
+
+@pytest.mark.asyncio
+async def test_japanese_email_skips_api_call(
+    claude_server: FakeAnthropicServer,
+) -> None:
+    """Test that Japanese and non-text bodies pass through without requests."""
+    service = create_service(claude_server, max_concurrency=1)
+
+    assert await service.generate_summary(JAPANESE_EMAIL) == JAPANESE_EMAIL
+    assert [piece async for piece in service.stream_summary("--- 2024 ---")] == [
+        "--- 2024 ---"
+    ]
+    with patch("app.services.claude_service.settings.claude_batch_poll_seconds", 0):
+        summaries = await service.generate_summaries_batch(
+            {"ja": JAPANESE_EMAIL, "en": "Hello"}
+        )
+
+    assert summaries == {"ja": JAPANESE_EMAIL, "en": "翻訳: Hello"}
+    assert service.avoided_calls == 3
+    assert claude_server.requests == []
+    assert len(claude_server.batches) == 1
+
+
+@pytest.mark.asyncio
+async def test_japanese_email_can_be_summarized(
+    claude_server: FakeAnthropicServer,
+) -> None:
+    """Test that summarize mode sends Japanese mail with the summary prompt."""
+    service = create_service(claude_server, max_concurrency=1)
+
+    with patch("app.services.claude_service.settings.japanese_email_mode", "summarize"):
+        summary = await service.generate_summary(JAPANESE_EMAIL)
+
+    assert summary == f"翻訳: {JAPANESE_EMAIL}"
+    assert claude_server.requests[0]["system"][0]["text"] == SUMMARY_PROMPT
+    assert service.avoided_calls == 0
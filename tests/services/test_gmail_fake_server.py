@@ -0,0 +1,354 @@
+"""Round-trip tests for GmailService against a local fake Gmail server."""
+
+import asyncio
+import math
+import threading
+import time
+from typing import Any, Dict, Iterator
+from unittest.mock import patch
+
+import pytest
+
+from app.services.gmail_service import GmailService
+from tests.fakes.gmail_server import FakeGmailServer, make_message
+
+
+@pytest.fixture(name="gmail_server")
+def gmail_server() -> Iterator[FakeGmailServer]:
+    """Start a fake Gmail server holding 100 messages."""
+    messages = [make_message(f"msg{i:03d}", body=f"Body {i}") for i in range(100)]
+    with FakeGmailServer(messages) as server:
+        yield server
+
+
+def create_service(
+    server: FakeGmailServer,
+    max_workers: int = 4,
+    built: Dict[int, Any] | None = None,
+) -> GmailService:
+    """Create a GmailService wired to the fake server.
+
+    Every ``build`` call returns a fresh Resource with its own httplib2.Http,
+    as the real ``build`` does. When ``built`` is given, the Resource built by
+    each thread is recorded under that thread's ident.
+    """
+
+    def build_resource(*args: Any, **kwargs: Any) -> Any:
+        resource = server.build_resource()
+        if built is not None:
+            assert threading.get_ident() not in built
+            built[threading.get_ident()] = resource
+        return resource
+
+    with (
+        patch.object(GmailService, "_get_credentials", return_value=None),
+        patch(
+            "app.services.gmail_service.build_from_document",
+            side_effect=build_resource,
+        ),
+    ):
+        return GmailService(
+            token_path="unused.json",
+            credentials_path="unused.json",
+            max_workers=max_workers,
+        )
+
+
+@pytest.mark.asyncio
+async def test_batched_fetch_round_trips(gmail_server: FakeGmailServer) -> None:
+    """Test that fetching N messages costs ceil(N / batch) + 1 round trips."""
+    service = create_service(gmail_server)
+
+    emails = await service.fetch_recent_emails(max_results=100, batch_size=25)
+
+    assert len(emails) == 100
+    assert emails[0]["id"] == "msg000"
+    assert emails[0]["body"] == "Body 0"
+    assert emails[99]["subject"] == "The Briefing"
+    assert gmail_server.round_trips == math.ceil(100 / 25) + 1
+
+
+@pytest.mark.asyncio
+async def test_batched_fetch_reports_failures(gmail_server: FakeGmailServer) -> None:
+    """Test that per-message failures inside a batch are reported individually."""
+    service = create_service(gmail_server)
+    gmail_server.failing_ids = {"msg001", "msg007"}
+
+    emails, errors = service.get_messages(
+        [f"msg{i:03d}" for i in range(10)], batch_size=50
+    )
+
+    assert [email["id"] for email in emails] == [
+        f"msg{i:03d}" for i in range(10) if i not in (1, 7)
+    ]
+    assert set(errors) == {"msg001", "msg007"}
+    assert gmail_server.round_trips == 1
+
+
+@pytest.mark.asyncio
+async def test_batches_run_concurrently_on_pool(
+    gmail_server: FakeGmailServer,
+) -> None:
+    """Test that batches overlap across workers, each with its own Resource."""
+    built: Dict[int, Any] = {}
+    service = create_service(gmail_server, max_workers=4, built=built)
+    gmail_server.latency = 0.2
+
+    started = time.perf_counter()
+    emails, errors = await service.fetch_messages(
+        [f"msg{i:03d}" for i in range(40)], batch_size=10
+    )
+    elapsed = time.perf_counter() - started
+    service.close()
+
+    assert len(emails) == 40
+    assert not errors
+    # 4 batches on 4 workers take about one latency, not four
+    assert elapsed < 0.2 * 3
+    worker_resources = [
+        resource for ident, resource in built.items() if ident != threading.get_ident()
+    ]
+    assert len(worker_resources) == 4
+    assert len({id(resource._http) for resource in built.values()}) == len(built)
+
+
+@pytest.mark.asyncio
+async def test_event_loop_stays_responsive(gmail_server: FakeGmailServer) -> None:
+    """Test that other coroutines make progress during a Gmail call."""
+    service = create_service(gmail_server)
+    gmail_server.latency = 0.2
+    ticks = 0
+
+    async def ticker() -> None:
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticker_task = asyncio.create_task(ticker())
+    emails = await service.fetch_recent_emails(max_results=10)
+    ticker_task.cancel()
+    service.close()
+
+    assert len(emails) == 10
+    # Two round trips of 0.2s each leave room for many 10ms ticks
+    assert ticks >= 10
+
+
+@pytest.mark.asyncio
+async def test_archive_and_delete_overlap(gmail_server: FakeGmailServer) -> None:
+    """Test that concurrent archive/delete calls take ceil(N / pool) latencies."""
+    service = create_service(gmail_server, max_workers=4)
+    gmail_server.latency = 0.2
+
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(service.archive_email(f"msg{i:03d}") for i in range(4)),
+        *(service.delete_email(f"msg{i:03d}") for i in range(4, 8)),
+    )
+    elapsed = time.perf_counter() - started
+    service.close()
+
+    assert all(results)
+    assert "INBOX" not in gmail_server.messages["msg000"]["labelIds"]
+    assert "msg004" not in gmail_server.messages
+    # 8 calls on 4 workers: about 2 x latency instead of 8 x latency
+    assert elapsed < 0.2 * 4
+
+
+@pytest.mark.asyncio
+async def test_incremental_sync_fetches_only_new_mail(
+    gmail_server: FakeGmailServer, tmp_path: Any
+) -> None:
+    """Test that a steady-state sync costs one history call plus the delta."""
+    service = create_service(gmail_server)
+    service.history_path = str(tmp_path / "history.json")
+
+    first = await service.sync_emails(max_results=100)
+    service.commit_sync_checkpoint()
+    assert len(first) == 100
+
+    gmail_server.add_message(make_message("new001", body="New 1"))
+    gmail_server.add_message(make_message("other", subject="Unrelated"))
+    gmail_server.add_message(make_message("new002", body="New 2"))
+    gmail_server.round_trips = 0
+    gmail_server.calls.clear()
+
+    delta = await service.sync_emails(max_results=100)
+    service.commit_sync_checkpoint(retry_ids=["new002"])
+
+    assert [email["id"] for email in delta] == ["new001", "new002"]
+    # One history.list page, one metadata batch of three messages and one
+    # full batch holding only the two that match the subject filter
+    assert gmail_server.round_trips == 3
+    full_gets = [
+        path
+        for _, path in gmail_server.calls
+        if path.startswith("/gmail/v1/users/me/messages/")
+    ]
+    assert full_gets.count("/gmail/v1/users/me/messages/other") == 1
+
+    gmail_server.round_trips = 0
+    retried = await service.sync_emails(max_results=100)
+    service.close()
+
+    assert [email["id"] for email in retried] == ["new002"]
+    assert gmail_server.round_trips == 3
+
+
+@pytest.mark.asyncio
+async def test_incremental_sync_falls_back_when_history_expired(
+    gmail_server: FakeGmailServer, tmp_path: Any
+) -> None:
+    """Test that an expired history ID triggers a full query."""
+    service = create_service(gmail_server)
+    service.history_path = str(tmp_path / "history.json")
+    await service.sync_emails(max_results=5)
+    service.commit_sync_checkpoint()
+
+    gmail_server.expire_history()
+    gmail_server.calls.clear()
+    emails = await service.sync_emails(max_results=5)
+    service.close()
+
+    assert len(emails) == 5
+    paths = [path for _, path in gmail_server.calls]
+    assert "/gmail/v1/users/me/history" in paths
+    assert "/gmail/v1/users/me/messages" in paths
+
+
+@pytest.fixture(name="large_gmail_server")
+def large_gmail_server() -> Iterator[FakeGmailServer]:
+    """Start a fake Gmail server holding a 250 message backlog."""
+    messages = [make_message(f"big{i:03d}") for i in range(250)]
+    with FakeGmailServer(messages) as server:
+        yield server
+
+
+@pytest.mark.asyncio
+async def test_fetch_recent_emails_follows_pagination(
+    large_gmail_server: FakeGmailServer,
+) -> None:
+    """Test that max_results is honoured across several list pages."""
+    service = create_service(large_gmail_server)
+
+    with patch("app.services.gmail_service.settings.gmail_page_size", 100):
+        emails = await service.fetch_recent_emails(max_results=230, batch_size=50)
+    service.close()
+
+    assert [email["id"] for email in emails] == [f"big{i:03d}" for i in range(230)]
+
+
+@pytest.mark.asyncio
+async def test_iter_emails_streams_whole_backlog(
+    large_gmail_server: FakeGmailServer,
+) -> None:
+    """Test that iter_emails yields every page in order."""
+    service = create_service(large_gmail_server)
+
+    with patch("app.services.gmail_service.settings.gmail_page_size", 100):
+        ids = [
+            email["id"]
+            async for email in service.iter_emails(batch_size=50, prefetch=10)
+        ]
+    service.close()
+
+    assert ids == [f"big{i:03d}" for i in range(250)]
+    # 3 list pages and 5 batches
+    assert large_gmail_server.round_trips == 3 + 5
+
+
+@pytest.mark.asyncio
+async def test_iter_emails_prefetch_is_bounded(
+    large_gmail_server: FakeGmailServer,
+) -> None:
+    """Test that a slow consumer stops the producer after the prefetch depth."""
+    service = create_service(large_gmail_server)
+
+    with patch("app.services.gmail_service.settings.gmail_page_size", 100):
+        stream = service.iter_emails(batch_size=10, prefetch=10)
+        first = await anext(stream)
+        # The first email is available after one list and one batch request
+        assert first["id"] == "big000"
+        await asyncio.sleep(0.3)
+        round_trips_while_idle = large_gmail_server.round_trips
+        await stream.aclose()
+    service.close()
+
+    # Far fewer than the 3 + 25 round trips needed for the whole backlog
+    assert round_trips_while_idle <= 4
+
+
+@pytest.mark.asyncio
+async def test_archive_emails_uses_one_request_per_chunk(
+    gmail_server: FakeGmailServer,
+) -> None:
+    """Test that bulk archiving costs one batchModify per 1000 IDs."""
+    service = create_service(gmail_server)
+    ids = [f"msg{i:03d}" for i in range(100)]
+
+    outcomes = await service.archive_emails(ids)
+
+    assert outcomes == dict.fromkeys(ids, True)
+    assert gmail_server.round_trips == 1
+    assert all(
+        "INBOX" not in message["labelIds"] for message in gmail_server.messages.values()
+    )
+
+    with patch("app.services.gmail_service.GMAIL_BULK_LIMIT", 30):
+        gmail_server.round_trips = 0
+        outcomes = await service.delete_emails(ids[:50] + ["missing"])
+    service.close()
+
+    # The chunk holding the unknown ID fails as a whole, the other succeeds
+    assert gmail_server.round_trips == 2
+    assert all(outcomes[f"msg{i:03d}"] for i in range(30))
+    assert not any(outcomes[f"msg{i:03d}"] for i in range(30, 50))
+    assert outcomes["missing"] is False
+    assert "msg000" not in gmail_server.messages
+    assert "msg040" in gmail_server.messages
+
+
+@pytest.mark.asyncio
+async def test_two_phase_fetch_skips_bodies_of_filtered_messages(
+    gmail_server: FakeGmailServer,
+) -> None:
+    """Test that excluded and non-matching messages never download a body."""
+    for i in range(100):
+        subject = "Weekly digest" if i % 2 == 0 else "The Briefing"
+        gmail_server.add_message(
+            make_message(f"msg{i:03d}", subject=subject, body="x" * 5000)
+        )
+    ids = [f"msg{i:03d}" for i in range(100)]
+    service = create_service(gmail_server)
+
+    with patch("app.services.gmail_service.settings.gmail_two_phase_fetch", False):
+        gmail_server.response_bytes = 0
+        one_phase, _ = await service.fetch_messages(ids, match_filter=True)
+        one_phase_bytes = gmail_server.response_bytes
+
+    gmail_server.response_bytes = 0
+    two_phase, _ = await service.fetch_messages(
+        ids, match_filter=True, exclude_ids={"msg001", "msg003"}
+    )
+    two_phase_bytes = gmail_server.response_bytes
+    service.close()
+
+    assert len(one_phase) == 50
+    assert [email["id"] for email in two_phase] == [
+        f"msg{i:03d}" for i in range(5, 100, 2)
+    ]
+    assert two_phase_bytes < one_phase_bytes
+
+
+@pytest.mark.asyncio
+async def test_list_requests_use_field_masks(gmail_server: FakeGmailServer) -> None:
+    """Test that list and get requests ask for partial responses."""
+    service = create_service(gmail_server)
+
+    await service.fetch_recent_emails(max_results=10)
+    service.close()
+
+    fields = [params.get("fields", [None])[0] for params in gmail_server.params]
+    assert fields[0] == "messages(id,threadId),nextPageToken"
+    assert set(fields[1:]) == {"id,threadId,labelIds,payload"}
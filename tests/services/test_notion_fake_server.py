@@ -0,0 +1,197 @@
+"""Tests for NotionService against a local fake Notion API that throttles."""
+
+import asyncio
+from typing import Iterator
+
+import pytest
+from notion_client import APIResponseError, AsyncClient
+
+from app.services.notion_service import NotionService
+from app.utils.page_index import PageIndex
+from app.utils.rate_limiter import AdaptiveRateLimiter
+from tests.fakes.notion_server import FakeNotionServer
+
+
+@pytest.fixture(name="notion_server")
+def notion_server() -> Iterator[FakeNotionServer]:
+    """Start a fake Notion API."""
+    with FakeNotionServer(retry_after=0.1) as server:
+        yield server
+
+
+def create_service(
+    server: FakeNotionServer, limiter: AdaptiveRateLimiter
+) -> NotionService:
+    """Create a NotionService wired to the fake server."""
+    service = NotionService("token", "database", rate_limiter=limiter)
+    service.client = AsyncClient(auth="token", base_url=server.base_url)
+    return service
+
+
+@pytest.mark.asyncio
+async def test_throttled_request_is_retried_after_retry_after(
+    notion_server: FakeNotionServer,
+) -> None:
+    """Test that a 429 is retried once Retry-After has passed."""
+    notion_server.throttle_requests = {0, 1}
+    limiter = AdaptiveRateLimiter(rate=50.0, burst=5)
+    service = create_service(notion_server, limiter)
+
+    page = await service.add_entry({"title": "Weekly", "content": "本文"})
+
+    assert page["id"] == "page-0000"
+    times = notion_server.request_times
+    assert len(times) == 3
+    assert times[1] - times[0] >= 0.1 - 0.02
+    assert times[2] - times[1] >= 0.1 - 0.02
+    assert limiter.metrics["throttled"] == 2
+    assert limiter.rate < 50.0
+
+
+@pytest.mark.asyncio
+async def test_persistent_throttling_gives_up(
+    notion_server: FakeNotionServer,
+) -> None:
+    """Test that the error surfaces once the retries are used up."""
+    notion_server.throttle_requests = set(range(100))
+    notion_server.retry_after = 0.01
+    service = create_service(notion_server, AdaptiveRateLimiter(rate=100.0))
+
+    with pytest.raises(APIResponseError):
+        await service.create_page("Weekly")
+
+    assert len(notion_server.request_times) == 6  # First try and 5 retries
+
+
+@pytest.mark.asyncio
+async def test_limiter_adapts_to_server_rate_limit() -> None:
+    """Test that concurrent emails all land when the server allows 20 req/s."""
+    with FakeNotionServer(rate_limit=20.0, retry_after=0.05) as server:
+        limiter = AdaptiveRateLimiter(rate=80.0, burst=1, recovery=1.0)
+        service = create_service(server, limiter)
+        content = "\n".join(f"- item {i}" for i in range(150))
+
+        pages = await asyncio.gather(
+            *(
+                service.add_entry({"title": f"Email {i}", "content": content})
+                for i in range(10)
+            )
+        )
+        await service.flush()
+
+    assert len({page["id"] for page in pages}) == 10
+    assert all(len(page["children"]) == 150 for page in server.pages.values())
+    assert server.throttled > 0
+    assert limiter.metrics["throttled"] == server.throttled
+    assert limiter.rate < 80.0
+    assert limiter.metrics["max_queue_depth"] >= 5
+
+
+@pytest.mark.asyncio
+async def test_page_index_makes_add_entry_idempotent(
+    notion_server: FakeNotionServer,
+) -> None:
+    """Test that a page created by an earlier run is found and not duplicated."""
+    limiter = AdaptiveRateLimiter(rate=1000.0, burst=100)
+    earlier_run = create_service(notion_server, limiter)
+    for i in range(150):
+        await earlier_run.create_page(f"Email {i}", metadata={"message_id": f"msg{i}"})
+
+    # A restarted process with an empty local index
+    service = create_service(notion_server, limiter)
+    service.page_index = PageIndex(":memory:")
+    assert await service.warm_page_index() == 150
+    assert await service.warm_page_index() == 0  # Once per process
+    assert notion_server.queries == 2  # 100 + 50 results
+
+    entry = {
+        "title": "Email 7",
+        "content": "要約",
+        "message_id": "msg7",
+        "sender": "boss@example.com",
+        "received_at": "2024-01-01T09:00:00+00:00",
+    }
+    existing = await service.add_entry(entry)
+    created = await service.add_entry({**entry, "message_id": "msg150"})
+    again = await service.add_entry({**entry, "message_id": "msg150"})
+
+    assert existing == {"id": "page-0007", "url": "https://www.notion.so/page-0007"}
+    assert again["id"] == created["id"] == "page-0150"
+    assert len(notion_server.pages) == 151
+    properties = notion_server.pages["page-0150"]["properties"]
+    assert properties["Message ID"]["rich_text"][0]["text"]["content"] == "msg150"
+    assert properties["Sender"]["rich_text"][0]["text"]["content"] == entry["sender"]
+    assert properties["Received At"] == {"date": {"start": entry["received_at"]}}
+
+
+@pytest.mark.asyncio
+async def test_update_entry_changes_only_edited_blocks(
+    notion_server: FakeNotionServer,
+) -> None:
+    """Test that a small edit to a long page costs a handful of requests."""
+    service = create_service(notion_server, AdaptiveRateLimiter(1000.0, burst=100))
+    items = [f"item {i}" for i in range(250)]
+    page = await service.add_entry(
+        {"title": "Weekly", "content": "\n".join(f"- {item}" for item in items)}
+    )
+    await service.flush()
+    before = len(notion_server.request_times)
+
+    items[10] = "item 10, revised"
+    del items[100]
+    items.insert(200, "new item")
+    stats = await service.update_entry(
+        page["id"], "\n".join(f"- {item}" for item in items)
+    )
+
+    assert notion_server.texts(page["id"]) == items
+    assert stats == {"kept": 248, "updated": 1, "deleted": 1, "inserted": 1}
+    # Three pages of children, then one patch, one archive and one insert
+    assert notion_server.methods[before:] == ["GET"] * 3 + ["PATCH", "DELETE", "PATCH"]
+
+
+@pytest.mark.asyncio
+async def test_update_entry_unchanged_content_only_reads(
+    notion_server: FakeNotionServer,
+) -> None:
+    """Test that updating a page to the same content changes nothing."""
+    service = create_service(notion_server, AdaptiveRateLimiter(1000.0, burst=100))
+    content = "# 要約\n本文の段落\n- 項目1\n- 項目2"
+    page = await service.add_entry({"title": "Weekly", "content": content})
+    before = len(notion_server.request_times)
+
+    stats = await service.update_entry(page["id"], content)
+
+    assert stats == {"kept": 4, "updated": 0, "deleted": 0, "inserted": 0}
+    assert notion_server.methods[before:] == ["GET"]
+
+
+@pytest.mark.asyncio
+async def test_update_entry_inserts_long_runs_in_order(
+    notion_server: FakeNotionServer,
+) -> None:
+    """Test that more than a request's worth of inserted blocks keep order."""
+    service = create_service(notion_server, AdaptiveRateLimiter(1000.0, burst=100))
+    page = await service.add_entry({"title": "Weekly", "content": "- first\n- last"})
+    items = ["first", *(f"added {i}" for i in range(150)), "last"]
+
+    stats = await service.update_entry(
+        page["id"], "\n".join(f"- {item}" for item in items)
+    )
+
+    assert notion_server.texts(page["id"]) == items
+    assert stats["inserted"] == 150
+
+
+@pytest.mark.asyncio
+async def test_update_entry_rewrites_when_prepending(
+    notion_server: FakeNotionServer,
+) -> None:
+    """Test that blocks added before every kept block force a rewrite."""
+    service = create_service(notion_server, AdaptiveRateLimiter(1000.0, burst=100))
+    page = await service.add_entry({"title": "Weekly", "content": "- a\n- b"})
+
+    stats = await service.update_entry(page["id"], "# 見出し\n- a\n- b")
+
+    assert notion_server.texts(page["id"]) == ["見出し", "a", "b"]
+    assert stats == {"kept": 0, "updated": 0, "deleted": 2, "inserted": 3}
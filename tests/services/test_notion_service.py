@@ -1,5 +1,7 @@
 """Test cases for Notion service."""
 
+import asyncio
+from typing import Any, AsyncIterator, List
 from unittest.mock import AsyncMock
 
 import pytest
@@ -33,10 +35,6 @@ async def test_add_entry() -> None:
         properties={
             "Name": {"title": [{"text": {"content": "Test Subject"}}]},
         },
-    )
-
-    service.client.blocks.children.append.assert_called_once_with(
-        block_id="test_page_id",
         children=[
             {
                 "object": "block",
@@ -47,5 +45,106 @@ async def test_add_entry() -> None:
             }
         ],
     )
+    await service.wait_for_page("test_page_id")
+    service.client.blocks.children.append.assert_not_called()
 
     assert result == mock_page
+
+
+@pytest.mark.asyncio
+async def test_stream_content_appends_completed_paragraphs() -> None:
+    """Test that each paragraph is appended once a blank line completes it."""
+    service = NotionService("test_token", "test_db")
+    service.client = AsyncMock()
+    service.client.blocks.children.append = AsyncMock()
+
+    async def chunks() -> AsyncIterator[str]:
+        for piece in ["First para", "graph\n", "\nSecond", " paragraph"]:
+            yield piece
+
+    text = await service.stream_content("page", chunks())
+
+    assert text == "First paragraph\n\nSecond paragraph"
+    appended = [
+        call.kwargs["children"][0]["paragraph"]["rich_text"][0]["text"]["content"]
+        for call in service.client.blocks.children.append.await_args_list
+    ]
+    assert appended == ["First paragraph", "Second paragraph"]
+
+
+def test_split_content_keeps_every_chunk_within_limit() -> None:
+    """Test that lines several times over the limit are fully split."""
+    service = NotionService("test_token", "test_db")
+    limit = service.NOTION_TEXT_LIMIT
+    content = "intro\n" + "x" * (limit * 2 + 500) + "\nshort line\n" + "y" * limit
+
+    chunks = service._split_content(content)
+
+    assert all(len(chunk) <= limit for chunk in chunks)
+    assert "".join(chunks).replace("\n", "") == content.replace("\n", "")
+    assert chunks[0] == "intro"
+
+
+def test_markdown_is_converted_to_native_blocks() -> None:
+    """Test that headings and lists become Notion block types."""
+    service = NotionService("test_token", "test_db")
+    content = (
+        "# 概要\n"
+        "本文の一行目\n本文の二行目\n\n"
+        "## 次のステップ\n"
+        "- 資料を送る\n"
+        "* 日程を決める\n"
+        "1. 準備\n"
+        "2) 実施\n"
+        "#### 補足"
+    )
+
+    blocks = service._create_block_objects(content)
+
+    assert [
+        (block["type"], block[block["type"]]["rich_text"][0]["text"]["content"])
+        for block in blocks
+    ] == [
+        ("heading_1", "概要"),
+        ("paragraph", "本文の一行目\n本文の二行目"),
+        ("heading_2", "次のステップ"),
+        ("bulleted_list_item", "資料を送る"),
+        ("bulleted_list_item", "日程を決める"),
+        ("numbered_list_item", "準備"),
+        ("numbered_list_item", "実施"),
+        ("heading_3", "補足"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_long_entry_is_appended_100_blocks_at_a_time() -> None:
+    """Test that blocks past the first 100 are appended in order later."""
+    service = NotionService("test_token", "test_db")
+    service.client = AsyncMock()
+    service.client.pages.create = AsyncMock(return_value={"id": "page"})
+    release = asyncio.Event()
+    appended: List[List[Any]] = []
+
+    async def append(block_id: str, children: List[Any]) -> None:
+        await release.wait()
+        appended.append(children)
+
+    service.client.blocks.children.append = append
+    content = "\n".join(f"- item {i}" for i in range(250))
+
+    page = await service.add_entry({"title": "Long", "content": content})
+
+    inline = service.client.pages.create.call_args.kwargs["children"]
+    assert page == {"id": "page"}
+    assert len(inline) == 100
+    assert appended == []  # add_entry returned before the appends finished
+
+    release.set()
+    await service.wait_for_page("page")
+
+    assert [len(children) for children in appended] == [100, 50]
+    texts = [
+        block["bulleted_list_item"]["rich_text"][0]["text"]["content"]
+        for block in inline + appended[0] + appended[1]
+    ]
+    assert texts == [f"item {i}" for i in range(250)]
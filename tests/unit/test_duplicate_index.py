@@ -0,0 +1,54 @@
+"""Tests for SimHash fingerprints and the near-duplicate index."""
+
+from pathlib import Path
+
+from app.utils.duplicate_index import DuplicateIndex, hamming_distance, simhash
+
+BODY = " ".join(
+    f"Quarterly update paragraph {i} covers revenue, hiring and the roadmap."
+    for i in range(30)
+)
+
+
+def test_resent_copy_has_close_fingerprint() -> None:
+    """Test that spacing, case and tracking parameters barely move the hash."""
+    resent = BODY.upper().replace(" ", "  ") + " https://example.com/a?utm=1"
+    original = BODY + " https://example.com/a?utm=2"
+    assert hamming_distance(simhash(original), simhash(resent)) <= 3
+
+
+def test_unrelated_text_has_distant_fingerprint() -> None:
+    """Test that different emails land far apart."""
+    other = " ".join(f"Invoice {i} for the cloud hosting contract." for i in range(30))
+    assert hamming_distance(simhash(BODY), simhash(other)) > 10
+
+
+def test_find_returns_indexed_near_duplicate() -> None:
+    """Test that a forwarded copy is linked to the first email's summary."""
+    index = DuplicateIndex(":memory:")
+    index.add("msg1", BODY, "https://notion.so/page", "要約")
+
+    match = index.find("Fwd: " + BODY)
+
+    assert match is not None
+    assert (match.message_id, match.page_url, match.summary) == (
+        "msg1",
+        "https://notion.so/page",
+        "要約",
+    )
+    assert index.find("Completely different text about the weekly lunch.") is None
+
+
+def test_index_persists_and_rebands_on_threshold_change(tmp_path: Path) -> None:
+    """Test that entries survive reopening, also with a new threshold."""
+    path = str(tmp_path / "index.sqlite3")
+    index = DuplicateIndex(path, max_distance=3)
+    index.add("msg1", BODY, "", "要約")
+    index.close()
+
+    for max_distance in (3, 7):
+        index = DuplicateIndex(path, max_distance=max_distance)
+        assert len(index) == 1
+        match = index.find(BODY)
+        assert match is not None and match.distance == 0
+        index.close()
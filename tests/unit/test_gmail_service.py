@@ -1,6 +1,10 @@
 """Unit tests for Gmail Service."""
 
-from typing import Any, Dict
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from unittest.mock import Mock, mock_open, patch
 
 import pytest
@@ -25,6 +29,28 @@ def mock_credentials() -> Mock:
     return creds
 
 
+class FakeBatch:
+    """In-process stand-in for googleapiclient's BatchHttpRequest."""
+
+    def __init__(self, callback: Optional[Callable[..., None]] = None) -> None:
+        self.callback = callback
+        self.requests: List[Tuple[str, Any]] = []
+
+    def add(self, request: Any, request_id: str) -> None:
+        """Queue a request for execution."""
+        self.requests.append((request_id, request))
+
+    def execute(self) -> None:
+        """Run queued requests and report each outcome to the callback."""
+        for request_id, request in self.requests:
+            try:
+                response, exception = request.execute(), None
+            except Exception as e:
+                response, exception = None, e
+            if self.callback is not None:
+                self.callback(request_id, response, exception)
+
+
 @pytest.fixture(name="mock_gmail_service")
 def mock_gmail_service() -> Mock:
     """Mock Gmail API service."""
@@ -42,6 +68,7 @@ def mock_gmail_service() -> Mock:
     users.messages.return_value = messages
     service = Mock()
     service.users.return_value = users
+    service.new_batch_http_request.side_effect = FakeBatch
     return service
 
 
@@ -77,7 +104,10 @@ class TestGmailService:
             patch(
                 "app.services.gmail_service.Credentials", return_value=mock_credentials
             ),
-            patch("app.services.gmail_service.build", return_value=mock_gmail_service),
+            patch(
+                "app.services.gmail_service.build_from_document",
+                return_value=mock_gmail_service,
+            ),
             patch("builtins.open", mock_open(read_data='{"token": "dummy_token"}')),
             patch(
                 "json.load",
@@ -152,6 +182,159 @@ class TestGmailService:
         assert "labelIds" in list_call_kwargs
         assert list_call_kwargs["labelIds"] == ["INBOX", "UNREAD"]
 
+    @pytest.mark.asyncio
+    async def test_fetch_recent_emails_reports_failed_messages(
+        self, mock_gmail_service: Mock, sample_email_data: Dict[str, Any]
+    ) -> None:
+        """Test that one failing message does not drop the rest of the batch."""
+        messages_mock = mock_gmail_service.users.return_value.messages.return_value
+        messages_mock.get.return_value.execute.side_effect = [
+            Exception("Not Found"),
+            sample_email_data,
+        ]
+
+        emails = await self.service.fetch_recent_emails(hours=24, max_results=2)
+
+        assert len(emails) == 1
+        assert emails[0]["id"] == "123"
+
+    def test_get_messages_uses_batches(
+        self, mock_gmail_service: Mock, sample_email_data: Dict[str, Any]
+    ) -> None:
+        """Test that messages are grouped into batch requests of batch_size."""
+        messages_mock = mock_gmail_service.users.return_value.messages.return_value
+        messages_mock.get.return_value.execute.return_value = sample_email_data
+
+        emails, errors = self.service.get_messages(
+            [str(i) for i in range(5)], batch_size=2
+        )
+
+        assert len(emails) == 5
+        assert not errors
+        assert mock_gmail_service.new_batch_http_request.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_archive_email_runs_on_worker_pool(
+        self, mock_gmail_service: Mock
+    ) -> None:
+        """Test that archive_email executes the modify call off the event loop."""
+        messages_mock = mock_gmail_service.users.return_value.messages.return_value
+        caller_threads = []
+        messages_mock.modify.return_value.execute.side_effect = (
+            lambda: caller_threads.append(threading.get_ident())
+        )
+
+        assert await self.service.archive_email("123") is True
+
+        messages_mock.modify.assert_called_once_with(
+            userId="me", id="123", body={"removeLabelIds": ["INBOX"]}
+        )
+        assert caller_threads and caller_threads[0] != threading.get_ident()
+
+    @pytest.mark.asyncio
+    async def test_delete_email_failure_returns_false(
+        self, mock_gmail_service: Mock
+    ) -> None:
+        """Test that delete_email reports errors raised on the worker pool."""
+        messages_mock = mock_gmail_service.users.return_value.messages.return_value
+        messages_mock.delete.return_value.execute.side_effect = Exception("Gone")
+
+        assert await self.service.delete_email("123") is False
+        messages_mock.delete.assert_called_once_with(userId="me", id="123")
+
+    def test_get_messages_survives_failed_batch(
+        self, mock_gmail_service: Mock, sample_email_data: Dict[str, Any]
+    ) -> None:
+        """Test that a batch-level failure only affects the messages in it."""
+        messages_mock = mock_gmail_service.users.return_value.messages.return_value
+        messages_mock.get.return_value.execute.return_value = sample_email_data
+        batches: List[FakeBatch] = []
+
+        class FailingBatch(FakeBatch):
+            """Batch whose whole HTTP request fails."""
+
+            def execute(self) -> None:
+                raise Exception("503 Backend Error")
+
+        def new_batch(callback: Optional[Callable[..., None]] = None) -> FakeBatch:
+            batch = FailingBatch(callback) if len(batches) == 1 else FakeBatch(callback)
+            batches.append(batch)
+            return batch
+
+        mock_gmail_service.new_batch_http_request.side_effect = new_batch
+
+        emails, errors = self.service.get_messages(
+            [str(i) for i in range(6)], batch_size=2
+        )
+
+        assert len(emails) == 4
+        assert set(errors) == {"2", "3"}
+        assert str(errors["2"]) == "503 Backend Error"
+
+    def test_shared_instance_is_reused(
+        self, mock_credentials: Mock, mock_gmail_service: Mock
+    ) -> None:
+        """Test that every cycle gets the same process-wide service."""
+        with (
+            patch.object(
+                GmailService, "_get_credentials", return_value=mock_credentials
+            ),
+            patch(
+                "app.services.gmail_service.build_from_document",
+                return_value=mock_gmail_service,
+            ) as build_mock,
+        ):
+            first = GmailService.shared()
+            second = GmailService.shared()
+            GmailService.close_shared()
+
+        assert first is second
+        assert build_mock.call_count == 1
+        assert GmailService._shared is None
+
+    def test_credentials_round_trip_keeps_expiry(self, tmp_path: Path) -> None:
+        """Test that the token file records when the access token expires."""
+        self.service.token_path = str(tmp_path / "token.json")
+        expiry = datetime(2030, 1, 1, 12, 0)
+        creds = Credentials(
+            token="token",
+            refresh_token="refresh",
+            token_uri="https://oauth2.googleapis.com/token",
+            client_id="client",
+            client_secret="secret",
+            scopes=["https://www.googleapis.com/auth/gmail.modify"],
+            expiry=expiry,
+        )
+
+        self.service._save_credentials(creds)
+        loaded = self.service._load_credentials()
+
+        assert loaded is not None
+        assert loaded.expiry == expiry
+
+    @pytest.mark.asyncio
+    async def test_token_refreshed_before_expiry(self) -> None:
+        """Test that the background task refreshes the token ahead of expiry."""
+        creds = Mock()
+        creds.refresh_token = "refresh"
+        creds.expiry = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(
+            seconds=settings.gmail_token_refresh_margin_seconds
+        )
+
+        def refresh(_request: Any) -> None:
+            creds.expiry = None
+
+        creds.refresh.side_effect = refresh
+        self.service.creds = creds
+
+        with patch.object(self.service, "_save_credentials") as save_mock:
+            self.service.start_token_refresh()
+            assert self.service._refresh_task is not None
+            await asyncio.wait_for(self.service._refresh_task, timeout=1)
+
+        creds.refresh.assert_called_once()
+        save_mock.assert_called_once_with(creds)
+
     def test_parse_payload_data(self, sample_email_data: Dict[str, Any]) -> None:
         """Test email parsing functionality."""
         parsed_email = self.service.parse_email(sample_email_data)
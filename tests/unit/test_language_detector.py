@@ -0,0 +1,41 @@
+"""Tests for local language detection."""
+
+import pytest
+
+from app.utils.language_detector import (
+    ENGLISH,
+    JAPANESE,
+    NON_TEXT,
+    OTHER,
+    detect_language,
+)
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ("Hello team, the meeting moved to Friday.", ENGLISH),
+        ("Bonjour à tous, la réunion est demain.", ENGLISH),
+        ("お世話になっております。来週の会議についてご連絡します。", JAPANESE),
+        (
+            "会議の資料を共有いたします。ご確認のほどよろしくお願いいたします。\n"
+            "https://example.com/agenda?id=42",
+            JAPANESE,
+        ),
+        ("Hi 田中さん, the meeting is moved to Friday. Please confirm.", ENGLISH),
+        ("你好，我们下周开会。", OTHER),
+        ("Привет всем, встреча завтра.", OTHER),
+        ("12345 --- 67890 !!! ###", NON_TEXT),
+        ("——— ★★★ 2024/01/01 ★★★ ———", NON_TEXT),
+        ("   \n\n ", NON_TEXT),
+    ],
+)
+def test_detect_language(text: str, expected: str) -> None:
+    """Test that bodies are classified by their dominant script."""
+    assert detect_language(text) == expected
+
+
+def test_only_the_head_is_inspected() -> None:
+    """Test that a long English tail does not outweigh a Japanese body."""
+    body = "お世話になっております。" * 200 + "Sent from my iPhone. " * 1000
+    assert detect_language(body) == JAPANESE
@@ -0,0 +1,155 @@
+"""Tests for the email processing pipeline helpers."""
+
+from typing import Any, AsyncIterator, Dict, List
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from app.main import process_email, summarize_backlog
+from app.utils.duplicate_index import DuplicateIndex
+
+
+async def stream(count: int) -> AsyncIterator[Dict[str, Any]]:
+    """Yield ``count`` parsed emails."""
+    for i in range(count):
+        yield {"id": f"msg{i}", "body": f"Body {i}"}
+
+
+async def collect(emails: AsyncIterator[Dict[str, Any]]) -> List[str]:
+    """Drain an email iterator into a list of IDs."""
+    return [email["id"] async for email in emails]
+
+
+@pytest.mark.asyncio
+async def test_backlog_over_threshold_uses_batch_mode() -> None:
+    """Test that a large backlog is summarized with one batch."""
+    claude_service = Mock()
+    claude_service.generate_summaries_batch = AsyncMock(return_value={"msg0": "要約"})
+
+    with patch("app.main.settings.claude_batch_threshold", 3):
+        emails, summaries = await summarize_backlog(stream(5), claude_service)
+
+    assert summaries == {"msg0": "要約"}
+    assert await collect(emails) == [f"msg{i}" for i in range(5)]
+    claude_service.generate_summaries_batch.assert_awaited_once_with(
+        {f"msg{i}": f"Body {i}" for i in range(5)}
+    )
+
+
+@pytest.mark.asyncio
+async def test_small_backlog_is_processed_one_by_one() -> None:
+    """Test that a backlog below the threshold skips batch mode."""
+    claude_service = Mock()
+    claude_service.generate_summaries_batch = AsyncMock()
+
+    with patch("app.main.settings.claude_batch_threshold", 3):
+        emails, summaries = await summarize_backlog(stream(2), claude_service)
+
+    assert summaries == {}
+    assert await collect(emails) == ["msg0", "msg1"]
+    claude_service.generate_summaries_batch.assert_not_awaited()
+
+
+def email(message_id: str, body: str) -> Dict[str, Any]:
+    """Build a parsed email as GmailService returns it."""
+    return {
+        "id": message_id,
+        "subject": "Weekly report",
+        "sender": "boss@example.com",
+        "date": "Mon, 1 Jan 2024 09:00:00 +0000",
+        "body": body,
+    }
+
+
+@pytest.mark.asyncio
+async def test_near_duplicate_reuses_existing_summary() -> None:
+    """Test that a resent email skips Claude and Notion."""
+    claude_service = Mock()
+    claude_service.generate_summary = AsyncMock(return_value="要約")
+    notion_service = Mock()
+    notion_service.add_entry = AsyncMock(
+        return_value={"id": "page", "url": "https://notion.so/p"}
+    )
+    notion_service.wait_for_page = AsyncMock()
+    notion_service.find_page = Mock(return_value=None)
+    slack_service = Mock()
+    slack_service.send_notification = AsyncMock()
+    duplicates = DuplicateIndex(":memory:")
+    body = " ".join(f"Line {i} of the weekly status report." for i in range(20))
+
+    with patch("app.main.settings.claude_streaming", False):
+        for message_id in ("msg1", "msg2"):
+            await process_email(
+                email(message_id, body),
+                Mock(),
+                claude_service,
+                notion_service,
+                slack_service,
+                archive=False,
+                duplicates=duplicates,
+            )
+
+    claude_service.generate_summary.assert_awaited_once()
+    notion_service.add_entry.assert_awaited_once()
+    assert slack_service.send_notification.await_count == 2
+    assert "https://notion.so/p" in slack_service.send_notification.call_args.args[0]
+    assert len(duplicates) == 1
+
+
+@pytest.mark.asyncio
+async def test_email_already_in_notion_is_only_archived() -> None:
+    """Test that a retried email is archived without a new summary or page."""
+    claude_service = Mock()
+    claude_service.generate_summary = AsyncMock()
+    notion_service = Mock()
+    notion_service.find_page = Mock(return_value={"id": "page", "url": ""})
+    notion_service.add_entry = AsyncMock()
+    slack_service = Mock()
+    slack_service.send_notification = AsyncMock()
+    gmail_service = Mock()
+    gmail_service.archive_email = AsyncMock(return_value=True)
+
+    await process_email(
+        email("msg1", "Body"),
+        gmail_service,
+        claude_service,
+        notion_service,
+        slack_service,
+    )
+
+    notion_service.find_page.assert_called_once_with("msg1")
+    claude_service.generate_summary.assert_not_awaited()
+    notion_service.add_entry.assert_not_awaited()
+    slack_service.send_notification.assert_not_awaited()
+    gmail_service.archive_email.assert_awaited_once_with("msg1")
+
+
+@pytest.mark.asyncio
+async def test_update_mode_resummarizes_stored_email() -> None:
+    """Test that update mode refreshes the stored page instead of skipping."""
+    claude_service = Mock()
+    claude_service.generate_summary = AsyncMock(return_value="新しい要約")
+    notion_service = Mock()
+    notion_service.find_page = Mock(return_value={"id": "page", "url": ""})
+    notion_service.add_entry = AsyncMock(return_value={"id": "page", "url": ""})
+    notion_service.wait_for_page = AsyncMock()
+    slack_service = Mock()
+    slack_service.send_notification = AsyncMock()
+    duplicates = DuplicateIndex(":memory:")
+    body = " ".join(f"Line {i} of the weekly status report." for i in range(20))
+    duplicates.add("msg1", body, "", "古い要約")
+
+    with patch("app.main.settings.notion_update_existing", True):
+        await process_email(
+            email("msg1", body),
+            Mock(),
+            claude_service,
+            notion_service,
+            slack_service,
+            archive=False,
+            duplicates=duplicates,
+        )
+
+    claude_service.generate_summary.assert_awaited_once_with(body)
+    assert notion_service.add_entry.await_args.args[0]["content"] == "新しい要約"
+    assert len(duplicates) == 1
@@ -0,0 +1,119 @@
+"""Unit tests for MIME body extraction."""
+
+import base64
+from typing import Any, Dict, List, Optional
+
+from app.utils.mime import extract_text_body, html_to_text
+
+
+def encode(text: str, charset: str = "utf-8") -> str:
+    """Base64url-encode text the way Gmail does, without padding."""
+    return base64.urlsafe_b64encode(text.encode(charset)).decode().rstrip("=")
+
+
+def leaf(
+    mime_type: str,
+    text: str,
+    charset: str = "utf-8",
+    filename: str = "",
+    extra_headers: Optional[List[Dict[str, str]]] = None,
+) -> Dict[str, Any]:
+    """Build a single-part payload."""
+    return {
+        "mimeType": mime_type,
+        "filename": filename,
+        "headers": [
+            {"name": "Content-Type", "value": f"{mime_type}; charset={charset}"}
+        ]
+        + (extra_headers or []),
+        "body": {"data": encode(text, charset)},
+    }
+
+
+def test_nested_alternative_inside_mixed() -> None:
+    """Test that text/plain nested two levels deep is found."""
+    payload = {
+        "mimeType": "multipart/mixed",
+        "parts": [
+            {
+                "mimeType": "multipart/alternative",
+                "parts": [
+                    leaf("text/plain", "Plain body"),
+                    leaf("text/html", "<p>HTML body</p>"),
+                ],
+            },
+            leaf("text/plain", "Attached notes", filename="notes.txt"),
+        ],
+    }
+
+    assert extract_text_body(payload, 1000) == "Plain body"
+
+
+def test_html_only_newsletter_is_converted() -> None:
+    """Test that HTML-only mail is turned into readable text."""
+    html = (
+        "<html><head><style>p {color: red}</style></head><body>"
+        "<h1>Headline</h1><p>First&nbsp;paragraph &amp; more.</p>"
+        "<script>track()</script><ul><li>One</li><li>Two</li></ul>"
+        "</body></html>"
+    )
+    payload = {"mimeType": "multipart/alternative", "parts": [leaf("text/html", html)]}
+
+    assert extract_text_body(payload, 1000) == (
+        "Headline\n\nFirst\xa0paragraph & more.\n\n- One\n\n- Two"
+    )
+
+
+def test_declared_charset_is_used() -> None:
+    """Test that non-UTF-8 parts are decoded with their charset."""
+    payload = leaf("text/plain", "日本語のメール", charset="iso-2022-jp")
+
+    assert extract_text_body(payload, 1000) == "日本語のメール"
+
+
+def test_unknown_charset_falls_back_to_utf8() -> None:
+    """Test that an unknown charset does not raise."""
+    payload = leaf("text/plain", "Hello")
+    payload["headers"][0]["value"] = "text/plain; charset=x-unknown"
+
+    assert extract_text_body(payload, 1000) == "Hello"
+
+
+def test_attachment_disposition_is_skipped() -> None:
+    """Test that inline text marked as an attachment is not used as the body."""
+    payload = {
+        "mimeType": "multipart/mixed",
+        "parts": [
+            leaf(
+                "text/plain",
+                "Invoice",
+                extra_headers=[{"name": "Content-Disposition", "value": "attachment"}],
+            ),
+            leaf("text/html", "<p>Body</p>"),
+        ],
+    }
+
+    assert extract_text_body(payload, 1000) == "Body"
+
+
+def test_output_is_capped() -> None:
+    """Test that plain and HTML bodies respect the size cap."""
+    assert len(extract_text_body(leaf("text/plain", "a" * 5000), 100)) == 100
+    html = "<p>" + "word " * 100_000 + "</p>"
+    assert len(html_to_text(html, 1000)) <= 1000
+
+
+def test_deep_nesting_does_not_recurse() -> None:
+    """Test that pathological nesting is handled iteratively."""
+    payload: Dict[str, Any] = leaf("text/plain", "Deep body")
+    for _ in range(5000):
+        payload = {"mimeType": "multipart/mixed", "parts": [payload]}
+
+    assert extract_text_body(payload, 1000) == "Deep body"
+
+
+def test_missing_text_part_returns_empty() -> None:
+    """Test that a payload without text parts yields an empty body."""
+    payload = {"mimeType": "multipart/mixed", "parts": [leaf("image/png", "x")]}
+
+    assert extract_text_body(payload, 1000) == ""
@@ -0,0 +1,22 @@
+"""Tests for the message ID to Notion page index."""
+
+from pathlib import Path
+
+from app.utils.page_index import PageIndex
+
+
+def test_pages_persist_but_warming_is_per_process(tmp_path: Path) -> None:
+    """Test that entries survive reopening while ``warmed`` starts over."""
+    path = str(tmp_path / "pages.sqlite3")
+    index = PageIndex(path)
+    index.set("msg1", "page-1", "https://notion.so/page-1")
+    index.set_many([("msg2", "page-2", ""), ("msg1", "page-3", "")])
+    index.warmed = True
+    index.close()
+
+    index = PageIndex(path)
+
+    assert not index.warmed
+    assert len(index) == 2
+    assert index.get("msg1") == {"id": "page-3", "url": ""}
+    assert index.get("missing") is None
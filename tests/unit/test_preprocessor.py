@@ -0,0 +1,71 @@
+"""Tests for the email body pre-processor."""
+
+from app.utils.preprocessor import EmailPreprocessor
+
+BODY = "Hello team,\n\nThe launch moved to Friday.\n\nThanks,\nAlice"
+
+
+def test_quoted_reply_is_removed() -> None:
+    """Test that reply history after the attribution line is dropped."""
+    text = BODY + "\n\nOn Mon, Jan 6, 2025 at 9:00 AM Bob <bob@example.com> wrote:\n"
+    text += "> Old message\n> more history\n"
+
+    result = EmailPreprocessor().preprocess(text)
+
+    assert result.text == BODY
+    assert result.tokens_saved > 0
+
+
+def test_inline_quotes_and_signature_are_removed() -> None:
+    """Test that quoted lines and the text after '-- ' go."""
+    text = "> earlier point\nMy answer\n-- \nAlice Smith\nACME Corp | +1 555 0100"
+
+    assert EmailPreprocessor().preprocess(text).text == "My answer"
+
+
+def test_newsletter_footer_is_removed() -> None:
+    """Test that the unsubscribe block at the end of a newsletter goes."""
+    paragraphs = [f"Story {i}: something happened." for i in range(10)]
+    footer = "You are receiving this because you subscribed.\nUnsubscribe | Privacy"
+    text = "\n\n".join(paragraphs) + "\n\n" + footer
+
+    assert EmailPreprocessor().preprocess(text).text == "\n\n".join(paragraphs)
+
+
+def test_footer_words_early_in_body_are_kept() -> None:
+    """Test that footer markers outside the tail of the body are not cut."""
+    text = "How to unsubscribe from spam, explained.\n" + "Details.\n" * 10
+
+    assert "unsubscribe" in EmailPreprocessor().preprocess(text).text
+
+
+def test_url_lists_are_removed_but_single_links_kept() -> None:
+    """Test that runs of bare links go while an inline link stays."""
+    links = "\n".join(f"https://track.example.com/c/{i}?u=abc" for i in range(5))
+    text = f"Read more: https://example.com/story\n\n{links}\n\nEnd of issue."
+
+    result = EmailPreprocessor().preprocess(text).text
+
+    assert result == "Read more: https://example.com/story\n\nEnd of issue."
+
+
+def test_repeated_footer_is_learned_per_sender() -> None:
+    """Test that trailing lines a sender repeats are stripped next time."""
+    footer = "ACME Weekly, 1 Main St, Springfield\nSent with love by the ACME team"
+    preprocessor = EmailPreprocessor()
+
+    first = preprocessor.preprocess(f"Issue 1 news\n\n{footer}", "news@acme.com")
+    second = preprocessor.preprocess(f"Issue 2 news\n\n{footer}", "news@acme.com")
+    other = preprocessor.preprocess(f"Issue 2 news\n\n{footer}", "other@acme.com")
+
+    assert footer in first.text
+    assert second.text == "Issue 2 news"
+    assert footer in other.text
+
+
+def test_identical_resend_is_not_emptied() -> None:
+    """Test that learning never strips an entire body."""
+    preprocessor = EmailPreprocessor()
+    preprocessor.preprocess(BODY, "a@example.com")
+
+    assert preprocessor.preprocess(BODY, "a@example.com").text == BODY
@@ -0,0 +1,56 @@
+"""Tests for the adaptive token-bucket rate limiter."""
+
+import asyncio
+import time
+
+import pytest
+
+from app.utils.rate_limiter import AdaptiveRateLimiter
+
+
+@pytest.mark.asyncio
+async def test_requests_are_paced_after_the_burst() -> None:
+    """Test that N requests past the burst take (N - burst) / rate seconds."""
+    limiter = AdaptiveRateLimiter(rate=20.0, burst=2)
+
+    started = time.monotonic()
+    await asyncio.gather(*(limiter.acquire() for _ in range(6)))
+    elapsed = time.monotonic() - started
+
+    assert 4 / 20 - 0.02 <= elapsed < 4 / 20 + 0.2
+    metrics = limiter.metrics
+    assert metrics["requests"] == 6
+    assert metrics["max_queue_depth"] == 4  # The burst went through without queueing
+    assert metrics["queue_depth"] == 0
+    assert metrics["max_wait_seconds"] >= 4 / 20 - 0.02
+
+
+@pytest.mark.asyncio
+async def test_throttling_pauses_and_halves_the_rate() -> None:
+    """Test that Retry-After is honoured and the rate recovers on success."""
+    limiter = AdaptiveRateLimiter(rate=10.0, burst=5, recovery=2.0)
+    limiter.throttled(retry_after=0.2)
+
+    assert limiter.rate == 5.0
+    waited = await limiter.acquire()
+    assert waited >= 0.2 - 0.02
+
+    limiter.succeeded()
+    assert limiter.rate == 7.0
+    for _ in range(5):
+        limiter.succeeded()
+    assert limiter.rate == 10.0
+    assert limiter.metrics["throttled"] == 1
+
+
+def test_rate_never_drops_below_minimum() -> None:
+    """Test that repeated throttling stops at min_rate."""
+    limiter = AdaptiveRateLimiter(rate=1.0, min_rate=0.25)
+    for _ in range(10):
+        limiter.throttled()
+    assert limiter.rate == 0.25
+
+
+def test_shared_limiter_is_created_once() -> None:
+    """Test that every caller gets the same process-wide limiter."""
+    assert AdaptiveRateLimiter.shared(3.0) is AdaptiveRateLimiter.shared(99.0)
@@ -0,0 +1,63 @@
+"""Tests for the persistent summary cache."""
+
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+from app.utils.summary_cache import SummaryCache, cache_key
+
+
+def test_key_ignores_whitespace_differences() -> None:
+    """Test that re-sent copies with different spacing share a key."""
+    assert cache_key("Hello\r\n  world ", "v1", "model") == cache_key(
+        "Hello world", "v1", "model"
+    )
+
+
+def test_key_changes_with_prompt_version_and_model() -> None:
+    """Test that a new prompt version or model never reuses old entries."""
+    base = cache_key("Hello", "v1", "model-a")
+    assert cache_key("Hello", "v2", "model-a") != base
+    assert cache_key("Hello", "v1", "model-b") != base
+
+
+def test_hits_and_misses_persist_across_instances(tmp_path: Path) -> None:
+    """Test that a stored summary survives reopening the database."""
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SummaryCache(path)
+    assert cache.get("key") is None
+    cache.set("key", "要約")
+    cache.close()
+
+    reopened = SummaryCache(path)
+    assert reopened.get("key") == "要約"
+    assert reopened.get("other") is None
+    assert reopened.stats == {"hits": 1, "misses": 1}
+
+
+def test_expired_entries_are_not_returned() -> None:
+    """Test TTL expiry."""
+    cache = SummaryCache(":memory:", ttl_seconds=60)
+    with patch("app.utils.summary_cache.time.time", return_value=1000.0):
+        cache.set("key", "value")
+    with patch("app.utils.summary_cache.time.time", return_value=1061.0):
+        assert cache.get("key") is None
+        cache.set("fresh", "value")
+    assert len(cache) == 1
+
+
+def test_least_recently_used_entries_are_evicted() -> None:
+    """Test size eviction keeps the most recently used entries."""
+    cache = SummaryCache(":memory:", max_entries=2)
+    now = time.time()
+    with patch(
+        "app.utils.summary_cache.time.time", side_effect=[now + i for i in range(4)]
+    ):
+        cache.set("a", "1")
+        cache.set("b", "2")
+        assert cache.get("a") == "1"
+        cache.set("c", "3")
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
@@ -0,0 +1,55 @@
+"""Tests for token estimation and paragraph chunking."""
+
+from app.utils.text_chunker import (
+    PARAGRAPH_SEPARATOR,
+    chunk_segments,
+    chunk_text,
+    estimate_tokens,
+)
+
+
+def test_estimate_tokens_weights_non_ascii_text() -> None:
+    """Test that Japanese counts about one token per character."""
+    assert estimate_tokens("abcd" * 10) == 10
+    assert estimate_tokens("日本語") == 3
+    assert estimate_tokens("") == 0
+
+
+def test_short_text_is_one_chunk() -> None:
+    """Test that text within budget is left whole."""
+    text = "First paragraph.\n\nSecond paragraph."
+    assert chunk_text(text, 100) == [text]
+
+
+def test_chunks_break_on_paragraphs_in_order() -> None:
+    """Test that paragraphs are packed greedily and never reordered."""
+    paragraphs = [f"Paragraph {i}" + " word" * 20 for i in range(10)]
+    text = PARAGRAPH_SEPARATOR.join(paragraphs)
+
+    chunks = chunk_text(text, 70)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 70 for chunk in chunks)
+    assert PARAGRAPH_SEPARATOR.join(chunks) == text
+
+
+def test_oversized_paragraph_is_split_on_spaces() -> None:
+    """Test that a paragraph larger than the budget is split between words."""
+    paragraph = " ".join(f"word{i}" for i in range(200))
+
+    chunks = chunk_text(paragraph, 50)
+
+    assert all(estimate_tokens(chunk) <= 50 for chunk in chunks)
+    assert " ".join(" ".join(chunks).split()) == paragraph
+    assert all(not chunk.startswith(" ") for chunk in chunks)
+
+
+def test_blank_text_has_no_chunks() -> None:
+    """Test that whitespace-only input yields nothing to translate."""
+    assert chunk_text(" \n\n ", 10) == []
+
+
+def test_segments_are_grouped_within_budget() -> None:
+    """Test that segments are packed in order and oversized ones stand alone."""
+    groups = chunk_segments(["a" * 8, "b" * 8, "c" * 40, "d" * 4], max_tokens=5)
+    assert groups == [["a" * 8, "b" * 8], ["c" * 40], ["d" * 4]]
@@ -0,0 +1,66 @@
+"""Tests for sentence segmentation and the translation memory."""
+
+from pathlib import Path
+
+from app.utils.translation_memory import (
+    TranslationMemory,
+    join_segments,
+    needs_translation,
+    split_segments,
+)
+
+
+def test_split_keeps_separators_in_order() -> None:
+    """Test that sentences and line breaks come back in document order."""
+    segments = split_segments("Hello there. How are you?\n\nBye!\nSee you")
+
+    assert segments == [
+        ("Hello there.", " "),
+        ("How are you?", "\n\n"),
+        ("Bye!", "\n"),
+        ("See you", ""),
+    ]
+
+
+def test_join_keeps_line_and_paragraph_breaks() -> None:
+    """Test that translated sentences join without spaces, breaks intact."""
+    joined = join_segments([("こんにちは。", " "), ("元気？", "\n\n"), ("では。", "")])
+    assert joined == "こんにちは。元気？\n\nでは。"
+
+
+def test_segments_without_letters_need_no_translation() -> None:
+    """Test that rules and numbers are passed through."""
+    assert not needs_translation("----- 2024 -----")
+    assert needs_translation("Issue 42")
+
+
+def test_normalized_match_hits(tmp_path: Path) -> None:
+    """Test that spacing and case differences still reuse a translation."""
+    path = str(tmp_path / "memory.sqlite3")
+    memory = TranslationMemory(path)
+    memory.set_many(
+        {"Thanks for reading.": "お読みいただきありがとうございます。"}, "v1"
+    )
+    memory.close()
+
+    memory = TranslationMemory(path)
+    found = memory.get_many(["THANKS  for reading.", "New story."], "v1")
+
+    assert found == {"THANKS  for reading.": "お読みいただきありがとうございます。"}
+    assert memory.stats == {"hits": 1, "misses": 1}
+    assert memory.hit_rate == 0.5
+    assert memory.get_many(["Thanks for reading."], "v2") == {}
+
+
+def test_least_recently_used_entries_are_evicted() -> None:
+    """Test that only max_entries keys are kept."""
+    memory = TranslationMemory(":memory:", max_entries=4)
+    memory.set_many({"One.": "一。", "Two.": "二。"}, "v1")
+    memory.get_many(["One."], "v1")
+    memory.set_many({"Three.": "三。"}, "v1")
+
+    assert len(memory) == 4
+    assert set(memory.get_many(["One.", "Two.", "Three."], "v1")) == {
+        "One.",
+        "Three.",
+    }